@@ -0,0 +1,211 @@
+"""
+대규모 갤러리용 근사 최근접 이웃(ANN) 인덱스.
+순수 NumPy 로 구현한 IVF(inverted file, 구면 k-means 거친 양자화기)입니다.
+
+AnnUserStore 는 InMemoryUserStore / MmapUserStore 를 감싸서 같은 인터페이스를 제공하고,
+best_match 를 IVF 탐색으로 대체합니다. IVF 는 nprobe 개 리스트만 보므로 근사 유사도는 정확한 최댓값의
+하한입니다. 그래서 근사 유사도가 match_thr + borderline 미만이면(일치로 확정할 수 없으면) 정확 탐색으로
+다시 계산하고, AuthWorker 의 match_thr 판정(거짓 거절 없음)은 그대로 유지됩니다.
+
+k-means (재)학습은 백그라운드 스레드에서 하며, 학습이 끝날 때까지는 기존 인덱스(없으면 정확 탐색)를 씁니다.
+"""
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+from auth_worker import InMemoryUserStore
+
+
+class IVFIndex:
+    def __init__(self, nlist: Optional[int] = None, nprobe: int = 8,
+                 kmeans_iters: int = 10, train_sample: int = 20000, seed: int = 0):
+        """
+        :param nlist: 클러스터 수 (None 이면 학습 시 sqrt(N) 기준으로 자동 결정)
+        :param nprobe: 탐색할 클러스터 수
+        :param kmeans_iters: k-means 반복 횟수
+        :param train_sample: 학습에 사용할 최대 행 수
+        """
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.kmeans_iters = kmeans_iters
+        self.train_sample = train_sample
+        self.rng = np.random.default_rng(seed)
+
+        self.centroids: Optional[np.ndarray] = None
+        self.lists: List[np.ndarray] = []  # 클러스터별 행 인덱스
+        self.ntotal = 0          # 인덱스에 들어간 행 수
+        self.trained_n = 0       # 마지막 학습 시점의 행 수
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    # 학습/배정은 행 방향만 보므로 int8 저장소의 scale 이 빠진 행렬도 그대로 사용 가능
+    def _assign(self, rows: np.ndarray, chunk: int = 8192) -> np.ndarray:
+        out = np.empty(len(rows), dtype=np.int64)
+        for s in range(0, len(rows), chunk):
+            out[s:s + chunk] = np.argmax(rows[s:s + chunk].astype(np.float32) @ self.centroids.T, axis=1)
+        return out
+
+    def train(self, mat: np.ndarray):
+        """mat 전체로 중심점을 학습하고 모든 행을 다시 배정한다"""
+        n = len(mat)
+        k = self.nlist or int(np.clip(np.sqrt(n), 8, 4096))
+        k = min(k, n)
+        sample = mat if n <= self.train_sample else mat[np.sort(self.rng.choice(n, self.train_sample, replace=False))]
+        sample = np.asarray(sample, dtype=np.float32)
+        sample = sample / (np.linalg.norm(sample, axis=1, keepdims=True) + 1e-9)
+
+        cent = sample[self.rng.choice(len(sample), k, replace=False)].copy()
+        for _ in range(self.kmeans_iters):
+            assign = np.argmax(sample @ cent.T, axis=1)
+            new = np.zeros_like(cent)
+            np.add.at(new, assign, sample)
+            counts = np.bincount(assign, minlength=k)
+            empty = counts == 0
+            if empty.any():
+                new[empty] = sample[self.rng.choice(len(sample), int(empty.sum()), replace=False)]
+            cent = new / (np.linalg.norm(new, axis=1, keepdims=True) + 1e-9)
+        self.centroids = cent.astype(np.float32)
+
+        self.lists = [np.empty(0, dtype=np.int64) for _ in range(k)]
+        self.ntotal = 0
+        self.add(mat, 0)
+        self.trained_n = n
+
+    def add(self, mat: np.ndarray, start: int):
+        """mat[start:] 행들을 가장 가까운 클러스터 리스트에 추가"""
+        rows = mat[start:]
+        if len(rows) == 0: return
+        assign = self._assign(rows)
+        order = np.argsort(assign, kind="stable")
+        ids = order + start
+        bounds = np.searchsorted(assign[order], np.arange(len(self.lists) + 1))
+        for c in np.unique(assign):
+            part = ids[bounds[c]:bounds[c + 1]]
+            self.lists[c] = part if len(self.lists[c]) == 0 else np.concatenate([self.lists[c], part])
+        self.ntotal = start + len(rows)
+
+    def search(self, q: np.ndarray, score, nprobe: Optional[int] = None) -> Tuple[int, float]:
+        """가장 유사한 (행 인덱스, 유사도). 후보가 없으면 (-1, -1.0)
+        score(rows) 는 후보 행들의 유사도를 돌려주는 함수 (저장소의 similarities)"""
+        nprobe = min(nprobe or self.nprobe, len(self.lists))
+        csims = self.centroids @ q
+        probe = np.argpartition(-csims, nprobe - 1)[:nprobe] if nprobe < len(self.lists) else range(len(self.lists))
+        cand = [self.lists[c] for c in probe if len(self.lists[c])]
+        if not cand:
+            return -1, -1.0
+        cand = np.concatenate(cand)
+        sims = score(cand)
+        i = int(np.argmax(sims))
+        return int(cand[i]), float(sims[i])
+
+
+class AnnUserStore:
+    def __init__(self, base=None, nprobe: int = 8, borderline: float = 0.05,
+                 min_train: int = 4096, retrain_factor: float = 2.0, nlist: Optional[int] = None):
+        """
+        :param base: 실제 임베딩을 보관하는 저장소 (기본값: InMemoryUserStore())
+        :param nprobe: IVF 탐색 클러스터 수
+        :param borderline: 근사 유사도가 match_thr + 이 값 미만이면 정확 탐색으로 재확인
+        :param min_train: 이 행 수 미만에서는 인덱스 없이 정확 탐색
+        :param retrain_factor: 마지막 학습 대비 행 수가 이 배수가 되면 재학습
+        """
+        self.base = base if base is not None else InMemoryUserStore()
+        self.nlist = nlist
+        self.index = IVFIndex(nlist=nlist, nprobe=nprobe)
+        self.borderline = borderline
+        self.min_train = min_train
+        self.retrain_factor = retrain_factor
+        self.stats = {"ann": 0, "exact": 0, "exact_fallback": 0, "trains": 0}
+        self._lock = threading.Lock()
+        self._trainer: Optional[threading.Thread] = None
+        self._gen = 0  # rewrite 로 행 번호가 바뀌면 진행 중인 학습 결과를 버리기 위한 세대
+
+    # ---- 저장소 인터페이스 위임 ----
+    def next_user_id(self) -> int:
+        return self.base.next_user_id()
+
+    def add_embedding(self, uid: int, emb: np.ndarray):
+        self.base.add_embedding(uid, emb)
+        self._sync()
+
+    def all(self) -> Dict[int, List[np.ndarray]]:
+        return self.base.all()
+
+    def resolve(self, uid: Optional[int]) -> Optional[int]:
+        return self.base.resolve(uid)
+
+    @property
+    def persistent(self) -> bool:
+        return getattr(self.base, "persistent", False)
+
+    def rewrite(self, uids, embs: np.ndarray, remap: Optional[Dict[int, int]] = None):
+        """행 번호가 모두 바뀌므로 인덱스를 버리고 다시 만든다"""
+        self.base.rewrite(uids, embs, remap)
+        with self._lock:
+            self._gen += 1
+            self.index = IVFIndex(nlist=self.nlist, nprobe=self.index.nprobe)
+        self._sync()
+
+    def matrix(self) -> Tuple[np.ndarray, np.ndarray]:
+        return self.base.matrix()
+
+    def __len__(self) -> int:
+        return len(self.base.matrix()[1])
+
+    # ---- 인덱스 관리 ----
+    def _sync(self, mat: Optional[np.ndarray] = None, block: bool = False):
+        """
+        저장소에 새로 추가된 행을 인덱스에 반영 (필요시 학습/재학습)
+
+        :param block: True 면 학습을 이 스레드에서 끝까지 수행 (시작 시 미리 만들기/벤치마크용)
+        """
+        if mat is None:
+            mat = self.base.matrix()[0]
+        n = len(mat)
+        if n < self.min_train:
+            return
+        index = self.index
+        if not index.is_trained or n >= index.trained_n * self.retrain_factor:
+            if block:
+                self._train(mat, self._gen)
+                index = self.index
+            elif self._trainer is None:
+                # 행 수가 배수로 늘 때마다 하는 재학습은 인증 스레드(프레임 경로) 밖에서
+                self._trainer = threading.Thread(target=self._train, args=(mat, self._gen), daemon=True,
+                                                 name="ann-train")
+                self._trainer.start()
+        if index.is_trained and n > index.ntotal:
+            index.add(mat, index.ntotal)
+
+    def _train(self, mat: np.ndarray, gen: int):
+        index = IVFIndex(nlist=self.nlist, nprobe=self.index.nprobe)
+        index.train(mat)
+        with self._lock:
+            if gen == self._gen:
+                self.index = index
+                self.stats["trains"] += 1
+            if self._trainer is threading.current_thread():
+                self._trainer = None
+
+    def build(self):
+        """현재 갤러리로 인덱스를 즉시 학습 (학습이 끝날 때까지 대기)"""
+        self._sync(block=True)
+
+    def best_match(self, emb: np.ndarray, thr: Optional[float] = None) -> Tuple[Optional[int], float]:
+        mat, row_uid = self.base.matrix()
+        self._sync(mat)
+        index = self.index
+        if not index.is_trained:
+            self.stats["exact"] += 1
+            return self.base.best_match(emb)
+
+        q = emb.astype(np.float32, copy=False)
+        i, sim = index.search(q, lambda rows: self.base.similarities(q, rows))
+        # 근사 유사도는 하한이므로 임계값을 확실히 넘지 못하면 정확 탐색 (thr 가 없으면 거절 판정이 없으므로 근사값 사용)
+        if i < 0 or (thr is not None and sim < thr + self.borderline):
+            self.stats["exact_fallback"] += 1
+            return self.base.best_match(emb)
+        self.stats["ann"] += 1
+        return int(row_uid[i]), sim
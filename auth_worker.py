@@ -1,32 +1,155 @@
 # auth_worker.py
-import time, queue, numpy as np
+import time, queue, threading, numpy as np
 from dataclasses import dataclass, field
 from typing import Optional, List, Tuple, Dict
+from pipeline_runner import Edge, offer
+from pipeline_metrics import stage_enter, stage_exit
+from trace_recorder import (tracer, DEBUG, INFO, EV_AUTH_UNKNOWN, EV_AUTH_MATCH, EV_AUTH_ENROLL, EV_AUTH_ABSENT,
+                            EV_AUTH_LOGIN)
 
 @dataclass
 class PipelineData:
     frame: Optional[np.ndarray] = None
+    frame_seq: int = -1
+    timestamp: float = field(default_factory=time.time)
+    source_index: int = -1
+    source_timestamp: float = 0.0
     face_vectors: List[List[float]] = field(default_factory=list)
     bbox_coords: List[Tuple[int,int,int,int]] = field(default_factory=list)
+    reused: bool = False
     current_user_id: Optional[int] = None
     is_calibration_needed: bool = False
     current_posture_status: str = "unknown"
+    recalibration_suggested: bool = False
+    calibration_gen: int = 0
+    calibration_reset_gen: int = 0
+    stage_times: Dict[str, List[float]] = field(default_factory=dict)
 
-webcam_to_feature_queue = queue.Queue(maxsize=1)
-feature_to_auth_queue  = queue.Queue(maxsize=1)
-auth_to_engine_queue   = queue.Queue(maxsize=1)
+# 최신 값만 유지하는 엣지 (PipelineRunner.edge_stats 와 같은 형식으로 버린 수 확인 가능)
+webcam_to_feature_queue = Edge("webcam_to_feature")
+feature_to_auth_queue  = Edge("feature_to_auth")
+auth_to_engine_queue   = Edge("auth_to_engine")
 
 #DB가 아닌 메모리로 저장중 (나중에 바꿔야함)
 class InMemoryUserStore:
-    def __init__(self):
+    persistent = False  # 재시작하면 user_id 를 1부터 다시 매김 (사용자별 기준 캐시를 쓰면 안 됨)
+    # 갤러리 저장 형식: float32(기본, 매칭 속도 기준), float16, int8(행별 scale)
+    # 양자화 모드는 메모리 전용 옵션이다. NumPy 에는 int8/float16 행렬곱의 BLAS 경로가 없어서
+    # (int32 누적 정수 내적은 20k 행 기준 약 5ms, einsum 도 약 2ms) 캐시에 들어가는 블록씩 float32 로 올려 BLAS 로 계산한다.
+    # 20k x 128 기준 쿼리당 float32 0.6ms, int8 약 0.8ms(1024행 블록), float16 약 7~8ms (반정밀도 변환 비용)
+    DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+    # float32 로 올려 계산할 행 블록 크기: int8 은 L2 에 들어가는 크기가 가장 빠르고, float16 은 변환 비용이 커서 큰 블록
+    SCORE_CHUNK = {"float16": 8192, "int8": 1024}
+
+    def __init__(self, init_capacity: int = 64, dtype: str = "float32"):
+        if dtype not in self.DTYPES:
+            raise ValueError(f"지원하지 않는 dtype: {dtype} (가능: {list(self.DTYPES)})")
+        self.dtype = dtype
+        # 원본 임베딩 dict 는 float32 모드에서만 유지 (양자화 모드는 메모리 절약을 위해 행렬만 보관)
         self.user_embs: Dict[int, List[np.ndarray]] = {}
         self.next_id = 1
+        # 매칭용 갤러리: 정규화된 행렬 + 행→user_id 인덱스 (용량 2배씩 증가)
+        self._cap = max(1, int(init_capacity))
+        self._mat: Optional[np.ndarray] = None
+        self._scale: Optional[np.ndarray] = None  # int8 모드의 행별 scale
+        self._row_uid = np.empty(self._cap, dtype=np.int64)
+        self._n = 0
+        # 병합된 사용자 id → 남은 id (GalleryCompactor 가 채움)
+        self.id_remap: Dict[int, int] = {}
     def next_user_id(self) -> int:
         uid = self.next_id; self.next_id += 1; return uid
+    def resolve(self, uid: Optional[int]) -> Optional[int]:
+        """병합으로 사라진 id 를 현재 id 로 변환"""
+        while uid in self.id_remap: uid = self.id_remap[uid]
+        return uid
+    def rewrite(self, uids, embs: np.ndarray, remap: Optional[Dict[int, int]] = None):
+        """갤러리 전체를 (uids, embs) 로 교체 (압축/병합 결과 반영용)"""
+        self.user_embs = {}
+        self._cap = max(64, len(uids))
+        self._mat, self._scale = None, None
+        self._row_uid = np.empty(self._cap, dtype=np.int64)
+        self._n = 0
+        for uid, emb in zip(uids, embs):
+            self.add_embedding(int(uid), emb)
+        if remap:
+            self.id_remap.update(remap)
+            self.id_remap = {k: self.resolve(v) for k, v in self.id_remap.items()}
     def add_embedding(self, uid: int, emb: np.ndarray):
-        self.user_embs.setdefault(uid, []).append(emb.astype(np.float32))
+        emb = emb.astype(np.float32)
+        if self.dtype == "float32":
+            self.user_embs.setdefault(uid, []).append(emb)
+        self._append_row(uid, l2n(emb.ravel()))
     def all(self) -> Dict[int, List[np.ndarray]]:
-        return self.user_embs
+        if self.dtype == "float32":
+            return self.user_embs
+        out: Dict[int, List[np.ndarray]] = {}
+        for i, uid in enumerate(self._row_uid[:self._n].tolist()):
+            out.setdefault(uid, []).append(self._dequantize(i, i + 1)[0])
+        return out
+    def _append_row(self, uid: int, row: np.ndarray):
+        if self._mat is None:
+            self._mat = np.empty((self._cap, row.shape[0]), dtype=self.DTYPES[self.dtype])
+            if self.dtype == "int8":
+                self._scale = np.empty(self._cap, dtype=np.float32)
+        if self._n == self._cap:
+            self._cap *= 2
+            mat = np.empty((self._cap, self._mat.shape[1]), dtype=self._mat.dtype)
+            mat[:self._n] = self._mat[:self._n]
+            row_uid = np.empty(self._cap, dtype=np.int64)
+            row_uid[:self._n] = self._row_uid[:self._n]
+            self._mat, self._row_uid = mat, row_uid
+            if self._scale is not None:
+                scale = np.empty(self._cap, dtype=np.float32)
+                scale[:self._n] = self._scale[:self._n]
+                self._scale = scale
+        if self.dtype == "int8":
+            sc = float(np.max(np.abs(row))) / 127.0 or 1.0
+            self._mat[self._n] = np.clip(np.rint(row / sc), -127, 127).astype(np.int8)
+            self._scale[self._n] = sc
+        else:
+            self._mat[self._n] = row
+        self._row_uid[self._n] = uid
+        self._n += 1
+    def _dequantize(self, start: int, stop: int) -> np.ndarray:
+        rows = self._mat[start:stop].astype(np.float32)
+        if self._scale is not None:
+            rows *= self._scale[start:stop, None]
+        return rows
+    def matrix(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(정규화된 임베딩 행렬 (N, D), 행별 user_id (N,)) 뷰를 반환
+        int8 모드의 행렬은 scale 이 곱해지지 않은 값이므로 점수 계산은 similarities() 사용"""
+        if self._mat is None:
+            return np.empty((0, 0), dtype=np.float32), self._row_uid[:0]
+        return self._mat[:self._n], self._row_uid[:self._n]
+    def nbytes(self) -> int:
+        """갤러리 행렬(+scale, user_id) 이 차지하는 바이트 수 (사용 중인 행 기준)"""
+        if self._mat is None: return 0
+        n = self._n * (self._mat.shape[1] * self._mat.itemsize + self._row_uid.itemsize)
+        return n + (self._n * 4 if self._scale is not None else 0)
+    def similarities(self, emb: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """정규화된 emb 와 갤러리 행(rows 가 None 이면 전체)의 코사인 유사도 (float32)"""
+        q = emb.astype(np.float32, copy=False)
+        mat = self._mat[:self._n] if rows is None else self._mat[rows]
+        if mat.dtype == np.float32:
+            sims = mat @ q
+        else:
+            # 양자화 행렬은 블록 단위로만 float32 로 올려 계산 (전체 역양자화 사본을 만들지 않음)
+            sims = np.empty(len(mat), dtype=np.float32)
+            chunk = self.SCORE_CHUNK[self.dtype]
+            for s in range(0, len(mat), chunk):
+                sims[s:s + chunk] = mat[s:s + chunk].astype(np.float32) @ q
+        if self._scale is not None:
+            sims *= self._scale[:self._n] if rows is None else self._scale[rows]
+        return sims
+    def best_match(self, emb: np.ndarray, thr: Optional[float] = None) -> Tuple[Optional[int], float]:
+        """정규화된 emb 와 가장 유사한 (user_id, 코사인 유사도). 갤러리가 비면 (None, -1.0)
+        thr 는 근사 탐색 저장소(AnnUserStore)용 힌트이며 정확 탐색에서는 사용하지 않음"""
+        if self._n == 0:
+            return None, -1.0
+        sims = self.similarities(emb)
+        # 사용자별 max 중 최댓값 == 전체 행 중 최댓값
+        i = int(np.argmax(sims))
+        return int(self._row_uid[i]), float(sims[i])
 
 def l2n(v: np.ndarray) -> np.ndarray:
     v = v.astype(np.float32); n = np.linalg.norm(v) + 1e-9; return v / n
@@ -43,7 +166,8 @@ class AuthWorker:
                  unknown_streak_for_enroll: int = 15,
                  samples_per_user: int = 4,
                  store: Optional[InMemoryUserStore] = None,
-                 calib_frames: int = 2):   #캘리브레이션 신호 유지 프레임 수
+                 calib_frames: int = 2,    #캘리브레이션 신호 유지 프레임 수
+                 compactor=None):          #GalleryCompactor (선택, store 와 같은 저장소를 대상으로 생성)
         self.in_q = in_q
         self.out_q = out_q
         self.absent_thr = absence_threshold_sec
@@ -53,6 +177,7 @@ class AuthWorker:
         self.N_SAMPLES = samples_per_user
         self.store = store or InMemoryUserStore()
         self.CALIB_FRAMES = max(1, int(calib_frames))
+        self.compactor = compactor
 
         self.current_user_id: Optional[int] = None
         self.last_seen_ts = 0.0
@@ -61,64 +186,90 @@ class AuthWorker:
         self.enroll_uid: Optional[int] = None
         self.enroll_buf: List[np.ndarray] = []
         self._calib_left = 0
+        # 캘리브레이션 요청 세대: 요청마다 1 증가하고 모든 출력에 실림.
+        # is_calibration_needed 는 CALIB_FRAMES 개 출력에만 서므로 LATEST 엣지에서 버려질 수 있지만 세대는 남는다
+        self.calib_gen = 0
+        # 명시적 재캘리브레이션 세대: 로그인/등록과 달리 저장된 기준도 버리라는 뜻이라 따로 센다
+        self.calib_reset_gen = 0
+
+    def request_calibration(self):
+        # 외부(클라이언트 /calibrate_reset) 요청으로 캘리브레이션 신호를 다시 내보냄
+        self.calib_reset_gen += 1
+        self._signal_calibration()
+
+    def _signal_calibration(self):
+        self._calib_left = self.CALIB_FRAMES
+        self.calib_gen += 1
 
     def _best_match(self, emb: np.ndarray) -> Tuple[Optional[int], float]:
-        best_uid, best_sim = None, -1.0
-        for uid, embs in self.store.all().items():
-            if not embs: continue
-            s = max(cos(emb, e) for e in embs)
-            if s > best_sim:
-                best_sim, best_uid = s, uid
+        best_uid, best_sim = self.store.best_match(emb, thr=self.MATCH_THR)
         return (best_uid if best_sim >= self.MATCH_THR else None), best_sim
 
     def _start_enroll(self):
         self.enrolling = True
         self.enroll_uid = self.store.next_user_id()
         self.enroll_buf = []
-        print(f"[AUTH] 등록 시작 user_{self.enroll_uid}")
+        tracer.record(EV_AUTH_ENROLL, INFO, aux=-self.enroll_uid)
 
     def _commit_enroll(self):
         mean_emb = l2n(np.mean(np.stack(self.enroll_buf), axis=0))
         self.store.add_embedding(self.enroll_uid, mean_emb)
-        print(f"[AUTH] 등록 완료 user_{self.enroll_uid} (샘플 {len(self.enroll_buf)})")
+        tracer.record(EV_AUTH_ENROLL, INFO, aux=self.enroll_uid)
         self.current_user_id = self.enroll_uid
         self.last_seen_ts = time.time()
         self.unknown_streak = 0
         self.enrolling = False
         self.enroll_uid = None
         self.enroll_buf = []
-        self._calib_left = self.CALIB_FRAMES
+        self._signal_calibration()
         return True
 
     def _put_latest(self, pdata: PipelineData):
-        try: self.out_q.get_nowait()
-        except queue.Empty: pass
-        self.out_q.put_nowait(pdata)
+        pdata.calibration_gen = self.calib_gen
+        pdata.calibration_reset_gen = self.calib_reset_gen
+        stage_exit(pdata, "auth")
+        offer(self.out_q, pdata)
+
+    def _maybe_compact(self):
+        # 입력이 없는 유휴 시간에만 갤러리 압축 (매칭과 같은 스레드라 저장소 동시 접근 없음)
+        if self.compactor is None or self.enrolling: return
+        report = self.compactor.maybe_compact()
+        if report is None: return
+        print(f"[AUTH] 갤러리 압축: 사용자 {report['users_before']}→{report['users_after']}, "
+              f"행 {report['rows_before']}→{report['rows_after']}, 병합 {report['merged']}")
+        if self.current_user_id is not None:
+            self.current_user_id = self.store.resolve(self.current_user_id)
 
-    def run_forever(self, poll=0.2):
+    def run_forever(self, poll=0.2, stop_event: Optional[threading.Event] = None):
         print("[AUTH] start")
-        while True:
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
             try:
                 p: PipelineData = self.in_q.get(timeout=poll)
             except queue.Empty:
                 # 부재 체크
                 if self.current_user_id and (time.time() - self.last_seen_ts) > self.absent_thr:
-                    print(f"[AUTH] 부재 user_{self.current_user_id}")
+                    tracer.record(EV_AUTH_ABSENT, INFO, aux=self.current_user_id)
                     self.current_user_id = None
                     self._put_latest(PipelineData(current_user_id=None, is_calibration_needed=False))
+                self._maybe_compact()
                 continue
 
-            out = PipelineData(frame=p.frame)
+            out = PipelineData(frame=p.frame, frame_seq=p.frame_seq, bbox_coords=p.bbox_coords,
+                               timestamp=p.timestamp, source_index=p.source_index,
+                               source_timestamp=p.source_timestamp, stage_times=dict(p.stage_times))
+            stage_enter(out, "auth")
 
             if not p.face_vectors:
                 # 얼굴 없음 → 부재 전이
                 if self.current_user_id and (time.time() - self.last_seen_ts) > self.absent_thr:
-                    print(f"[AUTH] 부재 user_{self.current_user_id}")
+                    tracer.record(EV_AUTH_ABSENT, INFO, out.frame_seq, aux=self.current_user_id)
                     self.current_user_id = None
                 out.current_user_id = self.current_user_id
                 out.is_calibration_needed = (self._calib_left > 0)
                 if self._calib_left > 0: self._calib_left -= 1
                 self._put_latest(out)
+                self._maybe_compact()
                 continue
 
             # 가장 큰 얼굴 선택
@@ -136,9 +287,10 @@ class AuthWorker:
 
             emb = l2n(np.array(p.face_vectors[idx], dtype=np.float32))
 
-            # 등록 수집 중
+            # 등록 수집 중 (재전송된 직전 결과는 같은 샘플이므로 모으지 않음)
             if self.enrolling:
-                self.enroll_buf.append(emb)
+                if not p.reused:
+                    self.enroll_buf.append(emb)
                 self.last_seen_ts = time.time()
                 trig = False
                 if len(self.enroll_buf) >= self.N_SAMPLES:
@@ -152,23 +304,27 @@ class AuthWorker:
             # 매칭 시도
             uid, best_sim = self._best_match(emb)
             if uid is not None:
+                if self.compactor is not None and not p.reused:
+                    self.compactor.observe(uid, emb, best_sim)
                 trig = (uid != self.current_user_id) or ((time.time() - self.last_seen_ts) > self.absent_thr)
                 self.current_user_id = uid
                 self.last_seen_ts = time.time()
                 self.unknown_streak = 0
+                tracer.record(EV_AUTH_MATCH, DEBUG, out.frame_seq, similarity=best_sim, aux=uid)
                 if trig:
-                    print(f"[AUTH] 로그인/재인식 user_{uid} -> 캘리브레이션 (sim={best_sim:.3f})")
-                    self._calib_left = self.CALIB_FRAMES
+                    tracer.record(EV_AUTH_LOGIN, INFO, out.frame_seq, similarity=best_sim, aux=uid)
+                    self._signal_calibration()
                 out.current_user_id = uid
                 out.is_calibration_needed = (self._calib_left > 0)
                 if self._calib_left > 0: self._calib_left -= 1
                 self._put_latest(out)
                 continue
 
-            # Unknown → 자동등록 후보
-            self.unknown_streak += 1
-            print(f"[AUTH] Unknown streak={self.unknown_streak} best_sim={best_sim:.3f}")
-            if (self.unknown_streak >= self.N_STREAK):
+            # Unknown → 자동등록 후보 (재전송된 직전 결과는 연속 횟수/등록 샘플로 세지 않음)
+            if not p.reused:
+                self.unknown_streak += 1
+                tracer.record(EV_AUTH_UNKNOWN, INFO, out.frame_seq, similarity=best_sim, aux=self.unknown_streak)
+            if not p.reused and self.unknown_streak >= self.N_STREAK:
                 self._start_enroll()
                 self.enroll_buf.append(emb)
                 self.last_seen_ts = time.time()
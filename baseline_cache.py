@@ -0,0 +1,189 @@
+"""
+사용자별 자세 기준(Baseline) 캐시.
+캘리브레이션 결과를 current_user_id 별로 디스크(JSON)에 저장해 두고 시작할 때 읽어 와서,
+다시 인식된 사용자는 "가만히 계세요" 캘리브레이션 없이 첫 프레임부터 자세 판정을 받습니다.
+
+- 항목 필드는 백엔드 calibration_baselines 테이블(box_x, box_y, box_w, box_h, face_scale, updated_at)에
+  코 좌표와 캘리브레이션 당시 프레임 크기를 더한 것입니다.
+- 카메라 해상도가 바뀌면 프레임 크기 비율로 박스/코 좌표를 다시 맞춥니다.
+- user_id 가 재시작 후에도 같은 사람을 가리켜야 하므로 영속 갤러리(MmapUserStore)와 함께 써야 합니다.
+  갤러리 압축으로 병합된 id 의 항목은 remap(store.resolve) 로 남은 id 에 옮깁니다.
+- DriftMonitor 는 캐시 기준으로 판정하는 동안, 사용자가 가만히 있는데도 얼굴 전체가 기준에서 크게 옮겨졌거나
+  (카메라/자리 이동) 크기가 자세 변화로 볼 수 없을 만큼 달라졌으면 드리프트로 알려 줍니다.
+  고개 방향(박스 안 코 위치)이 달라진 경우는 자세 변화이므로 판정하지 않습니다.
+  크게 앞으로 숙이거나 뒤로 기댄 자세도 같은 모양이므로 드리프트만으로 바로 재캘리브레이션하지 않습니다
+  (확정 조건은 posture_stage.PostureStage 참고). 세션마다 드리프트가 보이면 note_drift() 로 연속 세션 수를 남깁니다.
+- 세션 시작 직후 위치는 그대로이고 크기만 달라졌으면 카메라 거리가 바뀐 것으로 보고 rescale_baseline() 으로
+  기준을 프레임 중심 기준으로 확대/축소합니다 (해상도 변경은 get() 이 프레임 크기 비율로 맞춤).
+"""
+import json
+import math
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from is_stable import StabilityDetector
+from posture_classifier import Baseline
+
+
+class BaselineCache:
+    def __init__(self, path: str = "calibration_baselines.json"):
+        """
+        :param path: 캐시 파일 (없으면 빈 캐시로 시작, 저장 시 생성)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries: Dict[int, dict] = {}
+        self.load()
+
+    def load(self) -> int:
+        """디스크의 캐시를 읽어 옴 (시작 시 워밍). :return: 읽은 사용자 수"""
+        if not os.path.exists(self.path):
+            return 0
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                raw = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"BaselineCache: {self.path} 읽기 실패, 빈 캐시로 시작: {e}")
+            return 0
+        with self._lock:
+            self.entries = {int(uid): e for uid, e in raw.items()}
+        print(f"BaselineCache: 사용자 {len(self.entries)}명의 기준 로드 ({self.path})")
+        return len(self.entries)
+
+    def save(self):
+        """임시 파일에 쓴 뒤 os.replace 로 교체"""
+        with self._lock:
+            data = {str(uid): e for uid, e in self.entries.items()}
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1)
+        os.replace(tmp, self.path)
+
+    def get(self, uid: int, frame_size: Tuple[int, int]) -> Optional[Baseline]:
+        """
+        :param frame_size: 현재 프레임 (width, height). 저장 당시와 다르면 비율에 맞춰 좌표 변환
+        """
+        with self._lock:
+            e = self.entries.get(uid)
+        if e is None:
+            return None
+        sx, sy = frame_size[0] / e["frame_w"], frame_size[1] / e["frame_h"]
+        box = (round(e["box_x"] * sx), round(e["box_y"] * sy), round(e["box_w"] * sx), round(e["box_h"] * sy))
+        return Baseline(box, (round(e["nose_x"] * sx), round(e["nose_y"] * sy)))
+
+    def put(self, uid: int, baseline: Baseline, frame_size: Tuple[int, int], save: bool = True):
+        (x, y, w, h), (nx, ny) = baseline.box, baseline.nose
+        with self._lock:
+            self.entries[uid] = {"box_x": int(x), "box_y": int(y), "box_w": int(w), "box_h": int(h),
+                                 "nose_x": int(nx), "nose_y": int(ny), "face_scale": 1.0,
+                                 "frame_w": int(frame_size[0]), "frame_h": int(frame_size[1]),
+                                 "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        if save:
+            self.save()
+
+    def invalidate(self, uid: int, save: bool = True):
+        with self._lock:
+            removed = self.entries.pop(uid, None) is not None
+        if removed and save:
+            self.save()
+
+    def remap(self, resolve) -> int:
+        """
+        병합으로 사라진 id 의 항목을 남은 id 로 옮김 (남은 id 에도 항목이 있으면 더 최근 것을 유지)
+        :param resolve: 갤러리 store.resolve
+        :return: 옮긴 항목 수
+        """
+        with self._lock:
+            moved = [uid for uid in self.entries if resolve(uid) != uid]
+            for uid in moved:
+                e, dst = self.entries.pop(uid), resolve(uid)
+                cur = self.entries.get(dst)
+                if cur is None or e["updated_at"] > cur["updated_at"]:
+                    self.entries[dst] = e
+        if moved:
+            self.save()
+        return len(moved)
+
+    def note_drift(self, uid: int, save: bool = True) -> int:
+        """드리프트가 보인 세션을 하나 더 셈 (put/clear_drift 하면 0부터). :return: 연속 세션 수"""
+        with self._lock:
+            e = self.entries.get(uid)
+            if e is None:
+                return 0
+            n = e["drift_sessions"] = e.get("drift_sessions", 0) + 1
+        if save:
+            self.save()
+        return n
+
+    def clear_drift(self, uid: int, save: bool = True):
+        """기준에 맞게 시작한 세션: 드리프트 연속 기록을 끊음"""
+        with self._lock:
+            e = self.entries.get(uid)
+            changed = e is not None and e.pop("drift_sessions", 0) > 0
+        if changed and save:
+            self.save()
+
+    def __contains__(self, uid) -> bool:
+        return uid in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+def rescale_baseline(baseline: Baseline, box, frame_size: Tuple[int, int]) -> Baseline:
+    """
+    카메라 거리만 바뀐 경우의 기준 보정: 얼굴 크기 비율의 제곱근만큼 프레임 중심 기준으로 박스/코 좌표를 확대/축소
+    :param box: 현재 (가만히 있는) 얼굴 박스
+    """
+    s = math.sqrt(box[2] * box[3] / max(baseline.area, 1.0))
+    cx, cy = frame_size[0] / 2, frame_size[1] / 2
+    bx, by, bw, bh = baseline.box
+    nx, ny = baseline.nose
+    return Baseline((round(cx + (bx - cx) * s), round(cy + (by - cy) * s), round(bw * s), round(bh * s)),
+                    (round(cx + (nx - cx) * s), round(cy + (ny - cy) * s)))
+
+
+class DriftMonitor:
+    def __init__(self, stable_sec: float = 5.0, max_shift: float = 0.5, min_scale: float = 0.6,
+                 max_scale: float = 1.6, head_tol: float = 0.1, start_sec: float = 30.0):
+        """
+        :param stable_sec: 이 시간 동안 가만히 있는 상태에서만 비교 (움직이는 중의 자세 변화는 무시)
+        :param max_shift: 얼굴 박스 중심 이동이 기준 박스 너비 × 이 값보다 크면 드리프트
+        :param min_scale: 얼굴 크기 비율이 이보다 작거나 (자세 "L" 기준 0.9 보다 훨씬 작음)
+        :param max_scale: 이보다 크면 드리프트
+        :param head_tol: 박스 안 코의 상대 위치가 기준과 이만큼(박스 크기 대비) 이상 다르면 고개 방향 변화로 보고 제외
+        :param start_sec: 캐시 기준으로 세션을 시작한 뒤 이 시간 안의 드리프트는 카메라/자리 이동으로 봄
+        """
+        self.max_shift = max_shift
+        self.min_scale = min_scale
+        self.max_scale = max_scale
+        self.head_tol = head_tol
+        self.start_sec = start_sec
+        self.stability = StabilityDetector(window_sec=stable_sec)
+        self.last_shift = 0.0  # 마지막 판정의 중심 이동 (기준 박스 너비 대비)
+        self.last_scale = 1.0  # 마지막 판정의 얼굴 크기 비율
+
+    def reset(self):
+        self.stability.reset()
+
+    def update(self, ts: float, box, nose, baseline: Baseline) -> Optional[bool]:
+        """:return: 기준에서 크게 벗어났으면 True, 맞으면 False, 움직이는 중/고개를 돌린 상태라 판정할 수 없으면 None"""
+        if not self.stability.update(ts, nose, (box[2], box[3])):
+            return None
+        bx, by, bw, bh = baseline.box
+        x, y, w, h = box
+        # 박스 안 코의 상대 위치 (고개 방향)
+        rel = ((nose[0] - x) / max(w, 1), (nose[1] - y) / max(h, 1))
+        base_rel = ((baseline.nose[0] - bx) / max(bw, 1), (baseline.nose[1] - by) / max(bh, 1))
+        if abs(rel[0] - base_rel[0]) > self.head_tol or abs(rel[1] - base_rel[1]) > self.head_tol:
+            return None
+        shift = max(abs((x + w / 2) - (bx + bw / 2)), abs((y + h / 2) - (by + bh / 2)))
+        self.last_shift = shift / max(bw, 1)
+        self.last_scale = (w * h) / max(baseline.area, 1.0)
+        return self.last_shift > self.max_shift or not (self.min_scale <= self.last_scale <= self.max_scale)
+
+    def distance_only(self) -> bool:
+        """마지막 드리프트가 위치는 그대로이고 크기만 달라진 것 (카메라 거리 변화)"""
+        return self.last_shift <= self.max_shift
@@ -0,0 +1,87 @@
+"""
+ANN(IVF) 매칭 재현율/지연 벤치마크.
+AnnUserStore 의 근사 탐색 결과를 정확 탐색(InMemoryUserStore.best_match)과 비교합니다.
+
+합성 갤러리: 사용자마다 중심 벡터를 두고 중심 + 잡음으로 임베딩을 생성합니다.
+쿼리의 절반은 등록 사용자, 절반은 미등록 사용자입니다.
+
+실행: python bench_ann_index.py [--embeddings 100000] [--nprobe 1 4 8 16 32]
+"""
+import argparse
+import time
+import numpy as np
+
+from auth_worker import InMemoryUserStore, l2n
+from ann_index import AnnUserStore
+
+
+def make_gallery(n_embs: int, dim: int, per_user: int, noise: float, rng):
+    n_users = max(1, n_embs // per_user)
+    centers = rng.standard_normal((n_users, dim)).astype(np.float32)
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+    uids = np.repeat(np.arange(1, n_users + 1), per_user)[:n_embs]
+    embs = centers[uids - 1] + noise * rng.standard_normal((len(uids), dim)).astype(np.float32) / np.sqrt(dim)
+    return centers, uids, embs
+
+
+def make_queries(centers, n_queries: int, noise: float, rng):
+    dim = centers.shape[1]
+    known = centers[rng.integers(0, len(centers), n_queries // 2)]
+    unknown = rng.standard_normal((n_queries - len(known), dim)).astype(np.float32)
+    unknown /= np.linalg.norm(unknown, axis=1, keepdims=True)
+    q = np.concatenate([known, unknown]) + noise * rng.standard_normal((n_queries, dim)).astype(np.float32) / np.sqrt(dim)
+    return [l2n(v) for v in q]
+
+
+def run(store, queries, thr):
+    out, t0 = [], time.perf_counter()
+    for q in queries:
+        out.append(store.best_match(q, thr=thr))
+    return out, (time.perf_counter() - t0) / len(queries) * 1000.0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--embeddings", type=int, default=100000)
+    ap.add_argument("--dim", type=int, default=128)
+    ap.add_argument("--per-user", type=int, default=4)
+    ap.add_argument("--noise", type=float, default=0.6)
+    ap.add_argument("--queries", type=int, default=500)
+    ap.add_argument("--thr", type=float, default=0.63)
+    ap.add_argument("--borderline", type=float, default=0.05)
+    ap.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    centers, uids, embs = make_gallery(args.embeddings, args.dim, args.per_user, args.noise, rng)
+    queries = make_queries(centers, args.queries, args.noise, rng)
+
+    exact = InMemoryUserStore(init_capacity=len(uids))
+    for uid, e in zip(uids.tolist(), embs):
+        exact.add_embedding(uid, e)
+    ann = AnnUserStore(base=exact, borderline=args.borderline, min_train=min(4096, len(uids)))
+    t0 = time.perf_counter()
+    ann.build()
+    print(f"gallery={len(uids)} users={len(centers)} nlist={len(ann.index.lists)} "
+          f"train={(time.perf_counter() - t0) * 1000.0:.1f}ms")
+
+    ref, exact_ms = run(exact, queries, args.thr)
+    ref_dec = [(u if s >= args.thr else None) for u, s in ref]
+    print(f"exact: {exact_ms:.3f} ms/query")
+    print()
+    print(f"{'nprobe':>6} | {'ms/query':>9} | {'speedup':>7} | {'recall@1(known)':>15} | {'decision agree':>14} | {'fallback':>8}")
+    print("-" * 77)
+    for nprobe in args.nprobe:
+        ann.index.nprobe = nprobe
+        ann.stats.update(ann=0, exact_fallback=0)
+        res, ms = run(ann, queries, args.thr)
+        # recall 은 등록 사용자 쿼리(앞 절반)에 대해서만 계산 (미등록 쿼리의 최근접 이웃은 의미 없음)
+        half = len(queries) // 2
+        recall = np.mean([a[0] == b[0] for a, b in zip(res[:half], ref[:half])])
+        agree = np.mean([(u if s >= args.thr else None) == d for (u, s), d in zip(res, ref_dec)])
+        fb = ann.stats["exact_fallback"] / len(queries)
+        print(f"{nprobe:>6} | {ms:>9.3f} | {exact_ms / ms:>6.1f}x | {recall:>15.3f} | {agree:>14.3f} | {fb:>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+AuthWorker 갤러리 매칭 지연 벤치마크.
+기존 방식(사용자별 dict 순회 + cos())과 행렬 방식(InMemoryUserStore.best_match)을 비교합니다.
+
+MmapUserStore 를 열 때 걸리는 시간도 함께 측정합니다.
+
+실행: python bench_auth_match.py [--sizes 10 1000 100000] [--dim 128]
+"""
+import argparse
+import tempfile
+import time
+import numpy as np
+
+from auth_worker import InMemoryUserStore, l2n, cos
+from mmap_user_store import MmapUserStore
+
+
+def legacy_best_match(user_embs, emb):
+    """행렬 도입 이전 AuthWorker._best_match 의 순회 방식"""
+    best_uid, best_sim = None, -1.0
+    for uid, embs in user_embs.items():
+        if not embs: continue
+        s = max(cos(emb, e) for e in embs)
+        if s > best_sim:
+            best_sim, best_uid = s, uid
+    return best_uid, best_sim
+
+
+def build_store(n_embs: int, dim: int, per_user: int = 4, seed: int = 0) -> InMemoryUserStore:
+    rng = np.random.default_rng(seed)
+    store = InMemoryUserStore()
+    uid = store.next_user_id()
+    for i in range(n_embs):
+        if i and i % per_user == 0:
+            uid = store.next_user_id()
+        store.add_embedding(uid, l2n(rng.standard_normal(dim)))
+    return store
+
+
+def bench_mmap_open(n_embs: int, dim: int, per_user: int = 4, seed: int = 0):
+    """n_embs 행짜리 영속 저장소를 만든 뒤 (open ms, 첫 매칭 ms) 측정"""
+    rng = np.random.default_rng(seed)
+    with tempfile.TemporaryDirectory() as d:
+        store = MmapUserStore(d, dim=dim, fsync=False)
+        uids = np.arange(n_embs) // per_user + 1
+        store.add_embeddings(uids, rng.standard_normal((n_embs, dim)).astype(np.float32))
+        del store
+
+        t0 = time.perf_counter()
+        store = MmapUserStore(d, dim=dim)
+        open_ms = (time.perf_counter() - t0) * 1000.0
+        q = l2n(rng.standard_normal(dim))
+        t0 = time.perf_counter()
+        store.best_match(q)
+        first_ms = (time.perf_counter() - t0) * 1000.0
+        assert store.next_id == int(uids.max()) + 1
+        del store
+    return open_ms, first_ms
+
+
+def time_call(fn, queries, min_time=0.2):
+    """쿼리들을 반복 수행하여 1회당 평균 지연(ms)을 반환"""
+    n, t0 = 0, time.perf_counter()
+    while True:
+        for q in queries:
+            fn(q)
+        n += len(queries)
+        el = time.perf_counter() - t0
+        if el >= min_time:
+            return el / n * 1000.0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100000])
+    ap.add_argument("--dim", type=int, default=128)
+    ap.add_argument("--queries", type=int, default=8)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(1)
+    queries = [l2n(rng.standard_normal(args.dim)) for _ in range(args.queries)]
+
+    print(f"{'embeddings':>10} | {'legacy(ms)':>11} | {'matrix(ms)':>11} | {'speedup':>8}")
+    print("-" * 50)
+    for n in args.sizes:
+        store = build_store(n, args.dim)
+        # 결과 일치 확인
+        for q in queries:
+            a, b = legacy_best_match(store.all(), q), store.best_match(q)
+            assert a[0] == b[0] and abs(a[1] - b[1]) < 1e-4, (a, b)
+        legacy_ms = time_call(lambda q: legacy_best_match(store.all(), q), queries[:1])
+        matrix_ms = time_call(store.best_match, queries)
+        print(f"{n:>10} | {legacy_ms:>11.3f} | {matrix_ms:>11.4f} | {legacy_ms / matrix_ms:>7.1f}x")
+
+    print()
+    print(f"{'embeddings':>10} | {'mmap open(ms)':>13} | {'first match(ms)':>15}")
+    print("-" * 46)
+    for n in args.sizes:
+        open_ms, first_ms = bench_mmap_open(n, args.dim)
+        print(f"{n:>10} | {open_ms:>13.3f} | {first_ms:>15.3f}")
+
+
+if __name__ == "__main__":
+    main()
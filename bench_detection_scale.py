@@ -0,0 +1,87 @@
+"""
+축소 감지(detect_scale) 정확도/지연 벤치마크.
+녹화 영상의 각 프레임에 대해 원본 해상도 감지 결과를 기준으로,
+축소 비율별 감지 지연과 재현율/정밀도/평균 IoU 를 출력합니다.
+
+실행: python bench_detection_scale.py --video clip.mp4 [--scales 1.0 0.75 0.5 0.35 0.25] [--fallback]
+"""
+import argparse
+import time
+import cv2
+import numpy as np
+
+from face_encoder import detect_faces
+
+
+def to_xywh(loc):
+    t, r, b, l = loc
+    return (l, t, r - l, b - t)
+
+
+def iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    x1, y1 = max(ax, bx), max(ay, by)
+    x2, y2 = min(ax + aw, bx + bw), min(ay + ah, by + bh)
+    inter = max(0, x2 - x1) * max(0, y2 - y1)
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+def match(ref, pred, thr=0.5):
+    """greedy IoU 매칭 → (일치 수, 일치한 쌍의 IoU 리스트)"""
+    used, ious = set(), []
+    for r in ref:
+        best, best_j = 0.0, -1
+        for j, p in enumerate(pred):
+            if j in used: continue
+            v = iou(r, p)
+            if v > best: best, best_j = v, j
+        if best >= thr:
+            used.add(best_j); ious.append(best)
+    return len(ious), ious
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--video", type=str, required=True)
+    ap.add_argument("--scales", type=float, nargs="+", default=[1.0, 0.75, 0.5, 0.35, 0.25])
+    ap.add_argument("--fallback", action="store_true", help="축소 감지 실패 시 업샘플 재시도 포함")
+    ap.add_argument("--max-frames", type=int, default=300)
+    ap.add_argument("--stride", type=int, default=1)
+    args = ap.parse_args()
+
+    cap = cv2.VideoCapture(args.video)
+    frames, i = [], 0
+    while len(frames) < args.max_frames:
+        ret, frame = cap.read()
+        if not ret: break
+        if i % args.stride == 0:
+            frames.append(cv2.cvtColor(cv2.resize(frame, (640, 480)), cv2.COLOR_BGR2RGB))
+        i += 1
+    cap.release()
+    if not frames:
+        raise SystemExit(f"프레임을 읽을 수 없습니다: {args.video}")
+
+    # 기준: 원본 해상도, 기본 업샘플 (기존 WebcamModule 동작)
+    refs = [[to_xywh(l) for l in detect_faces(f)] for f in frames]
+    n_ref = sum(len(r) for r in refs)
+    print(f"frames={len(frames)} reference faces={n_ref} fallback={args.fallback}")
+    print(f"{'scale':>5} | {'ms/frame':>8} | {'p95 ms':>7} | {'recall':>6} | {'precision':>9} | {'mean IoU':>8}")
+    print("-" * 60)
+    for scale in args.scales:
+        times, tp, n_pred, all_ious = [], 0, 0, []
+        for f, ref in zip(frames, refs):
+            t0 = time.perf_counter()
+            pred = [to_xywh(l) for l in detect_faces(f, scale=scale, upsample_fallback=args.fallback)]
+            times.append((time.perf_counter() - t0) * 1000.0)
+            k, ious = match(ref, pred)
+            tp += k; n_pred += len(pred); all_ious += ious
+        recall = tp / n_ref if n_ref else 1.0
+        precision = tp / n_pred if n_pred else 1.0
+        print(f"{scale:>5.2f} | {np.mean(times):>8.2f} | {np.percentile(times, 95):>7.2f} | {recall:>6.3f} | "
+              f"{precision:>9.3f} | {np.mean(all_ious) if all_ious else 0.0:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
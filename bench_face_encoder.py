@@ -0,0 +1,117 @@
+"""
+얼굴 감지/인코딩 실행기 처리량 벤치마크.
+WebcamModule._processing_loop 의 RECOGNIZING 제출 방식(max_inflight 초과 시 프레임 건너뜀)을 그대로 흉내 내어,
+processing_fps 별로 실행기(serial / process pool)와 인코딩 정책(all / largest)을 비교합니다.
+같은 프로세스에서 60fps 로 도는 가짜 캡처 스레드의 실제 FPS 도 함께 측정합니다 (GIL 경합 확인용).
+
+프레임 소스: --video 파일 (없으면 480x640 합성 프레임, 얼굴 없음 → 감지 비용만 측정)
+
+실행: python bench_face_encoder.py [--video clip.mp4] [--fps 6 15 30] [--workers 3] [--seconds 10]
+"""
+import argparse
+import threading
+import time
+from collections import deque
+import cv2
+import numpy as np
+
+from face_encoder import SerialFaceEncoder, ProcessPoolFaceEncoder, ENCODE_ALL, ENCODE_LARGEST
+
+
+def load_frames(video: str, limit: int = 300):
+    if not video:
+        rng = np.random.default_rng(0)
+        return [rng.integers(0, 255, (480, 640, 3), dtype=np.uint8) for _ in range(8)]
+    cap = cv2.VideoCapture(video)
+    frames = []
+    while len(frames) < limit:
+        ret, frame = cap.read()
+        if not ret: break
+        frames.append(cv2.resize(frame, (640, 480)))
+    cap.release()
+    return frames
+
+
+def fake_capture(stop: threading.Event, counter: list, fps: int = 60):
+    """캡처 스레드 대용: 프레임 복사 + 대기. 달성 FPS 로 GIL 굶주림을 확인"""
+    buf = np.zeros((480, 640, 3), dtype=np.uint8)
+    interval = 1.0 / fps
+    while not stop.is_set():
+        t0 = time.time()
+        _ = buf.copy()
+        counter[0] += 1
+        rest = interval - (time.time() - t0)
+        if rest > 0: time.sleep(rest)
+
+
+def run(encoder, frames, fps: int, seconds: float):
+    stop, cap_count = threading.Event(), [0]
+    cap_thread = threading.Thread(target=fake_capture, args=(stop, cap_count), daemon=True)
+    cap_thread.start()
+
+    pending, latencies = deque(), []
+    submitted = skipped = completed = 0
+    interval = 1.0 / fps
+    t_start = time.time()
+    i = 0
+    while time.time() - t_start < seconds:
+        t0 = time.time()
+        if len(pending) < encoder.max_inflight:
+            rgb = cv2.cvtColor(frames[i % len(frames)], cv2.COLOR_BGR2RGB)
+            pending.append((t0, encoder.submit(rgb)))
+            submitted += 1
+        else:
+            skipped += 1
+        i += 1
+        while pending and pending[0][1].done():
+            ts, fut = pending.popleft()
+            fut.result()
+            latencies.append(time.time() - ts)
+            completed += 1
+        rest = interval - (time.time() - t0)
+        if rest > 0: time.sleep(rest)
+    elapsed = time.time() - t_start
+    for ts, fut in pending:
+        fut.cancel()
+    stop.set(); cap_thread.join()
+    lat = np.array(latencies) * 1000.0 if latencies else np.zeros(1)
+    return {
+        "results_per_sec": completed / elapsed,
+        "skipped": skipped,
+        "lat_p50_ms": float(np.percentile(lat, 50)),
+        "lat_p95_ms": float(np.percentile(lat, 95)),
+        "capture_fps": cap_count[0] / elapsed,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--video", type=str, default=None)
+    ap.add_argument("--fps", type=int, nargs="+", default=[6, 15, 30])
+    ap.add_argument("--workers", type=int, default=0, help="0 이면 CPU 수 - 1")
+    ap.add_argument("--seconds", type=float, default=10.0)
+    args = ap.parse_args()
+
+    frames = load_frames(args.video)
+    configs = [
+        ("serial/all", lambda: SerialFaceEncoder(ENCODE_ALL)),
+        ("serial/largest", lambda: SerialFaceEncoder(ENCODE_LARGEST)),
+        ("pool/all", lambda: ProcessPoolFaceEncoder(args.workers or None, ENCODE_ALL)),
+        ("pool/largest", lambda: ProcessPoolFaceEncoder(args.workers or None, ENCODE_LARGEST)),
+    ]
+    print(f"frames={len(frames)} seconds={args.seconds}")
+    print(f"{'encoder':>15} | {'fps':>3} | {'results/s':>9} | {'skipped':>7} | {'p50 ms':>7} | {'p95 ms':>7} | {'capture fps':>11}")
+    print("-" * 80)
+    for name, make in configs:
+        enc = make()
+        # 워커 프로세스 기동/모델 로딩을 측정에서 제외
+        enc.submit(cv2.cvtColor(frames[0], cv2.COLOR_BGR2RGB)).result()
+        for fps in args.fps:
+            r = run(enc, frames, fps, args.seconds)
+            print(f"{name:>15} | {fps:>3} | {r['results_per_sec']:>9.2f} | {r['skipped']:>7} | "
+                  f"{r['lat_p50_ms']:>7.1f} | {r['lat_p95_ms']:>7.1f} | {r['capture_fps']:>11.1f}")
+        enc.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+양자화 갤러리(float16 / int8) 메모리·정확도 리포트.
+InMemoryUserStore(dtype=...) 별 메모리 사용량, 매칭 지연, 그리고 float32 기준 대비
+매칭/비매칭 판정이 뒤바뀐 횟수를 출력합니다.
+양자화 모드는 메모리 전용 옵션입니다. int8 은 float32 와 비슷한 지연이지만 float16 은 반정밀도 변환 비용으로
+훨씬 느립니다 ("vs f32" 열). 매칭 속도가 중요하면 기본값 float32 를 씁니다.
+
+녹화된 임베딩 사용: --recorded emb.npz (배열 embs (N, D), uids (N,), 선택적으로 queries (M, D))
+없으면 bench_ann_index 의 합성 갤러리를 사용합니다.
+
+실행: python bench_quantized_store.py [--recorded emb.npz] [--thr 0.63]
+"""
+import argparse
+import time
+import numpy as np
+
+from auth_worker import InMemoryUserStore, l2n
+from bench_ann_index import make_gallery, make_queries
+
+
+def load_recorded(path: str, n_queries: int, rng):
+    data = np.load(path)
+    embs, uids = data["embs"].astype(np.float32), data["uids"].astype(np.int64)
+    if "queries" in data:
+        queries = [l2n(q) for q in data["queries"]]
+    else:
+        # 별도 쿼리가 없으면 갤러리 행 일부를 쿼리로 사용
+        queries = [l2n(embs[i]) for i in rng.choice(len(embs), min(n_queries, len(embs)), replace=False)]
+    return uids, embs, queries
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--recorded", type=str, default=None)
+    ap.add_argument("--embeddings", type=int, default=20000)
+    ap.add_argument("--dim", type=int, default=128)
+    ap.add_argument("--queries", type=int, default=2000)
+    ap.add_argument("--noise", type=float, default=0.6)
+    ap.add_argument("--thr", type=float, default=0.63)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.recorded:
+        uids, embs, queries = load_recorded(args.recorded, args.queries, rng)
+    else:
+        centers, uids, embs = make_gallery(args.embeddings, args.dim, 4, args.noise, rng)
+        queries = make_queries(centers, args.queries, args.noise, rng)
+    print(f"gallery={len(uids)} dim={embs.shape[1]} queries={len(queries)} thr={args.thr}")
+
+    results = {}
+    for dtype in InMemoryUserStore.DTYPES:
+        store = InMemoryUserStore(init_capacity=len(uids), dtype=dtype)
+        for uid, e in zip(uids.tolist(), embs):
+            store.add_embedding(uid, e)
+        t0 = time.perf_counter()
+        res = [store.best_match(q) for q in queries]
+        ms = (time.perf_counter() - t0) / len(queries) * 1000.0
+        results[dtype] = (store.nbytes(), ms, res)
+
+    base_bytes, base_ms, base_res = results["float32"]
+    base_dec = [(u if s >= args.thr else None) for u, s in base_res]
+    print()
+    print(f"{'dtype':>8} | {'MB':>8} | {'saving':>6} | {'ms/query':>8} | {'max|dsim|':>9} | "
+          f"{'vs f32':>6} | {'decision flips':>14} | {'match<->no-match':>16}")
+    print("-" * 99)
+    for dtype, (nbytes, ms, res) in results.items():
+        dec = [(u if s >= args.thr else None) for u, s in res]
+        flips = sum(a != b for a, b in zip(dec, base_dec))
+        mflips = sum((a is None) != (b is None) for a, b in zip(dec, base_dec))
+        dsim = max(abs(s - bs) for (_, s), (_, bs) in zip(res, base_res))
+        print(f"{dtype:>8} | {nbytes / 1e6:>8.2f} | {1 - nbytes / base_bytes:>6.1%} | {ms:>8.3f} | {dsim:>9.5f} | "
+              f"{ms / base_ms:>5.1f}x | "
+              f"{flips:>14} | {mflips:>16}")
+
+
+if __name__ == "__main__":
+    main()
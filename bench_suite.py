@@ -0,0 +1,294 @@
+"""
+헤드리스 종단 벤치마크 모음.
+카메라/GUI 없이 녹화 세션 또는 합성 클립으로 아래 항목을 측정하고 JSON 으로 저장합니다.
+
+- webcam  : WebcamModule 처리량 (RECOGNIZING / TRACKING 각각의 처리·추적 FPS 와 프레임당 ms)
+- auth    : AuthWorker 프레임당 인증 지연 (갤러리 크기별)
+- posture : 자세 판정 처리량 (pose_log.csv 크기, 100배 크기)
+- e2e     : 전체 파이프라인 캡처→판정 지연 분위수
+
+--baseline 으로 이전 결과를 주면 같은 항목끼리 비교해, 허용 범위(--tolerance)를 넘게 나빠진 항목이 있으면
+종료 코드 1 을 돌려줍니다. (이름에 _ms 가 들어간 값은 낮을수록, fps/per_sec 는 높을수록 좋은 것으로 봄)
+
+실행: python bench_suite.py [--source sessions/s1] [--only webcam auth] [--out bench.json] [--baseline base.json]
+"""
+import argparse
+import json
+import os
+import platform
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+import cv2
+import numpy as np
+
+from frame_source import ArraySource, open_frame_source
+from pipeline_runner import Edge, FIFO
+
+SUITES = ("webcam", "auth", "posture", "e2e")
+POSE_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pose_log.csv")
+
+
+_synthetic = None
+
+
+def synthetic():
+    """bench_tracker_backends 의 움직이는 사각형 합성 클립 (frames, boxes), 한 번만 생성"""
+    global _synthetic
+    if _synthetic is None:
+        from bench_tracker_backends import synthetic_clip
+        _synthetic = synthetic_clip(300)
+    return _synthetic
+
+
+def make_source(spec: Optional[str], realtime: bool = True, speed: float = 1.0):
+    """--source 가 없으면 합성 클립, 있으면 해당 소스를 반복 재생"""
+    if spec:
+        return open_frame_source(spec, realtime=realtime, speed=speed, loop=True)
+    return ArraySource(synthetic()[0], fps=30.0, realtime=realtime, speed=speed, loop=True)
+
+
+def latency_summary(ms: List[float]) -> dict:
+    """오프라인 측정이므로 히스토그램 근사 대신 표본 그대로 분위수 계산"""
+    if not ms:
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {"count": len(ms), "mean_ms": round(float(np.mean(ms)), 3), "p50_ms": round(float(p50), 3),
+            "p95_ms": round(float(p95), 3), "p99_ms": round(float(p99), 3)}
+
+
+def _drain_stage_ms(q: queue.Queue, samples: Dict[str, List[float]]):
+    while True:
+        try:
+            d = q.get_nowait()
+        except queue.Empty:
+            return
+        for name, (t_in, t_out) in (getattr(d, "stage_times", None) or {}).items():
+            if t_out is not None:
+                samples.setdefault(name, []).append((t_out - t_in) * 1000.0)
+
+
+def bench_webcam(source_spec: Optional[str], seconds: float, capture_fps: int,
+                 bbox: Optional[tuple] = None) -> dict:
+    """
+    처리 스레드를 제한 없이(processing_fps=capture_fps) 돌려 모드별 처리량을 잽니다.
+    TRACKING 은 테스트 모드(감지된 얼굴 자동 추적)로 들어가며, bbox 를 주면 시작하자마자 그 박스를 추적합니다.
+    (합성 클립은 첫 프레임의 사각형 박스)
+    """
+    from webcam_feature_module import WebcamModule
+    if bbox is None and not source_spec:
+        bbox = synthetic()[1][0]
+    results = {}
+    for mode in ("recognizing", "tracking"):
+        out = Edge("bench_out", FIFO, maxsize=100_000)
+        webcam = WebcamModule(source=make_source(source_spec, realtime=False), capture_fps=capture_fps,
+                              processing_fps=capture_fps, tracking_fps=capture_fps,
+                              motion_gate=False)  # ML 처리량 측정이므로 정지 프레임도 추론
+        webcam.set_output_queue(out)
+        samples: Dict[str, List[float]] = {}
+        tracking_ticks = ticks = 0
+        webcam.start()
+        if mode == "tracking":
+            webcam.enable_test_mode(True)
+            if bbox:
+                webcam.start_tracking_request(bbox)
+        t0 = time.time()
+        while time.time() - t0 < seconds:
+            time.sleep(0.05)
+            ticks += 1
+            tracking_ticks += webcam.processing_state == "TRACKING"
+            _drain_stage_ms(out, samples)
+        elapsed = time.time() - t0
+        stats = webcam.get_frame_stats()
+        webcam.stop()
+        _drain_stage_ms(out, samples)
+        results[mode] = {
+            "processing_fps": round(stats["processing_seen"] / elapsed, 2),
+            "tracking_fps": round(stats["tracking_seen"] / elapsed, 2),
+            "capture_fps": round(stats["published"] / elapsed, 2),
+            "tracking_time_ratio": round(tracking_ticks / max(1, ticks), 3),
+            "stages": {k: latency_summary(v) for k, v in samples.items()},
+        }
+        print(f"[webcam] {mode}: {results[mode]}")
+    return results
+
+
+def bench_auth(sizes: List[int], dim: int = 128, frames: int = 300, users: int = 1) -> dict:
+    """
+    갤러리 크기별로 AuthWorker 에 얼굴 벡터가 있는 프레임을 흘려 "auth" 스테이지 시간(매칭 포함)을 잽니다.
+    실제 세션처럼 같은 사용자(users 명을 차례로, 사용자마다 연속 구간)가 계속 앉아 있는 정상 상태 매칭을 재며,
+    사용자가 바뀌는 첫 프레임(로그인/재인식 처리)은 측정에서 뺍니다.
+    """
+    from auth_worker import AuthWorker, PipelineData, l2n
+    from bench_auth_match import build_store
+    rng = np.random.default_rng(2)
+    results = {}
+    for n in sizes:
+        store = build_store(n, dim)
+        mat, _ = store.matrix()
+        centers = mat[rng.choice(len(mat), users, replace=False)].astype(np.float32)
+        block = -(-frames // users)
+        in_q, out_q = Edge("auth_in", FIFO, frames + 1), Edge("auth_out", FIFO, frames + 1)
+        worker = AuthWorker(in_q, out_q, store=store)
+        stop = threading.Event()
+        th = threading.Thread(target=worker.run_forever, kwargs=dict(poll=0.05, stop_event=stop), daemon=True)
+        th.start()
+        ms = []
+        for i in range(frames):
+            q = l2n(centers[i // block] + rng.normal(0, 0.01, dim).astype(np.float32))
+            in_q.put(PipelineData(frame_seq=i, bbox_coords=[(0, 0, 100, 100)], face_vectors=[q.tolist()],
+                                  timestamp=time.time()))
+            d = out_q.get(timeout=10.0)
+            if i % block:
+                t_in, t_out = d.stage_times["auth"]
+                ms.append((t_out - t_in) * 1000.0)
+        stop.set()
+        th.join(timeout=2.0)
+        results[str(n)] = latency_summary(ms)
+        print(f"[auth] gallery={n}: {results[str(n)]}")
+    return results
+
+
+def bench_posture(path: str = POSE_LOG, multipliers=(1, 100), baseline_w: float = 150.0) -> dict:
+    """
+    pose_log.csv 의 dx/dy/scale 을 그대로 (또는 multiplier 배로 이어 붙여) 판정하는 처리량.
+    프레임별 classify() 반복과 classify_batch() 한 번을 비교하고 결과가 같은지 확인합니다.
+    bw 열이 없는 로그는 기준 박스 너비를 baseline_w 로 가정합니다.
+    """
+    from posture_classifier import PostureClassifier, Baseline, LABELS
+    clf = PostureClassifier()
+    log = clf.classify_log(path, default_bw=baseline_w)
+    results = {}
+    for m in multipliers:
+        dx, dy, sc, bw = (np.tile(log[k], m) for k in ("dx", "dy", "scale", "bw"))
+        t0 = time.perf_counter()
+        codes = clf.classify_batch(dx, dy, sc, bw)
+        batch_s = time.perf_counter() - t0
+
+        # 프레임별 판정: 기준 (0,0,bw,100) / 코 (0,0) 에 대해 dx, dy, scale 이 나오도록 박스/코를 구성
+        t0 = time.perf_counter()
+        loop = [clf.classify((0, 0, w, s * 100.0), (x, y), Baseline((0, 0, w, 100), (0, 0))).pose
+                for x, y, s, w in zip(dx.tolist(), dy.tolist(), sc.tolist(), bw.tolist())]
+        loop_s = time.perf_counter() - t0
+        assert loop == [LABELS[c] for c in codes.tolist()], "classify / classify_batch 결과 불일치"
+        results[f"x{m}"] = {"rows": len(codes), "batch_rows_per_sec": round(len(codes) / batch_s, 1),
+                            "loop_rows_per_sec": round(len(codes) / loop_s, 1),
+                            "speedup": round(loop_s / batch_s, 1)}
+        print(f"[posture] x{m}: {results[f'x{m}']}")
+    return results
+
+
+def bench_e2e(source_spec: Optional[str], seconds: float, capture_fps: int = 30) -> dict:
+    """전체 파이프라인을 실시간 속도로 돌려 캡처→판정 종단 지연과 스테이지별 지연을 잽니다"""
+    from pipeline_runner import build_default_pipeline
+    runner = build_default_pipeline(source=make_source(source_spec, realtime=True), capture_fps=capture_fps)
+    runner.start()
+    try:
+        time.sleep(seconds)
+        snap = runner.metrics.snapshot()
+    finally:
+        runner.stop()
+    e2e = {k: v for k, v in snap["e2e"].items() if k != "buckets"}
+    result = {"e2e": e2e, "stages": {k: {"p50_ms": v["p50_ms"], "p95_ms": v["p95_ms"]} for k, v in snap["stages"].items()},
+              "fps": snap.get("fps", {})}
+    print(f"[e2e] {result}")
+    return result
+
+
+def flatten(d: dict, prefix: str = "") -> Dict[str, float]:
+    out = {}
+    for k, v in d.items():
+        key = f"{prefix}.{k}" if prefix else str(k)
+        if isinstance(v, dict):
+            out.update(flatten(v, key))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            out[key] = float(v)
+    return out
+
+
+def _gated(name: str) -> bool:
+    return "_ms" in name or "fps" in name or "per_sec" in name
+
+
+def compare(base: dict, cur: dict, tolerance: float = 0.15, min_abs_ms: float = 0.5,
+            suites: Optional[List[str]] = None) -> List[dict]:
+    """
+    같은 항목끼리 비교해 허용 범위를 넘게 나빠진 항목 목록을 돌려줍니다.
+    기준에 있는 비교 항목이 이번 결과에 없으면 (스위트 누락/실패로 빈 결과) current=None, missing=True 로 함께 돌려줍니다.
+
+    :param tolerance: 상대 허용 범위 (0.15 = 15%)
+    :param min_abs_ms: ms 값은 이만큼 이상 차이날 때만 회귀로 봄 (아주 작은 값의 흔들림 무시)
+    :param suites: 이번에 실행한 스위트 (--only). 여기에 없는 스위트의 기준 항목은 누락으로 보지 않음 (None 이면 전체)
+    """
+    a, b = flatten(base.get("results", base)), flatten(cur.get("results", cur))
+    regressions = []
+    for key in sorted(set(a) - set(b)):
+        if _gated(key.rsplit(".", 1)[-1]) and (suites is None or key.split(".", 1)[0] in suites):
+            regressions.append({"metric": key, "baseline": a[key], "current": None, "change": None, "missing": True})
+    for key in sorted(set(a) & set(b)):
+        name = key.rsplit(".", 1)[-1]
+        old, new = a[key], b[key]
+        if "_ms" in name:
+            worse = new > old * (1 + tolerance) and new - old >= min_abs_ms
+        elif "fps" in name or "per_sec" in name:
+            worse = new < old * (1 - tolerance)
+        else:
+            continue
+        if worse:
+            regressions.append({"metric": key, "baseline": old, "current": new,
+                                "change": round((new - old) / old, 3) if old else None})
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--only", nargs="+", choices=SUITES, default=list(SUITES))
+    ap.add_argument("--source", default=None, help="녹화 세션/영상/이미지 폴더 (없으면 합성 클립)")
+    ap.add_argument("--bbox", type=int, nargs=4, default=None, help="TRACKING 측정 시작 박스 x y w h")
+    ap.add_argument("--seconds", type=float, default=10.0)
+    ap.add_argument("--capture-fps", type=int, default=120, help="webcam 처리량 측정 시 캡처 속도")
+    ap.add_argument("--gallery", type=int, nargs="+", default=[10, 1000, 10000, 100000])
+    ap.add_argument("--pose-log", default=POSE_LOG)
+    ap.add_argument("--out", default="bench_results.json")
+    ap.add_argument("--baseline", default=None, help="비교할 이전 결과 JSON")
+    ap.add_argument("--tolerance", type=float, default=0.15)
+    args = ap.parse_args()
+
+    results = {}
+    if "webcam" in args.only:
+        results["webcam"] = bench_webcam(args.source, args.seconds, args.capture_fps, args.bbox)
+    if "auth" in args.only:
+        results["auth"] = bench_auth(args.gallery)
+    if "posture" in args.only:
+        results["posture"] = bench_posture(args.pose_log)
+    if "e2e" in args.only:
+        results["e2e"] = bench_e2e(args.source, args.seconds)
+
+    report = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "source": args.source or "synthetic",
+              "env": {"python": platform.python_version(), "numpy": np.__version__, "opencv": cv2.__version__,
+                      "machine": platform.machine(), "cpus": os.cpu_count()},
+              "results": results}
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"결과 저장: {args.out}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            base = json.load(f)
+        regressions = compare(base, report, args.tolerance, suites=args.only)
+        for r in regressions:
+            if r.get("missing"):
+                print(f"  누락: {r['metric']}: {r['baseline']:g} → 결과 없음")
+            elif r["change"] is not None:
+                print(f"  회귀: {r['metric']}: {r['baseline']:g} → {r['current']:g} ({r['change']:+.1%})")
+            else:
+                print(f"  회귀: {r['metric']}: {r['baseline']:g} → {r['current']:g}")
+        missing = sum(1 for r in regressions if r.get("missing"))
+        print(f"기준 대비 회귀 {len(regressions) - missing}건, 누락 {missing}건 (허용 {args.tolerance:.0%})")
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
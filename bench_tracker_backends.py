@@ -0,0 +1,132 @@
+"""
+트래커 백엔드 비용/정확도 벤치마크.
+녹화 영상(여러 개 가능)의 첫 프레임 얼굴 박스로 각 백엔드를 초기화하고 끝까지 추적하며,
+갱신 1회 비용(평균/p95), 실패 횟수(실패 시 기준 박스로 재초기화), 기준 박스 대비 평균 IoU 를 출력합니다.
+
+기준 박스: --video 이면 CSRT 추적 결과 (CSRT 와의 일치도), 합성 클립이면 실제 위치.
+auto 는 --budget 별로 실행하며 마지막에 선택된 백엔드와 전환 횟수를 함께 출력합니다.
+
+실행: python bench_tracker_backends.py [--video a.mp4 b.mp4] [--bbox x y w h] [--budget 2 5 8]
+"""
+import argparse
+import time
+import cv2
+import numpy as np
+
+from trackers import BACKENDS, TrackerStats, make_tracker, _cv2_factory, OpenCVTracker
+
+
+def iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    x1, y1 = max(ax, bx), max(ay, by)
+    x2, y2 = min(ax + aw, bx + bw), min(ay + ah, by + bh)
+    inter = max(0, x2 - x1) * max(0, y2 - y1)
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+def synthetic_clip(n: int = 300):
+    """텍스처가 있는 사각형이 원을 그리며 움직이고 크기가 변하는 합성 클립 → (frames, 실제 박스)"""
+    rng = np.random.default_rng(0)
+    bg = cv2.GaussianBlur(rng.integers(0, 255, (480, 640, 3), dtype=np.uint8), (0, 0), 3)
+    patch = rng.integers(0, 255, (120, 120, 3), dtype=np.uint8)
+    frames, boxes = [], []
+    for i in range(n):
+        s = 1.0 + 0.2 * np.sin(i / 40.0)
+        size = int(120 * s)
+        cx = int(320 + 120 * np.cos(i / 30.0))
+        cy = int(240 + 80 * np.sin(i / 30.0))
+        x, y = cx - size // 2, cy - size // 2
+        f = bg.copy()
+        f[y:y + size, x:x + size] = cv2.resize(patch, (size, size))
+        frames.append(f)
+        boxes.append((x, y, size, size))
+    return frames, boxes
+
+
+def load_clip(path: str, limit: int):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < limit:
+        ret, frame = cap.read()
+        if not ret: break
+        frames.append(cv2.resize(frame, (640, 480)))
+    cap.release()
+    return frames
+
+
+def first_face(frame):
+    """첫 프레임 얼굴 박스 (x, y, w, h). face_recognition 이 필요합니다"""
+    from face_encoder import detect_faces
+    locs = detect_faces(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    if not locs:
+        return None
+    t, r, b, l = max(locs, key=lambda l: (l[2] - l[0]) * (l[1] - l[3]))
+    return (l, t, r - l, b - t)
+
+
+def run(name, frames, init_bbox, refs, budget_ms=8.0):
+    stats = TrackerStats()
+    tracker = make_tracker(name, stats, budget_ms)
+    tracker.init(frames[0], init_bbox)
+    times, ious, failures, traj = [], [], 0, [init_bbox]
+    for f, ref in zip(frames[1:], refs[1:]):
+        t0 = time.perf_counter()
+        ok, bbox = tracker.update(f)
+        times.append((time.perf_counter() - t0) * 1000.0)
+        if not ok:
+            # 실패하면 WebcamModule 처럼 새로 초기화 (기준 박스 사용)
+            failures += 1
+            tracker = make_tracker(name, stats, budget_ms)
+            tracker.init(f, ref)
+            bbox = ref
+        bbox = tuple(int(v) for v in bbox)
+        traj.append(bbox)
+        ious.append(iou(bbox, ref))
+    return {
+        "ms_mean": float(np.mean(times)), "ms_p95": float(np.percentile(times, 95)),
+        "failures": failures, "iou": float(np.mean(ious)), "traj": traj,
+        "backend": getattr(tracker, "backend", name), "switches": getattr(tracker, "switches", 0),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--video", type=str, nargs="*", default=[])
+    ap.add_argument("--bbox", type=int, nargs=4, default=None, help="첫 프레임 박스 x y w h (없으면 얼굴 감지)")
+    ap.add_argument("--max-frames", type=int, default=300)
+    ap.add_argument("--budget", type=float, nargs="+", default=[2.0, 5.0, 8.0], help="auto 모드 예산 (ms)")
+    args = ap.parse_args()
+
+    clips = []
+    if args.video:
+        for path in args.video:
+            frames = load_clip(path, args.max_frames)
+            if not frames:
+                raise SystemExit(f"프레임을 읽을 수 없습니다: {path}")
+            bbox = tuple(args.bbox) if args.bbox else first_face(frames[0])
+            if bbox is None:
+                raise SystemExit(f"첫 프레임에서 얼굴을 찾지 못했습니다: {path} (--bbox 지정)")
+            clips.append((path, frames, bbox, None))
+    else:
+        frames, boxes = synthetic_clip(args.max_frames)
+        clips.append(("synthetic", frames, boxes[0], boxes))
+
+    backends = [b for b in BACKENDS if b == "optflow" or _cv2_factory(OpenCVTracker.KINDS[b])]
+    for path, frames, bbox, refs in clips:
+        if refs is None:
+            refs = run("csrt", frames, bbox, [bbox] * len(frames))["traj"]
+        print(f"\n[{path}] frames={len(frames)} init={bbox}")
+        print(f"{'tracker':>12} | {'ms/update':>9} | {'p95 ms':>7} | {'failures':>8} | {'mean IoU':>8} | final")
+        print("-" * 70)
+        configs = [(b, b, 8.0) for b in backends] + [(f"auto@{b:g}ms", "auto", b) for b in args.budget]
+        for label, name, budget in configs:
+            r = run(name, frames, bbox, refs, budget)
+            final = f"{r['backend']} ({r['switches']} switches)" if name == "auto" else ""
+            print(f"{label:>12} | {r['ms_mean']:>9.2f} | {r['ms_p95']:>7.2f} | {r['failures']:>8} | "
+                  f"{r['iou']:>8.3f} | {final}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+얼굴 감지/인코딩 실행기.
+WebcamModule 의 RECOGNIZING 단계에서 face_locations + face_encodings 를 어디서 실행할지 결정합니다.
+
+- SerialFaceEncoder      : 처리 스레드에서 바로 실행 (기존 동작)
+- ProcessPoolFaceEncoder : 별도 프로세스 풀에서 실행. dlib 호출이 GIL 을 잡지 않으므로
+                           캡처 스레드가 굶지 않고, 여러 프레임을 동시에 처리합니다.
+
+두 실행기 모두 submit(rgb_frame) 이 concurrent.futures.Future 를 돌려주며,
+결과는 (face_locations, face_encodings) 입니다 (dlib 형식 (top, right, bottom, left)).
+
+감지는 detect_faces() 로 축소 프레임에서 수행할 수 있으며(detect_scale), 박스는 원본 해상도로
+되돌린 뒤 인코딩합니다.
+"""
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import List, Optional, Tuple
+import cv2
+import numpy as np
+
+import face_recognition
+
+# 인코딩 정책
+ENCODE_ALL = "all"          # 감지된 모든 얼굴 인코딩
+ENCODE_LARGEST = "largest"  # 가장 큰 얼굴 하나만 인코딩 (AuthWorker 는 가장 큰 얼굴만 사용)
+ENCODE_POLICIES = (ENCODE_ALL, ENCODE_LARGEST)
+
+
+def detect_faces(rgb_frame: np.ndarray, scale: float = 1.0, upsample: int = 1,
+                 upsample_fallback: bool = False) -> List[tuple]:
+    """
+    얼굴 위치를 감지합니다. scale < 1 이면 축소한 사본에서 HOG 감지를 수행하고
+    박스를 원본 해상도 좌표로 되돌립니다.
+
+    :param rgb_frame: RGB 프레임 (원본 해상도)
+    :param scale: 감지용 축소 비율 (1.0 이면 원본 그대로, 기존 동작)
+    :param upsample: dlib number_of_times_to_upsample (face_recognition 기본값 1)
+    :param upsample_fallback: 아무것도 찾지 못하면 upsample + 1 로 한 번 더 감지
+    :return: 원본 해상도 기준 (top, right, bottom, left) 리스트
+    """
+    small = rgb_frame
+    if scale != 1.0:
+        small = cv2.resize(rgb_frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    locations = face_recognition.face_locations(small, number_of_times_to_upsample=upsample)
+    if not locations and upsample_fallback:
+        locations = face_recognition.face_locations(small, number_of_times_to_upsample=upsample + 1)
+    if scale == 1.0:
+        return locations
+
+    h, w = rgb_frame.shape[:2]
+    inv = 1.0 / scale
+    return [(max(0, int(round(t * inv))), min(w, int(round(r * inv))),
+             min(h, int(round(b * inv))), max(0, int(round(l * inv))))
+            for (t, r, b, l) in locations]
+
+
+def encode_faces(rgb_frame: np.ndarray, policy: str = ENCODE_ALL, scale: float = 1.0, upsample: int = 1,
+                 upsample_fallback: bool = False) -> Tuple[List[tuple], List[np.ndarray]]:
+    """
+    프레임에서 얼굴을 감지하고 인코딩합니다. (프로세스 풀에서 실행되므로 모듈 최상위 함수)
+    인코딩은 항상 원본 해상도 프레임에서 수행합니다.
+
+    :param rgb_frame: RGB 프레임
+    :param policy: ENCODE_ALL 또는 ENCODE_LARGEST
+    :param scale, upsample, upsample_fallback: detect_faces() 참고
+    :return: (face_locations, face_encodings). ENCODE_LARGEST 이면 두 리스트 모두 길이 0 또는 1
+    """
+    locations = detect_faces(rgb_frame, scale, upsample, upsample_fallback)
+    if policy == ENCODE_LARGEST and len(locations) > 1:
+        locations = [max(locations, key=lambda l: (l[2] - l[0]) * (l[1] - l[3]))]
+    if not locations:
+        return [], []
+    return locations, face_recognition.face_encodings(rgb_frame, locations)
+
+
+class SerialFaceEncoder:
+    """호출한 스레드에서 바로 실행하는 실행기 (완료된 Future 반환)"""
+
+    def __init__(self, policy: str = ENCODE_ALL, **detect_kwargs):
+        """
+        :param policy: ENCODE_ALL 또는 ENCODE_LARGEST
+        :param detect_kwargs: detect_faces() 인자 (scale, upsample, upsample_fallback)
+        """
+        if policy not in ENCODE_POLICIES:
+            raise ValueError(f"지원하지 않는 인코딩 정책: {policy}")
+        self.policy = policy
+        self.detect_kwargs = detect_kwargs
+        self.max_inflight = 1
+
+    def submit(self, rgb_frame: np.ndarray) -> Future:
+        fut = Future()
+        try:
+            fut.set_result(encode_faces(rgb_frame, self.policy, **self.detect_kwargs))
+        except Exception as e:
+            fut.set_exception(e)
+        return fut
+
+    def shutdown(self):
+        pass
+
+
+class ProcessPoolFaceEncoder:
+    """프로세스 풀 실행기. 동시에 최대 max_inflight 개의 프레임을 처리합니다."""
+
+    def __init__(self, workers: Optional[int] = None, policy: str = ENCODE_ALL, max_inflight: Optional[int] = None,
+                 **detect_kwargs):
+        """
+        :param workers: 워커 프로세스 수 (기본값: CPU 수 - 1, 최소 1)
+        :param policy: ENCODE_ALL 또는 ENCODE_LARGEST
+        :param max_inflight: 동시에 제출할 수 있는 최대 프레임 수 (기본값: workers)
+        :param detect_kwargs: detect_faces() 인자 (scale, upsample, upsample_fallback)
+        """
+        if policy not in ENCODE_POLICIES:
+            raise ValueError(f"지원하지 않는 인코딩 정책: {policy}")
+        self.policy = policy
+        self.detect_kwargs = detect_kwargs
+        self.workers = workers or max(1, (multiprocessing.cpu_count() or 2) - 1)
+        self.max_inflight = max_inflight or self.workers
+        # 캡처/처리 스레드가 떠 있는 상태에서 fork 하지 않도록 spawn 사용
+        self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                         mp_context=multiprocessing.get_context("spawn"))
+
+    def submit(self, rgb_frame: np.ndarray) -> Future:
+        return self._pool.submit(encode_faces, rgb_frame, self.policy, **self.detect_kwargs)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def make_face_encoder(workers: int = 0, policy: str = ENCODE_ALL, **detect_kwargs):
+    """workers 가 0 이면 SerialFaceEncoder, 아니면 ProcessPoolFaceEncoder (음수면 CPU 수 기준 자동)"""
+    if workers == 0:
+        return SerialFaceEncoder(policy, **detect_kwargs)
+    return ProcessPoolFaceEncoder(workers=workers if workers > 0 else None, policy=policy, **detect_kwargs)
@@ -0,0 +1,178 @@
+"""
+캡처 스레드와 소비자(처리/추적/표시) 사이의 프레임 링 버퍼.
+
+- 고정 개수의 프레임 버퍼를 미리 할당하고, 캡처는 빈 슬롯에 cap.read(image=buf) 로 바로 읽어 넣습니다.
+- 소비자는 latest() 로 최신 프레임의 읽기 전용 뷰(LeasedFrame)를 받습니다. 복사하지 않습니다.
+- 뷰(와 그 뷰에서 파생된 슬라이스)가 살아 있는 동안 해당 슬롯은 임대(lease) 상태이며 캡처가 덮어쓰지 않습니다.
+  PipelineData 에 실려 큐를 건너가도 마지막 참조가 사라지면 자동으로 반납됩니다 (release() 로 즉시 반납 가능).
+- 발행할 때마다 증가하는 시퀀스 번호(seq)로 소비자가 건너뛴 프레임 수를 알 수 있습니다.
+  seq 는 overrun 으로 버린 프레임을 세지 않으므로, 원본 프레임을 가리킬 때는 소스가 준 번호(source_index)를 씁니다.
+- 반납은 GC 파이널라이저(__del__)에서도 일어나므로 락을 잡지 않고 반납 deque 에 넣기만 합니다.
+  같은 스레드가 락을 잡은 채 GC 가 돌아도 교착되지 않으며, 카운트는 다음 락 구간에서 반영됩니다.
+"""
+import threading
+from collections import deque
+import time
+from typing import Optional, Tuple
+import numpy as np
+
+
+class FrameLease:
+    """슬롯 하나에 대한 임대. release() 또는 GC 시 반납"""
+    __slots__ = ("ring", "slot", "seq", "timestamp", "source_index", "source_timestamp", "_released")
+
+    def __init__(self, ring: "FrameRing", slot: int, seq: int, timestamp: float, source_index: int = -1,
+                 source_timestamp: float = 0.0):
+        self.ring = ring
+        self.slot = slot
+        self.seq = seq
+        self.timestamp = timestamp
+        self.source_index = source_index
+        self.source_timestamp = source_timestamp
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.ring._release(self.slot)
+
+    def __del__(self):
+        self.release()
+
+
+class LeasedFrame(np.ndarray):
+    """임대를 붙잡고 있는 읽기 전용 프레임 뷰. 일반 ndarray 처럼 cv2/numpy 에 넘길 수 있습니다"""
+    lease: Optional[FrameLease] = None
+
+    @property
+    def seq(self) -> int:
+        return self.lease.seq if self.lease is not None else -1
+
+    @property
+    def source_index(self) -> int:
+        return self.lease.source_index if self.lease is not None else -1
+
+    @property
+    def source_timestamp(self) -> float:
+        return self.lease.source_timestamp if self.lease is not None else 0.0
+
+    def release(self):
+        """슬롯을 즉시 반납합니다. 이후 이 뷰의 내용은 덮어써질 수 있습니다"""
+        if self.lease is not None:
+            self.lease.release()
+
+
+class FrameRing:
+    def __init__(self, slots: int = 8, shape: Tuple[int, ...] = (480, 640, 3), dtype=np.uint8,
+                 max_slots: Optional[int] = None):
+        """
+        :param slots: 미리 할당할 버퍼 개수 (동시에 임대될 수 있는 프레임 수 + 1 이상)
+        :param shape: 미리 할당할 프레임 크기. 카메라가 다른 크기를 주면 그 슬롯을 해당 크기로 교체합니다
+        :param max_slots: 모든 슬롯이 임대 중일 때 늘릴 수 있는 최대 개수 (기본값: slots * 4).
+                          이마저 차면 프레임을 발행하지 않고 버립니다 (overrun)
+        """
+        if slots < 2:
+            raise ValueError("slots 는 2 이상이어야 합니다")
+        self.shape, self.dtype = shape, dtype
+        self.max_slots = max_slots or slots * 4
+        self.buffers = [np.empty(shape, dtype=dtype) for _ in range(slots)]
+        self.spare = np.empty(shape, dtype=dtype)  # overrun 시 읽어서 버릴 버퍼
+        self.leases = [0] * slots
+        self.seqs = [-1] * slots
+        self.stamps = [0.0] * slots
+        self.sources = [(-1, 0.0)] * slots  # 슬롯별 (소스 프레임 번호, 소스 타임스탬프)
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._returns = deque()  # 반납된 슬롯 (락 없이 append, 락 안에서 _drain 으로 반영)
+        self._latest = -1
+        self.seq = -1
+        self.stats = {"published": 0, "overruns": 0, "reallocs": 0, "grown": 0}
+
+    def acquire_write(self) -> Tuple[int, np.ndarray]:
+        """
+        캡처가 쓸 빈 슬롯을 고릅니다 (임대 중이 아니고 최신 슬롯도 아닌 것 중 가장 오래된 것).
+        모두 임대 중이면 max_slots 까지 슬롯을 늘리고, 그래도 없으면 예비 버퍼(slot=-1)를 돌려주며
+        그 프레임은 발행되지 않습니다 (overrun).
+
+        :return: (slot, 쓰기용 버퍼)
+        """
+        with self._lock:
+            self._drain()
+            free = [i for i in range(len(self.leases)) if self.leases[i] == 0 and i != self._latest]
+            if free:
+                slot = min(free, key=lambda i: self.seqs[i])
+                return slot, self.buffers[slot]
+            if len(self.buffers) < self.max_slots:
+                self.buffers.append(np.empty(self.shape, dtype=self.dtype))
+                self.leases.append(0)
+                self.seqs.append(-1)
+                self.stamps.append(0.0)
+                self.sources.append((-1, 0.0))
+                self.stats["grown"] += 1
+                return len(self.buffers) - 1, self.buffers[-1]
+            return -1, self.spare
+
+    def publish(self, slot: int, frame: np.ndarray, timestamp: Optional[float] = None, source_index: int = -1,
+                source_timestamp: float = 0.0) -> int:
+        """
+        acquire_write() 로 받은 슬롯에 쓴 프레임을 최신 프레임으로 발행합니다.
+
+        :param frame: cap.read(image=buf) 가 돌려준 배열 (buf 와 다르면 슬롯 버퍼를 그것으로 교체)
+        :param source_index: 프레임 소스의 프레임 번호 (FrameSource.index, 모르면 -1)
+        :param source_timestamp: 프레임 소스의 타임스탬프 (영상은 재생 위치, 세션은 녹화 시각)
+        :return: 발행된 seq (예비 버퍼면 -1)
+        """
+        with self._cond:
+            if slot < 0:
+                self.spare = frame
+                self.stats["overruns"] += 1
+                return -1
+            if frame is not self.buffers[slot]:
+                self.buffers[slot] = frame
+                self.shape = frame.shape
+                self.stats["reallocs"] += 1
+            self.seq += 1
+            self.seqs[slot] = self.seq
+            self.stamps[slot] = timestamp or time.time()
+            self.sources[slot] = (source_index, source_timestamp)
+            self._latest = slot
+            self.stats["published"] += 1
+            self._cond.notify_all()
+            return self.seq
+
+    def latest(self, after_seq: int = -1, timeout: Optional[float] = None) -> Optional[LeasedFrame]:
+        """
+        최신 프레임을 임대해 읽기 전용 뷰로 돌려줍니다.
+
+        :param after_seq: 이 seq 보다 새 프레임만 (없으면 None, timeout 이 있으면 그만큼 대기)
+        :param timeout: 새 프레임을 기다릴 최대 시간 (초)
+        :return: LeasedFrame 또는 None
+        """
+        with self._cond:
+            if self._latest < 0 or self.seqs[self._latest] <= after_seq:
+                if not timeout or not self._cond.wait_for(
+                        lambda: self._latest >= 0 and self.seqs[self._latest] > after_seq, timeout):
+                    return None
+            slot = self._latest
+            self._drain()
+            self.leases[slot] += 1
+            lease = FrameLease(self, slot, self.seqs[slot], self.stamps[slot], *self.sources[slot])
+            buf = self.buffers[slot]
+        view = buf.view(LeasedFrame)
+        view.flags.writeable = False
+        view.lease = lease
+        return view
+
+    def _release(self, slot: int):
+        # 파이널라이저에서 불릴 수 있으므로 락을 잡지 않음 (deque.append 는 스레드 안전)
+        self._returns.append(slot)
+
+    def _drain(self):
+        """반납 deque 를 임대 카운트에 반영 (락 안에서 호출)"""
+        while self._returns:
+            self.leases[self._returns.popleft()] -= 1
+
+    def leased(self) -> int:
+        with self._lock:
+            self._drain()
+            return sum(1 for n in self.leases if n > 0)
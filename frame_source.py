@@ -0,0 +1,256 @@
+"""
+프레임 소스.
+카메라, 영상 파일, 이미지 폴더, 메모리 프레임 목록, 녹화 세션(session_recorder.py)을 cv2.VideoCapture 와 같은
+read(image=...) / isOpened() / release() / set() 인터페이스로 감쌉니다.
+WebcamModule(source=...) 나 posture_tracker.py 에 넘기면 카메라 없이 같은 파이프라인을 돌릴 수 있습니다.
+
+- realtime=True  : 원본 타임스탬프(영상은 FPS, 세션은 녹화 시각) 간격에 맞춰 내보냄 (speed 배속)
+- realtime=False : 기다리지 않고 최대한 빨리 내보냄
+- loop=True      : 끝나면 처음부터 다시 (타임스탬프는 이어서 증가)
+
+read() 후 index 는 소스 기준 프레임 번호, timestamp 는 원본 캡처 시각입니다.
+끝에 도달하면 read() 가 (False, None) 을 돌려주고 finished 가 True 가 됩니다.
+"""
+import csv
+import json
+import os
+import time
+from typing import List, Optional, Union
+import cv2
+import numpy as np
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+SESSION_META = "meta.json"
+
+
+class _Pacer:
+    """원본 타임스탬프 간격 / speed 에 맞춰 대기"""
+
+    def __init__(self, realtime: bool, speed: float):
+        self.realtime = realtime
+        self.speed = speed
+        self._t0 = None
+
+    def wait(self, src_ts: float):
+        if not self.realtime:
+            return
+        now = time.monotonic()
+        if self._t0 is None:
+            self._t0 = (now, src_ts)
+            return
+        delay = (src_ts - self._t0[1]) / self.speed - (now - self._t0[0])
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _into(image: Optional[np.ndarray], frame: np.ndarray) -> np.ndarray:
+    """호출자가 준 버퍼와 크기가 같으면 복사해 넣고, 아니면 새 프레임을 그대로 반환 (VideoCapture.read 와 같음)"""
+    if image is not None and image.shape == frame.shape and image.dtype == frame.dtype:
+        np.copyto(image, frame)
+        return image
+    return frame
+
+
+class FrameSource:
+    def __init__(self):
+        self.index = -1
+        self.timestamp = 0.0
+        self.finished = False
+
+    def read(self, image: Optional[np.ndarray] = None):
+        raise NotImplementedError
+
+    def isOpened(self) -> bool:
+        return True
+
+    def set(self, prop, value) -> bool:
+        return False  # 녹화/파일 소스는 해상도 등 설정 변경을 무시
+
+    def get(self, prop) -> float:
+        return 0.0
+
+    def release(self):
+        pass
+
+
+class CameraSource(FrameSource):
+    def __init__(self, camera_id: int = 0, width: int = 640, height: int = 480):
+        super().__init__()
+        self.cap = cv2.VideoCapture(camera_id)
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+
+    def read(self, image: Optional[np.ndarray] = None):
+        ret, frame = self.cap.read(image=image) if image is not None else self.cap.read()
+        if ret:
+            self.index += 1
+            self.timestamp = time.time()
+        return ret, frame
+
+    def isOpened(self) -> bool:
+        return self.cap.isOpened()
+
+    def set(self, prop, value) -> bool:
+        return self.cap.set(prop, value)
+
+    def get(self, prop) -> float:
+        return self.cap.get(prop)
+
+    def release(self):
+        self.cap.release()
+
+
+class VideoFileSource(FrameSource):
+    def __init__(self, path: str, realtime: bool = True, speed: float = 1.0, loop: bool = False):
+        super().__init__()
+        self.path = path
+        self.loop = loop
+        self.cap = cv2.VideoCapture(path)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.pacer = _Pacer(realtime, speed)
+
+    def read(self, image: Optional[np.ndarray] = None):
+        ret, frame = self.cap.read(image=image) if image is not None else self.cap.read()
+        if not ret and self.loop and self.index >= 0:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read(image=image) if image is not None else self.cap.read()
+        if not ret:
+            self.finished = True
+            return False, None
+        self.index += 1
+        self.timestamp = self.index / self.fps
+        self.pacer.wait(self.timestamp)
+        return True, frame
+
+    def isOpened(self) -> bool:
+        return self.cap.isOpened()
+
+    def get(self, prop) -> float:
+        return self.cap.get(prop)
+
+    def release(self):
+        self.cap.release()
+
+
+class ImageDirSource(FrameSource):
+    def __init__(self, path: str, fps: float = 30.0, realtime: bool = True, speed: float = 1.0, loop: bool = False):
+        super().__init__()
+        self.files: List[str] = sorted(os.path.join(path, f) for f in os.listdir(path)
+                                       if f.lower().endswith(IMAGE_EXTS))
+        self.fps = fps
+        self.loop = loop
+        self.pacer = _Pacer(realtime, speed)
+
+    def read(self, image: Optional[np.ndarray] = None):
+        i = self.index + 1
+        if i >= len(self.files) and not (self.loop and self.files):
+            self.finished = True
+            return False, None
+        frame = cv2.imread(self.files[i % len(self.files)])
+        if frame is None:
+            self.finished = True
+            return False, None
+        self.index = i
+        self.timestamp = i / self.fps
+        self.pacer.wait(self.timestamp)
+        return True, _into(image, frame)
+
+    def isOpened(self) -> bool:
+        return bool(self.files)
+
+
+class ArraySource(FrameSource):
+    """메모리에 있는 프레임 목록 (합성 클립 등) 재생"""
+
+    def __init__(self, frames: List[np.ndarray], fps: float = 30.0, realtime: bool = True, speed: float = 1.0,
+                 loop: bool = False):
+        super().__init__()
+        self.frames = frames
+        self.fps = fps
+        self.loop = loop
+        self.pacer = _Pacer(realtime, speed)
+
+    def read(self, image: Optional[np.ndarray] = None):
+        i = self.index + 1
+        if i >= len(self.frames) and not (self.loop and self.frames):
+            self.finished = True
+            return False, None
+        self.index = i
+        self.timestamp = i / self.fps
+        self.pacer.wait(self.timestamp)
+        return True, _into(image, self.frames[i % len(self.frames)])
+
+    def isOpened(self) -> bool:
+        return bool(self.frames)
+
+
+class SessionSource(FrameSource):
+    """
+    SessionRecorder 로 녹화한 세션 재생. 녹화 당시 타임스탬프 간격을 그대로 재현합니다.
+
+    :param path: 세션 폴더 (meta.json, frames.avi, frames.csv)
+    """
+
+    def __init__(self, path: str, realtime: bool = True, speed: float = 1.0, loop: bool = False):
+        super().__init__()
+        self.path = path
+        self.loop = loop
+        with open(os.path.join(path, SESSION_META), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        with open(os.path.join(path, "frames.csv"), newline="") as f:
+            rows = list(csv.DictReader(f))
+        self.timestamps = [float(row["timestamp"]) for row in rows]
+        # 녹화 당시 소스 프레임 번호 (녹화가 밀려 버린 프레임이 있으면 건너뜀)
+        self.indices = [int(row["index"]) for row in rows]
+        self.fps = self.meta.get("fps", 30.0)
+        self.cap = cv2.VideoCapture(os.path.join(path, "frames.avi"))
+        self.pacer = _Pacer(realtime, speed)
+        self._pos = 0  # 이번 회차의 프레임 위치
+        self._offset = 0.0  # 반복 재생 시 타임스탬프 누적 보정
+        self._index_offset = 0  # 반복 재생 시 프레임 번호 누적 보정
+
+    def read(self, image: Optional[np.ndarray] = None):
+        ret, frame = False, None
+        if self._pos < len(self.timestamps):
+            ret, frame = self.cap.read(image=image) if image is not None else self.cap.read()
+        if not ret and self.loop and self._pos > 0:
+            span = self.timestamps[self._pos - 1] - self.timestamps[0]
+            self._offset += span + 1.0 / self.fps
+            self._index_offset += self.indices[self._pos - 1] + 1
+            self._pos = 0
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read(image=image) if image is not None else self.cap.read()
+        if not ret:
+            self.finished = True
+            return False, None
+        self.timestamp = self.timestamps[self._pos] + self._offset
+        self.index = self.indices[self._pos] + self._index_offset
+        self._pos += 1
+        self.pacer.wait(self.timestamp)
+        return True, frame
+
+    def isOpened(self) -> bool:
+        return self.cap.isOpened() and bool(self.timestamps)
+
+    def release(self):
+        self.cap.release()
+
+
+def is_session(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, SESSION_META))
+
+
+def open_frame_source(spec: Union[int, str] = 0, realtime: bool = True, speed: float = 1.0,
+                      loop: bool = False) -> FrameSource:
+    """
+    :param spec: 카메라 번호(정수 또는 숫자 문자열), 녹화 세션 폴더, 이미지 폴더, 영상 파일 경로
+    """
+    if isinstance(spec, int) or str(spec).isdigit():
+        return CameraSource(int(spec))
+    if os.path.isdir(spec):
+        if is_session(spec):
+            return SessionSource(spec, realtime=realtime, speed=speed, loop=loop)
+        return ImageDirSource(spec, realtime=realtime, speed=speed, loop=loop)
+    if not os.path.exists(spec):
+        raise FileNotFoundError(f"프레임 소스를 찾을 수 없습니다: {spec}")
+    return VideoFileSource(spec, realtime=realtime, speed=speed, loop=loop)
@@ -0,0 +1,180 @@
+"""
+갤러리 압축 작업.
+- 사용자별 대표 임베딩(prototype)을 최대 K 개로 유지 (가중 구면 k-means)
+- 인식 성공 시 들어오는 임베딩으로 prototype 을 점진적으로 갱신 (running mean)
+- 조명 변화 등으로 자동 등록된 중복 신원을 유사도 기준으로 병합하고 id remap 을 남김
+
+AuthWorker(compactor=...) 로 넘기면 매칭 시 observe(), 유휴 시 maybe_compact() 가 호출됩니다.
+저장소는 rewrite(uids, embs, remap) / resolve(uid) 를 지원해야 합니다
+(InMemoryUserStore, MmapUserStore, AnnUserStore).
+"""
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+
+def _normalize(m: np.ndarray) -> np.ndarray:
+    return m / (np.linalg.norm(m, axis=-1, keepdims=True) + 1e-9)
+
+
+def reduce_prototypes(rows: np.ndarray, weights: np.ndarray, k: int, iters: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+    """가중치가 있는 정규화 행들을 최대 k 개의 prototype 으로 줄인다 (반환: prototypes, 가중치 합)"""
+    if len(rows) <= k:
+        return rows, weights
+    # farthest-point 초기화: 가장 무거운 행에서 시작해 기존 중심과 가장 먼 행을 차례로 선택
+    chosen = [int(np.argmax(weights))]
+    best = rows @ rows[chosen[0]]
+    for _ in range(k - 1):
+        j = int(np.argmin(best))
+        chosen.append(j)
+        best = np.maximum(best, rows @ rows[j])
+    cent = rows[chosen].copy()
+    for _ in range(iters):
+        assign = np.argmax(rows @ cent.T, axis=1)
+        sums = np.zeros_like(cent)
+        np.add.at(sums, assign, rows * weights[:, None])
+        wsum = np.bincount(assign, weights=weights, minlength=k)
+        keep = wsum > 0
+        cent = _normalize(sums[keep])
+        if keep.sum() < k:
+            k = int(keep.sum())
+    assign = np.argmax(rows @ cent.T, axis=1)
+    return cent.astype(np.float32), np.bincount(assign, weights=weights, minlength=len(cent))
+
+
+class GalleryCompactor:
+    MERGE_CHUNK = 2048
+
+    def __init__(self, store, max_prototypes: int = 4, merge_thr: float = 0.80,
+                 update_thr: float = 0.70, novel_thr: float = 0.85,
+                 interval_sec: float = 600.0, min_observations: int = 50):
+        """
+        :param store: 압축 대상 저장소
+        :param max_prototypes: 사용자별 최대 prototype 수 (K)
+        :param merge_thr: 두 사용자 대표 벡터의 유사도가 이 값 이상이면 같은 사람으로 보고 병합
+        :param update_thr: observe() 에서 이 유사도 이상인 매칭만 prototype 갱신에 사용
+        :param novel_thr: 가장 가까운 prototype 과의 유사도가 이 값 미만이고 K 개 미만이면 새 prototype 추가
+        :param interval_sec: maybe_compact() 의 최소 실행 간격
+        :param min_observations: interval 이 지나지 않았어도 이만큼 관측이 쌓이면 압축
+        """
+        self.store = store
+        self.K = max(1, int(max_prototypes))
+        self.merge_thr = merge_thr
+        self.update_thr = update_thr
+        self.novel_thr = novel_thr
+        self.interval_sec = interval_sec
+        self.min_observations = min_observations
+
+        # uid → (prototype 행렬 (k, D), 가중치 (k,)) : observe() 로 갱신된 사용자만 보관
+        self._protos: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        self._observed = 0
+        self._last_compact = time.time()
+        self.stats = {"observed": 0, "compactions": 0, "merged_users": 0, "rows_before": 0, "rows_after": 0}
+
+    def _store_rows(self) -> Dict[int, np.ndarray]:
+        """저장소의 행들을 user_id 별로 묶은 정규화 float32 행렬"""
+        mat, row_uid = self.store.matrix()
+        out: Dict[int, np.ndarray] = {}
+        if len(row_uid) == 0:
+            return out
+        order = np.argsort(row_uid, kind="stable")
+        uids, starts = np.unique(row_uid[order], return_index=True)
+        bounds = list(starts) + [len(order)]
+        for i, uid in enumerate(uids.tolist()):
+            # 양자화 저장소(int8 은 scale 미적용)도 방향만 필요하므로 다시 정규화해서 사용
+            out[uid] = _normalize(np.asarray(mat[order[bounds[i]:bounds[i + 1]]], dtype=np.float32))
+        return out
+
+    def _user_protos(self, uid: int, rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        if uid in self._protos:
+            return self._protos[uid]
+        if rows is None:
+            mat, row_uid = self.store.matrix()
+            rows = _normalize(np.asarray(mat[np.nonzero(row_uid == uid)[0]], dtype=np.float32))
+        if len(rows) == 0:
+            return rows, np.ones(0)
+        return reduce_prototypes(rows, np.ones(len(rows)), self.K)
+
+    def observe(self, uid: int, emb: np.ndarray, sim: float):
+        """인식 성공한 임베딩(정규화)으로 해당 사용자의 prototype 을 점진적으로 갱신"""
+        if sim < self.update_thr:
+            return
+        uid = self.store.resolve(uid)
+        protos, w = self._user_protos(uid)
+        emb = emb.astype(np.float32)
+        if len(protos) == 0:
+            protos, w = emb[None, :].copy(), np.ones(1)
+        else:
+            sims = protos @ emb
+            j = int(np.argmax(sims))
+            if sims[j] < self.novel_thr and len(protos) < self.K:
+                protos, w = np.vstack([protos, emb]), np.append(w, 1.0)
+            else:
+                protos = protos.copy()
+                protos[j] = _normalize(protos[j] * w[j] + emb)
+                w = w.copy(); w[j] += 1.0
+        self._protos[uid] = (protos, w)
+        self._observed += 1
+        self.stats["observed"] += 1
+
+    def maybe_compact(self) -> Optional[dict]:
+        """간격/관측량 조건을 만족하면 compact() 를 실행 (AuthWorker 유휴 시 호출)"""
+        due = (time.time() - self._last_compact) >= self.interval_sec
+        if not due and self._observed < self.min_observations:
+            return None
+        return self.compact()
+
+    def _merge_groups(self, uids: List[int], reps: np.ndarray) -> Dict[int, int]:
+        """대표 벡터 유사도가 merge_thr 이상인 사용자들을 묶어 {병합될 id: 남을 id} 반환 (작은 id 가 남음)"""
+        parent = {u: u for u in uids}
+        def find(u):
+            while parent[u] != u:
+                parent[u] = parent[parent[u]]; u = parent[u]
+            return u
+        # 사용자 수가 많아도 U x U 전체 행렬을 만들지 않도록 행 블록 단위로 계산
+        for s in range(0, len(uids), self.MERGE_CHUNK):
+            sims = reps[s:s + self.MERGE_CHUNK] @ reps.T
+            ii, jj = np.nonzero(sims >= self.merge_thr)
+            for i, j in zip((ii + s).tolist(), jj.tolist()):
+                if i >= j: continue
+                a, b = find(uids[i]), find(uids[j])
+                if a != b:
+                    parent[max(a, b)] = min(a, b)
+        return {u: find(u) for u in uids if find(u) != u}
+
+    def compact(self) -> dict:
+        """prototype 상한 적용 + 중복 신원 병합 후 저장소를 다시 쓴다"""
+        by_user = self._store_rows()
+        rows_before = sum(len(r) for r in by_user.values())
+        protos = {}
+        for uid in set(by_user) | set(self._protos):
+            p, w = self._user_protos(uid, by_user.get(uid))
+            if len(p): protos[uid] = (p, w)
+
+        uids = sorted(protos)
+        remap: Dict[int, int] = {}
+        if len(uids) > 1:
+            reps = _normalize(np.stack([(p * w[:, None]).sum(axis=0) for p, w in (protos[u] for u in uids)]))
+            remap = self._merge_groups(uids, reps)
+            for src, dst in sorted(remap.items()):
+                p, w = protos.pop(src)
+                dp, dw = protos[dst]
+                protos[dst] = reduce_prototypes(np.vstack([dp, p]), np.concatenate([dw, w]), self.K)
+
+        out_uids, out_rows = [], []
+        for uid in sorted(protos):
+            p, _ = protos[uid]
+            out_uids.extend([uid] * len(p))
+            out_rows.append(p)
+        if out_rows:
+            self.store.rewrite(out_uids, np.vstack(out_rows), remap)
+
+        self._protos.clear()
+        self._observed = 0
+        self._last_compact = time.time()
+        report = {"users_before": len(uids), "users_after": len(protos), "merged": remap,
+                  "rows_before": rows_before, "rows_after": len(out_uids)}
+        self.stats["compactions"] += 1
+        self.stats["merged_users"] += len(remap)
+        self.stats["rows_before"], self.stats["rows_after"] = rows_before, len(out_uids)
+        return report
@@ -1,3 +1,4 @@
+from collections import deque
 import numpy as np
 
 
@@ -13,4 +14,105 @@ def is_stable(nose_history, box_history, tol_px=5, tol_size=0.05):
     dw = (max(ws) - min(ws)) / np.mean(ws)
     dh = (max(hs) - min(hs)) / np.mean(hs)
 
-    return dx < tol_px and dy < tol_px and dw < tol_size and dh < tol_size
\ No newline at end of file
+    return dx < tol_px and dy < tol_px and dw < tol_size and dh < tol_size
+
+class _WindowMinMax:
+    """단조 deque 로 슬라이딩 윈도 최솟값/최댓값을 상수 시간(분할 상환)에 유지"""
+
+    def __init__(self):
+        self.mins = deque()  # (번호, 값), 값 오름차순
+        self.maxs = deque()  # (번호, 값), 값 내림차순
+
+    def push(self, i, v):
+        while self.mins and self.mins[-1][1] >= v:
+            self.mins.pop()
+        self.mins.append((i, v))
+        while self.maxs and self.maxs[-1][1] <= v:
+            self.maxs.pop()
+        self.maxs.append((i, v))
+
+    def evict(self, first):
+        """번호가 first 보다 작은 값 제거"""
+        while self.mins and self.mins[0][0] < first:
+            self.mins.popleft()
+        while self.maxs and self.maxs[0][0] < first:
+            self.maxs.popleft()
+
+    def range(self):
+        return self.maxs[0][1] - self.mins[0][1]
+
+    def clear(self):
+        self.mins.clear()
+        self.maxs.clear()
+
+
+class StabilityDetector:
+    """
+    최근 window_sec 동안의 코 좌표/박스 크기가 is_stable() 과 같은 기준으로 안정적인지 스트리밍으로 판단.
+    프레임마다 update() 는 분할 상환 O(1) 이고, 윈도 밖 샘플은 버리므로 메모리도 윈도 크기로 제한됩니다.
+
+    고정 시간을 기다린 뒤 한 번 판정하는 대신, 관찰 시간이 window_sec 이상이 된 뒤로는 매 프레임 판정하므로
+    중간에 움직였어도 그 뒤로 window_sec 동안 가만히 있으면 바로 안정으로 바뀝니다.
+    """
+
+    def __init__(self, window_sec=1.5, tol_px=5, tol_size=0.05, min_samples=5):
+        self.window_sec = window_sec
+        self.tol_px = tol_px
+        self.tol_size = tol_size
+        self.min_samples = min_samples
+        self._samples = deque()  # (ts, w, h)
+        self._mm = [_WindowMinMax() for _ in range(4)]  # x, y, w, h
+        self.reset()
+
+    def reset(self):
+        self._samples.clear()
+        for mm in self._mm:
+            mm.clear()
+        self._next = 0  # 다음 샘플 번호
+        self._first = 0  # 윈도 안 가장 오래된 샘플 번호
+        self._sum_w = self._sum_h = 0.0
+        self._started = None
+        self.stable = False
+        self.stable_since = None  # 현재 안정 구간이 시작된 시각 (윈도 시작 기준), 불안정이면 None
+
+    def update(self, ts, nose, size):
+        """
+        :param ts: 샘플 시각 (초)
+        :param nose: (x, y) 코 좌표
+        :param size: (w, h) 얼굴 박스 크기
+        :return: 현재 안정 여부
+        """
+        if self._started is None:
+            self._started = ts
+        i = self._next
+        self._next += 1
+        for mm, v in zip(self._mm, (nose[0], nose[1], size[0], size[1])):
+            mm.push(i, v)
+        self._samples.append((ts, size[0], size[1]))
+        self._sum_w += size[0]
+        self._sum_h += size[1]
+
+        # 윈도 밖 샘플 제거
+        while self._samples[0][0] < ts - self.window_sec:
+            _, w, h = self._samples.popleft()
+            self._sum_w -= w
+            self._sum_h -= h
+            self._first += 1
+        for mm in self._mm:
+            mm.evict(self._first)
+
+        n = len(self._samples)
+        stable = (n >= self.min_samples and ts - self._started >= self.window_sec
+                  and self._mm[0].range() < self.tol_px and self._mm[1].range() < self.tol_px
+                  and self._mm[2].range() < self.tol_size * self._sum_w / n
+                  and self._mm[3].range() < self.tol_size * self._sum_h / n)
+        if stable and not self.stable:
+            self.stable_since = self._samples[0][0]
+        elif not stable:
+            self.stable_since = None
+        self.stable = stable
+        return stable
+
+    def stable_for(self, now):
+        """안정 상태가 이어진 시간 (초), 불안정이면 0"""
+        return now - self.stable_since if self.stable_since is not None else 0.0
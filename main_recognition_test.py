@@ -1,6 +1,7 @@
 import queue
 import cv2
 import time  # time 임포트 (대기용)
+import numpy as np
 from webcam_feature_module import WebcamModule
 from pipeline_data import PipelineData
 
@@ -51,6 +52,8 @@ def main():
 
     # 현재 GUI에 표시 중인 상태를 저장 (중복 로그 방지)
     current_display_state = ""
+    display = None  # 그리기용 버퍼 (data.frame 은 읽기 전용이므로 여기에 덮어써서 재사용)
+    last_seq, skipped = -1, 0
 
     try:
         # 6. 메인 루프 진입
@@ -67,7 +70,13 @@ def main():
             if data.frame is None:
                 continue
 
-            frame = data.frame.copy()
+            if display is None or display.shape != data.frame.shape:
+                display = np.empty(data.frame.shape, dtype=data.frame.dtype)
+            np.copyto(display, data.frame)
+            frame = display
+            if last_seq >= 0 and data.frame_seq > last_seq + 1:
+                skipped += data.frame_seq - last_seq - 1
+            last_seq = data.frame_seq
 
             # 7. 현재 상태에 따라 바운딩 박스 그리기
             color = (255, 0, 0)  # 파란색: RECOGNIZING
@@ -101,6 +110,7 @@ def main():
         print("\n[8/9] 웹캠 모듈 정지 시도...")
         webcam.stop()
         print(" -> 웹캠 모듈 정지 완료.")
+        print(f" -> 표시하지 못하고 건너뛴 프레임: {skipped}, 프레임 통계: {webcam.get_frame_stats()}")
         cv2.destroyAllWindows()
         print("[9/9] 테스트 종료. (종료 코드 0)")
 
@@ -0,0 +1,195 @@
+"""
+영속 임베딩 저장소.
+InMemoryUserStore 와 같은 인터페이스로, 재시작 후에도 등록 사용자가 유지됩니다.
+
+디렉터리 구성:
+  embs.f32   : 정규화된 float32 임베딩 행 (N x D), append-only
+  ids.i64    : 행별 user_id (int64 N개), append-only
+  meta.json  : {"version", "dim", "next_id", "remap", "pending_rewrite"}
+               (임시 파일 + os.replace 로 원자적 교체)
+
+append 순서는 embs → fsync → ids → fsync 입니다. ids.i64 에 기록된 행 수가
+커밋된 행 수이므로, 중간에 죽어도 열 때 남는 꼬리 바이트만 잘라내면 됩니다.
+
+rewrite(압축/병합) 는 새 파일을 *.tmp 로 모두 쓴 뒤 meta 에 pending_rewrite 를 기록하고
+교체합니다. 교체 도중 죽으면 다음 open 에서 남은 *.tmp 교체를 마저 수행합니다.
+"""
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+EMB_FILE = "embs.f32"
+IDS_FILE = "ids.i64"
+META_FILE = "meta.json"
+FORMAT_VERSION = 1
+
+
+class MmapUserStore:
+    persistent = True  # user_id 가 재시작 후에도 유지됨
+    def __init__(self, path: str, dim: int = 128, fsync: bool = True):
+        """
+        :param path: 저장소 디렉터리 (없으면 생성)
+        :param dim: 임베딩 차원 (기존 저장소를 열면 meta.json 값이 우선)
+        :param fsync: append 마다 fsync 수행 여부
+        """
+        self.path = path
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+        meta = self._read_meta()
+        self.dim = int(meta.get("dim", dim))
+        self.next_id = int(meta.get("next_id", 1))
+        self.id_remap: Dict[int, int] = {int(k): int(v) for k, v in meta.get("remap", {}).items()}
+        if meta.get("pending_rewrite"):
+            self._finish_rewrite()
+
+        self._n = self._recover()
+        self._mat: Optional[np.ndarray] = None
+        self._row_uid: Optional[np.ndarray] = None
+        self._dirty = True
+        if self._n:
+            # 메타 기록 전에 죽었더라도 이미 쓰인 user_id 는 재사용하지 않음
+            self._remap()
+            self.next_id = max(self.next_id, int(self._row_uid.max()) + 1)
+        self._write_meta()
+
+    # ---- 파일 처리 ----
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _read_meta(self) -> dict:
+        try:
+            with open(self._file(META_FILE), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return {}
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"지원하지 않는 저장소 버전: {meta.get('version')}")
+        return meta
+
+    def _write_meta(self, pending_rewrite: bool = False):
+        tmp = self._file(META_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": FORMAT_VERSION, "dim": self.dim, "next_id": self.next_id,
+                       "remap": {str(k): v for k, v in self.id_remap.items()},
+                       "pending_rewrite": pending_rewrite}, f)
+            f.flush()
+            if self.fsync: os.fsync(f.fileno())
+        os.replace(tmp, self._file(META_FILE))
+
+    def _finish_rewrite(self):
+        for name in (EMB_FILE, IDS_FILE):
+            if os.path.exists(self._file(name + ".tmp")):
+                os.replace(self._file(name + ".tmp"), self._file(name))
+        self._write_meta()
+
+    def _recover(self) -> int:
+        """커밋된 행 수를 구하고, 불완전하게 기록된 꼬리를 잘라낸다"""
+        row_bytes = 4 * self.dim
+        for name in (EMB_FILE, IDS_FILE):
+            open(self._file(name), "ab").close()
+        n_embs = os.path.getsize(self._file(EMB_FILE)) // row_bytes
+        n_ids = os.path.getsize(self._file(IDS_FILE)) // 8
+        n = min(n_embs, n_ids)
+        for name, size in ((EMB_FILE, n * row_bytes), (IDS_FILE, n * 8)):
+            if os.path.getsize(self._file(name)) != size:
+                with open(self._file(name), "r+b") as f:
+                    f.truncate(size)
+        return n
+
+    def _remap(self):
+        if self._n == 0:
+            self._mat = np.empty((0, self.dim), dtype=np.float32)
+            self._row_uid = np.empty(0, dtype=np.int64)
+        else:
+            self._mat = np.memmap(self._file(EMB_FILE), dtype=np.float32, mode="r", shape=(self._n, self.dim))
+            self._row_uid = np.memmap(self._file(IDS_FILE), dtype=np.int64, mode="r", shape=(self._n,))
+        self._dirty = False
+
+    # ---- InMemoryUserStore 호환 인터페이스 ----
+    def next_user_id(self) -> int:
+        with self._lock:
+            uid = self.next_id; self.next_id += 1
+            self._write_meta()
+            return uid
+
+    def resolve(self, uid: Optional[int]) -> Optional[int]:
+        """병합으로 사라진 id 를 현재 id 로 변환"""
+        while uid in self.id_remap: uid = self.id_remap[uid]
+        return uid
+
+    def rewrite(self, uids, embs: np.ndarray, remap: Optional[Dict[int, int]] = None):
+        """갤러리 전체를 (uids, embs) 로 교체 (압축/병합 결과 반영용)"""
+        embs = np.asarray(embs, dtype=np.float32).reshape(len(uids), -1)
+        rows = embs / (np.linalg.norm(embs, axis=1, keepdims=True) + 1e-9)
+        ids = np.asarray(uids, dtype=np.int64)
+        with self._lock:
+            for name, data in ((EMB_FILE, rows.tobytes()), (IDS_FILE, ids.tobytes())):
+                with open(self._file(name + ".tmp"), "wb") as f:
+                    f.write(data)
+                    f.flush()
+                    if self.fsync: os.fsync(f.fileno())
+            if remap:
+                self.id_remap.update(remap)
+                self.id_remap = {k: self.resolve(v) for k, v in self.id_remap.items()}
+            # 기존 memmap 을 놓은 뒤 교체
+            self._mat, self._row_uid = None, None
+            self._write_meta(pending_rewrite=True)
+            self._finish_rewrite()
+            self._n = len(ids)
+            self._dirty = True
+
+    def add_embedding(self, uid: int, emb: np.ndarray):
+        self.add_embeddings([uid], np.asarray(emb).reshape(1, -1))
+
+    def add_embeddings(self, uids, embs: np.ndarray):
+        """여러 행을 한 번의 append/fsync 로 추가 (마이그레이션, 일괄 등록용)"""
+        embs = np.asarray(embs, dtype=np.float32).reshape(len(uids), -1)
+        if embs.shape[1] != self.dim:
+            raise ValueError(f"임베딩 차원 불일치: {embs.shape[1]} != {self.dim}")
+        rows = embs / (np.linalg.norm(embs, axis=1, keepdims=True) + 1e-9)
+        ids = np.asarray(uids, dtype=np.int64)
+        with self._lock:
+            for name, data in ((EMB_FILE, rows.tobytes()), (IDS_FILE, ids.tobytes())):
+                with open(self._file(name), "ab") as f:
+                    f.write(data)
+                    f.flush()
+                    if self.fsync: os.fsync(f.fileno())
+            self._n += len(ids)
+            if len(ids) and int(ids.max()) >= self.next_id:
+                self.next_id = int(ids.max()) + 1
+                self._write_meta()
+            self._dirty = True
+
+    def matrix(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(정규화된 임베딩 행렬 (N, D), 행별 user_id (N,)) 읽기 전용 뷰"""
+        with self._lock:
+            if self._dirty: self._remap()
+            return self._mat, self._row_uid
+
+    def all(self) -> Dict[int, List[np.ndarray]]:
+        """호환용. 매 호출마다 사용자별 리스트를 새로 구성하므로 핫패스에서는 matrix()/best_match() 사용"""
+        mat, row_uid = self.matrix()
+        out: Dict[int, List[np.ndarray]] = {}
+        for i, uid in enumerate(row_uid.tolist()):
+            out.setdefault(uid, []).append(mat[i])
+        return out
+
+    def similarities(self, emb: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """정규화된 emb 와 갤러리 행(rows 가 None 이면 전체)의 코사인 유사도"""
+        mat, _ = self.matrix()
+        return (mat if rows is None else mat[rows]) @ emb.astype(np.float32, copy=False)
+
+    def best_match(self, emb: np.ndarray, thr: Optional[float] = None) -> Tuple[Optional[int], float]:
+        mat, row_uid = self.matrix()
+        if len(row_uid) == 0:
+            return None, -1.0
+        sims = self.similarities(emb)
+        i = int(np.argmax(sims))
+        return int(row_uid[i]), float(sims[i])
+
+    def __len__(self) -> int:
+        return self._n
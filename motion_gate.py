@@ -0,0 +1,122 @@
+"""
+처리 루프의 움직임 게이트.
+책상 앞 사용자는 대부분 가만히 앉아 있으므로, 장면이 그대로면 얼굴 감지/인코딩(RECOGNIZING)이나
+재감지(TRACKING)를 다시 돌리지 않고 직전 결과를 재사용합니다.
+
+- 프레임을 작게 줄인 그레이스케일에서 마지막으로 추론한 프레임과의 차이를 봅니다
+  (픽셀 차이가 pixel_thr 를 넘는 비율). 연속 프레임이 아니라 기준 프레임과 비교하므로 천천히 움직여도 누적되어 잡힙니다.
+- 히스테리시스: 변화 비율이 enter_ratio 를 넘으면 바로 active, exit_ratio 아래로 hold_sec 동안 머물러야 static.
+- static 이어도 max_skip_sec 마다 한 번은 추론합니다 (조명 변화/사람 교체 등 놓친 변화 보정).
+- update() 는 추론 여부만 결정합니다. 호출자가 실제로 추론(제출/재감지)했을 때 executed() 를 불러야
+  그 프레임이 새 기준이 되고 executed 로 셉니다. 통과했지만 돌리지 못한 프레임(작업 가득 참, 재감지 주기 아님)은 deferred.
+- interval(): active 면 processing_fps, static 이면 idle_fps 로 처리 주기를 바꿉니다.
+"""
+import time
+from typing import Optional, Tuple
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    def __init__(self, size: Tuple[int, int] = (128, 96), pixel_thr: int = 8, enter_ratio: float = 0.01,
+                 exit_ratio: float = 0.004, hold_sec: float = 1.0, max_skip_sec: float = 5.0,
+                 active_fps: float = 6.0, idle_fps: float = 2.0, enabled: bool = True):
+        """
+        :param size: 비교용 축소 크기 (width, height). 너무 작으면 INTER_AREA 평균으로 텍스처가 뭉개져
+                     움직이는 얼굴도 변화가 거의 안 잡힘 (64x48 에서는 합성 클립의 변화 비율이 0.001 까지 떨어짐)
+        :param pixel_thr: 이보다 밝기 차이가 큰 픽셀을 변한 것으로 셈 (0~255). 축소 평균으로 센서 노이즈가 줄어드므로
+                          낮게 둔다 (노이즈 표준편차 12 에서도 변한 비율 0.001 미만)
+        :param enter_ratio: 변한 픽셀 비율이 이보다 크면 active
+        :param exit_ratio: 변한 픽셀 비율이 이보다 작은 상태가 hold_sec 동안 이어지면 static
+        :param max_skip_sec: static 이어도 이 시간마다 추론
+        :param active_fps: active 일 때 처리 FPS (WebcamModule.processing_fps)
+        :param idle_fps: static 일 때 처리 FPS (움직임 확인만 하므로 낮게)
+        :param enabled: False 이면 항상 추론 (기존 동작)
+        """
+        self.size = size
+        self.pixel_thr = pixel_thr
+        self.enter_ratio = enter_ratio
+        self.exit_ratio = exit_ratio
+        self.hold_sec = hold_sec
+        self.max_skip_sec = max_skip_sec
+        self.active_fps = active_fps
+        self.idle_fps = min(idle_fps, active_fps)
+        self.enabled = enabled
+
+        self.active = True
+        self.last_ratio = 0.0
+        self._ref: Optional[np.ndarray] = None  # 마지막으로 추론한 프레임 (축소 그레이스케일)
+        self._ref_ts = 0.0
+        self._quiet_since: Optional[float] = None
+        self._pending = None  # 통과했지만 아직 executed() 되지 않은 (축소 프레임, 시각, 강제 추론 여부)
+        self.stats = {"executed": 0, "skipped": 0, "deferred": 0, "to_active": 0, "to_static": 0, "forced": 0,
+                      "gate_ms_ema": 0.0}
+
+    def reset(self):
+        """다음 프레임은 반드시 추론 (상태 전환 직후 등)"""
+        self._ref = None
+        self.active = True
+        self._quiet_since = None
+        self._pending = None
+
+    def update(self, frame: np.ndarray, now: Optional[float] = None) -> bool:
+        """
+        :param frame: BGR 프레임
+        :return: 이번 프레임에서 추론해야 하면 True (False 면 직전 결과 재사용)
+        """
+        if self._pending is not None:
+            self.stats["deferred"] += 1
+            self._pending = None
+        if not self.enabled:
+            return True
+        now = now or time.time()
+        t0 = time.perf_counter()
+        small = cv2.cvtColor(cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        if self._ref is None:
+            ratio = 1.0
+        else:
+            ratio = np.count_nonzero(cv2.absdiff(small, self._ref) > self.pixel_thr) / small.size
+        self.last_ratio = float(ratio)
+        self.stats["gate_ms_ema"] += 0.1 * ((time.perf_counter() - t0) * 1000.0 - self.stats["gate_ms_ema"])
+
+        if ratio > self.enter_ratio:
+            if not self.active:
+                self.stats["to_active"] += 1
+            self.active = True
+            self._quiet_since = None
+        elif ratio >= self.exit_ratio:
+            self._quiet_since = None  # 두 임계값 사이: 조용한 구간이 끊김
+        elif self.active:
+            if self._quiet_since is None:
+                self._quiet_since = now
+            elif now - self._quiet_since >= self.hold_sec:
+                self.active = False
+                self.stats["to_static"] += 1
+
+        run = self.active or now - self._ref_ts >= self.max_skip_sec
+        if run:
+            self._pending = (small, now, not self.active)
+        else:
+            self.stats["skipped"] += 1
+        return run
+
+    def executed(self):
+        """통과한 프레임으로 실제 추론을 돌렸을 때 호출: 그 프레임을 새 기준으로 삼음"""
+        self.stats["executed"] += 1
+        if self._pending is None:
+            return
+        small, now, forced = self._pending
+        self._pending = None
+        self._ref, self._ref_ts = small, now
+        if forced:
+            self.stats["forced"] += 1
+
+    def interval(self) -> float:
+        """현재 활동 상태에 맞는 처리 주기 (초)"""
+        return 1.0 / (self.active_fps if self.active or not self.enabled else self.idle_fps)
+
+    def summary(self) -> dict:
+        total = self.stats["executed"] + self.stats["skipped"]
+        return dict(self.stats, gate_ms_ema=round(self.stats["gate_ms_ema"], 3), active=self.active,
+                    last_ratio=round(self.last_ratio, 4),
+                    skip_rate=round(self.stats["skipped"] / total, 3) if total else 0.0)
@@ -3,7 +3,7 @@
 모든 모듈이 공유하는 데이터 구조 정의.
 """
 from dataclasses import dataclass, field
-from typing import Optional, List, Tuple
+from typing import Optional, List, Tuple, Dict
 import numpy as np
 import time
 
@@ -15,18 +15,28 @@ class PipelineData:
     각 모듈은 이 객체를 받아 자신의 데이터를 채워넣고 다음으로 넘깁니다.
     """
     # 1. 웹캠 모듈이 채우는 데이터
-    frame: Optional[np.ndarray] = None  # ML 처리용 원본 프레임 (BGR)
+    frame: Optional[np.ndarray] = None  # ML 처리용 원본 프레임 (BGR, 링 버퍼의 읽기 전용 뷰)
+    frame_seq: int = -1  # 프레임 시퀀스 번호 (건너뛴 프레임 감지용)
     frame_jpeg: Optional[bytes] = None  # 플러터 전송용 JPEG
     timestamp: float = field(default_factory=time.time)  # 프레임 캡처 시각
+    source_index: int = -1  # 프레임 소스 기준 번호 (FrameSource.index, 녹화/재생 비교 시 같은 프레임을 가리킴)
+    source_timestamp: float = 0.0  # 프레임 소스 타임스탬프 (영상은 재생 위치, 세션은 녹화 당시 시각)
 
     # 2. 특징 추출 모듈이 채우는 데이터
     face_vectors: List[List[float]] = field(default_factory=list)
     bbox_coords: List[Tuple[int, int, int, int]] = field(default_factory=list)
+    reused: bool = False  # 장면 정지로 직전 인식 결과를 재전송 (같은 임베딩이므로 인증 모듈이 새 샘플로 세지 않음)
 
     # 3. 사용자 인증 모듈이 채우는 데이터
     current_user_id: Optional[int] = None
     is_calibration_needed: bool = False
+    calibration_gen: int = 0  # 캘리브레이션 요청 세대 (요청마다 1 증가, 중간 항목이 버려져도 다음 항목에서 알 수 있음)
+    calibration_reset_gen: int = 0  # 명시적 재캘리브레이션(/calibrate_reset) 세대 (저장된 기준을 버리고 다시 잡음)
 
     # 4. 규칙 엔진 모듈이 채우는 데이터
     current_posture_status: str = "unknown"
+    recalibration_suggested: bool = False  # 기준 드리프트가 의심되지만 확정되지 않음 (/calibrate_reset 권장)
+
+    # 5. 계측 (스테이지 이름 → [진입 시각, 종료 시각], pipeline_metrics.stage_enter/stage_exit)
+    stage_times: Dict[str, List[float]] = field(default_factory=dict)
 
@@ -0,0 +1,166 @@
+"""
+파이프라인 계측.
+
+- 각 스테이지는 PipelineData.stage_times 에 진입/종료 시각을 기록합니다 (stage_enter / stage_exit).
+- 마지막 스테이지(판정 결과를 내보내는 곳)에서 PipelineMetrics.record(data) 를 호출하면
+  스테이지별 처리 시간, 스테이지 사이 대기 시간, 캡처→판정 종단 지연이 히스토그램에 쌓입니다.
+- 큐 드롭 수, 실제/목표 FPS 등은 add_source(name, fn) 으로 등록한 함수가 스냅샷 시점에 돌려줍니다.
+
+snapshot() 은 PipelineServer 의 GET /metrics 로, summary_line() 은 PipelineRunner 의 주기 출력으로 나갑니다.
+"""
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+# 지연 히스토그램 버킷 상한 (ms). 마지막 버킷은 그 이상 전부
+BUCKETS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+def stage_enter(data, stage: str, t: Optional[float] = None):
+    """스테이지 진입 시각 기록 (stage_times 가 없는 객체는 무시)"""
+    times = getattr(data, "stage_times", None)
+    if times is not None:
+        times[stage] = [t or time.time(), None]
+
+
+def stage_exit(data, stage: str, t: Optional[float] = None):
+    """스테이지 종료 시각 기록 (진입 기록이 없으면 무시)"""
+    times = getattr(data, "stage_times", None)
+    if times is not None and stage in times:
+        times[stage][1] = t or time.time()
+
+
+class LatencyHistogram:
+    def __init__(self, buckets=BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.n = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, ms: float):
+        i = 0
+        while i < len(self.buckets) and ms > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.n += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def percentile(self, q: float) -> float:
+        """버킷 상한으로 근사한 q 분위수 (ms, 관측 최댓값을 넘지 않음)"""
+        if not self.n:
+            return 0.0
+        need, cum = q * self.n, 0
+        for i, c in enumerate(self.counts):
+            cum += c
+            if cum >= need:
+                return min(float(self.buckets[i]), self.max) if i < len(self.buckets) else self.max
+        return self.max
+
+    def since(self, prev: "LatencyHistogram") -> "LatencyHistogram":
+        """prev (이 히스토그램의 이전 복사본) 이후에 관측된 값만의 히스토그램 (max 는 누적값으로 근사)"""
+        h = LatencyHistogram(self.buckets)
+        h.counts = [a - b for a, b in zip(self.counts, prev.counts)]
+        h.n, h.total, h.max = self.n - prev.n, self.total - prev.total, self.max
+        return h
+
+    def copy(self) -> "LatencyHistogram":
+        return self.since(LatencyHistogram(self.buckets))
+
+    def summary(self) -> dict:
+        return {"count": self.n, "mean_ms": round(self.total / self.n, 2) if self.n else 0.0,
+                "p50_ms": round(self.percentile(0.5), 2), "p95_ms": round(self.percentile(0.95), 2),
+                "p99_ms": round(self.percentile(0.99), 2),
+                "max_ms": round(self.max, 2), "buckets": dict(zip([str(b) for b in self.buckets] + ["inf"], self.counts))}
+
+
+class RateMeter:
+    """루프 1회마다 tick() → window 초마다 실제 FPS 갱신"""
+
+    def __init__(self, target: float, window: float = 2.0):
+        self.target = target
+        self.window = window
+        self._t0 = time.time()
+        self._n = 0
+        self.rate = 0.0
+
+    def tick(self, now: Optional[float] = None):
+        now = now or time.time()
+        self._n += 1
+        dt = now - self._t0
+        if dt >= self.window:
+            self.rate = self._n / dt
+            self._n = 0
+            self._t0 = now
+
+    def summary(self) -> dict:
+        return {"target": self.target, "actual": round(self.rate, 2)}
+
+
+class PipelineMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages: Dict[str, LatencyHistogram] = {}
+        self.waits: Dict[str, LatencyHistogram] = {}
+        self.e2e = LatencyHistogram()
+        self.sources: Dict[str, Callable[[], dict]] = {}
+        self.started_ts = time.time()
+
+    def add_source(self, name: str, fn: Callable[[], dict]):
+        """스냅샷에 포함할 외부 통계 (엣지 드롭 수, FPS 등)"""
+        self.sources[name] = fn
+
+    def record(self, data, now: Optional[float] = None):
+        """
+        판정이 끝난 PipelineData 의 stage_times 와 캡처 시각으로 지연을 기록합니다.
+
+        :param data: stage_times, timestamp 를 가진 PipelineData
+        """
+        now = now or time.time()
+        times = getattr(data, "stage_times", None) or {}
+        ordered = sorted(((name, t) for name, t in times.items() if t[1] is not None), key=lambda x: x[1][0])
+        if not ordered:
+            return  # 프레임 없이 만든 상태 알림(부재 전이 등)은 지연 계산에서 제외
+        with self._lock:
+            prev_exit = getattr(data, "timestamp", None)
+            for name, (t_in, t_out) in ordered:
+                self.stages.setdefault(name, LatencyHistogram()).observe((t_out - t_in) * 1000.0)
+                if prev_exit is not None:
+                    # 이전 스테이지(또는 캡처) 종료 → 이 스테이지 진입까지 큐 대기
+                    self.waits.setdefault(name, LatencyHistogram()).observe(max(0.0, t_in - prev_exit) * 1000.0)
+                prev_exit = t_out
+            ts = getattr(data, "timestamp", None)
+            if ts is not None:
+                self.e2e.observe((now - ts) * 1000.0)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            snap = {
+                "uptime_sec": round(time.time() - self.started_ts, 1),
+                "e2e": self.e2e.summary(),
+                "stages": {k: h.summary() for k, h in self.stages.items()},
+                "waits": {k: h.summary() for k, h in self.waits.items()},
+            }
+        for name, fn in self.sources.items():
+            try:
+                snap[name] = fn()
+            except Exception as e:
+                snap[name] = {"error": str(e)}
+        return snap
+
+    def summary_line(self) -> str:
+        """주기 출력용 한 줄 요약"""
+        with self._lock:
+            parts = [f"e2e p50={self.e2e.percentile(0.5):g}ms p95={self.e2e.percentile(0.95):g}ms n={self.e2e.n}"]
+            parts += [f"{k} p95={h.percentile(0.95):g}ms" for k, h in self.stages.items()]
+        for name, fn in self.sources.items():
+            try:
+                value = fn()
+            except Exception:
+                continue
+            if name == "edges":
+                parts.append("drops " + ",".join(f"{k}={v['dropped']}" for k, v in value.items()))
+            elif name == "fps":
+                parts.append("fps " + ",".join(f"{k}={v['actual']}/{v['target']}" for k, v in value.items()))
+        return " | ".join(parts)
@@ -0,0 +1,342 @@
+"""
+스테이지 그래프 파이프라인 실행기.
+스테이지(WebcamModule, AuthWorker, 자세 판정 등)와 그 사이의 엣지(큐)를 선언하고,
+시작/종료 순서와 엣지별 backpressure 정책, 버린 항목 수를 한 곳에서 관리합니다.
+
+엣지 정책
+- LATEST   : 가득 차면 가장 오래된 항목을 버리고 넣음 (기존 maxsize=1 + drop-oldest 와 같음)
+- FIFO     : 순서 유지 bounded 큐. 가득 차면 새로 들어온 항목을 버림
+- BLOCKING : 가득 차면 자리가 날 때까지 생산자를 멈춤 (엣지가 닫히면 버림)
+
+Edge 는 queue.Queue 를 상속하므로 기존 스테이지가 get(timeout=...) / put(...) 을 그대로 쓸 수 있고,
+put 은 정책에 따라 처리하며 queue.Full 을 던지지 않습니다.
+일반 queue.Queue 와 Edge 모두에 쓸 수 있는 offer() 가 스테이지들의 수작업 drop-oldest 를 대신합니다.
+
+실행: python pipeline_runner.py [--server] [--posture] [--encoder-workers N] [--trace info --trace-file trace.bin]
+"""
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from pipeline_metrics import PipelineMetrics, stage_enter, stage_exit
+from trace_recorder import tracer, LEVEL_NAMES
+
+LATEST = "latest"
+FIFO = "fifo"
+BLOCKING = "blocking"
+EDGE_POLICIES = (LATEST, FIFO, BLOCKING)
+
+
+class Edge(queue.Queue):
+    """정책이 있는 스테이지 간 큐. puts/dropped 카운터를 가짐"""
+
+    def __init__(self, name: str, policy: str = LATEST, maxsize: int = 1):
+        if policy not in EDGE_POLICIES:
+            raise ValueError(f"지원하지 않는 엣지 정책: {policy} (가능: {EDGE_POLICIES})")
+        if maxsize < 1:
+            raise ValueError("maxsize 는 1 이상이어야 합니다")
+        super().__init__(maxsize=maxsize)
+        self.name = name
+        self.policy = policy
+        self.closed = False
+        self.puts = 0
+        self.dropped = 0
+
+    def put(self, item, block=True, timeout=None) -> bool:
+        """
+        정책에 따라 넣습니다. block/timeout 인자는 호환용이며 무시합니다 (엣지 정책이 결정).
+
+        :return: 넣었으면 True, 버렸으면 False
+        """
+        with self.not_full:
+            if self._qsize() >= self.maxsize:
+                if self.policy == LATEST:
+                    self._get()
+                    self.unfinished_tasks -= 1
+                    self.dropped += 1
+                elif self.policy == FIFO:
+                    self.dropped += 1
+                    return False
+                else:
+                    while self._qsize() >= self.maxsize:
+                        if self.closed:
+                            self.dropped += 1
+                            return False
+                        self.not_full.wait(0.1)
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.puts += 1
+            self.not_empty.notify()
+            return True
+
+    def put_nowait(self, item) -> bool:
+        return self.put(item)
+
+    def close(self):
+        """BLOCKING 생산자를 풀어줌 (이후 put 은 자리가 없으면 버림)"""
+        with self.not_full:
+            self.closed = True
+            self.not_full.notify_all()
+
+    def summary(self) -> dict:
+        with self.mutex:
+            return {"policy": self.policy, "maxsize": self.maxsize, "depth": self._qsize(),
+                    "puts": self.puts, "dropped": self.dropped}
+
+
+def offer(q: queue.Queue, item) -> bool:
+    """
+    다음 단계 큐에 넣습니다. Edge 면 엣지 정책을, 일반 Queue 면 drop-oldest 를 적용합니다.
+
+    :return: 넣었으면 True
+    """
+    if isinstance(q, Edge):
+        return q.put(item)
+    try:
+        q.put_nowait(item)
+        return True
+    except queue.Full:
+        try:
+            q.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            q.put_nowait(item)
+            return True
+        except queue.Full:
+            return False
+
+
+class Stage:
+    """시작/종료 함수로 감싼 스테이지 (자체 스레드를 관리하는 WebcamModule 등)"""
+
+    def __init__(self, name: str, start: Callable[[], None], stop: Callable[[], None]):
+        self.name = name
+        self._start, self._stop = start, stop
+
+    def start(self):
+        self._start()
+
+    def stop(self):
+        self._stop()
+
+
+class ThreadStage(Stage):
+    """
+    run(stop_event) 루프를 스레드로 돌리는 스테이지.
+    종료 시 stop_event 를 세우고, on_stop 이 있으면 호출한 뒤 스레드를 기다립니다.
+    """
+
+    def __init__(self, name: str, run: Callable[[threading.Event], None], on_stop: Optional[Callable[[], None]] = None,
+                 join_timeout: float = 2.0):
+        self.name = name
+        self.run = run
+        self.on_stop = on_stop
+        self.join_timeout = join_timeout
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, args=(self.stop_event,), name=self.name, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.on_stop is not None:
+            self.on_stop()
+        if self.thread:
+            self.thread.join(timeout=self.join_timeout)
+            if self.thread.is_alive():
+                print(f"PipelineRunner: {self.name} 스레드가 {self.join_timeout}초 안에 끝나지 않았습니다")
+
+
+class FunctionStage(ThreadStage):
+    """
+    in_edge 에서 꺼낸 항목에 fn 을 적용해 out_edge 로 넘기는 스테이지 (fn 이 None 을 돌려주면 넘기지 않음).
+    항목의 stage_times 에 스테이지 이름으로 진입/종료 시각을 기록합니다.
+    """
+
+    def __init__(self, name: str, fn: Callable, in_edge: queue.Queue, out_edge: Optional[queue.Queue] = None,
+                 poll: float = 0.2):
+        super().__init__(name, self._loop)
+        self.fn = fn
+        self.in_edge = in_edge
+        self.out_edge = out_edge
+        self.poll = poll
+
+    def _loop(self, stop_event: threading.Event):
+        while not stop_event.is_set():
+            try:
+                item = self.in_edge.get(timeout=self.poll)
+            except queue.Empty:
+                continue
+            stage_enter(item, self.name)
+            out = self.fn(item)
+            if out is not None:
+                stage_exit(out, self.name)
+                if self.out_edge is not None:
+                    offer(self.out_edge, out)
+
+
+class PipelineRunner:
+    def __init__(self):
+        self.stages: List[Stage] = []
+        self.edges: Dict[str, Edge] = {}
+        self.running = False
+        self.metrics = PipelineMetrics()
+        self.metrics.add_source("edges", self.edge_stats)
+
+    def edge(self, name: str, policy: str = LATEST, maxsize: int = 1) -> Edge:
+        if name in self.edges:
+            raise ValueError(f"이미 있는 엣지: {name}")
+        self.edges[name] = Edge(name, policy, maxsize)
+        return self.edges[name]
+
+    def add_stage(self, stage: Stage) -> Stage:
+        """선언 순서 = 시작 순서 (상류부터). 종료도 상류부터 해서 하류가 남은 항목을 처리하게 한다"""
+        self.stages.append(stage)
+        return stage
+
+    def start(self):
+        self.running = True
+        started = []
+        try:
+            for stage in self.stages:
+                print(f"PipelineRunner: {stage.name} 시작")
+                stage.start()
+                started.append(stage)
+        except Exception:
+            for stage in started:
+                stage.stop()
+            self.running = False
+            raise
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        for stage in self.stages:
+            print(f"PipelineRunner: {stage.name} 정지")
+            try:
+                stage.stop()
+            except Exception as e:
+                print(f"PipelineRunner: {stage.name} 정지 중 오류: {e}")
+        # 상류부터 멈췄으므로 BLOCKING 엣지에서 기다리는 생산자는 없어야 하지만, 남아 있으면 풀어준다
+        for e in self.edges.values():
+            e.close()
+        print(f"PipelineRunner: 엣지 통계 {self.edge_stats()}")
+
+    def edge_stats(self) -> Dict[str, dict]:
+        return {name: e.summary() for name, e in self.edges.items()}
+
+    def run_forever(self, report_sec: float = 0.0):
+        """start() 후 Ctrl+C 까지 대기하고 stop(). report_sec > 0 이면 주기적으로 지연/드롭/FPS 요약 출력"""
+        self.start()
+        last = time.time()
+        try:
+            while self.running:
+                time.sleep(0.5)
+                if report_sec and time.time() - last >= report_sec:
+                    last = time.time()
+                    print(f"PipelineRunner: {self.metrics.summary_line()}", flush=True)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+
+def build_default_pipeline(camera_id: int = 0, encoder_workers: int = 0, posture_fn: Optional[Callable] = None,
+                           server: bool = False, recorder=None, store=None, **webcam_kwargs) -> PipelineRunner:
+    """
+    camera → features (WebcamModule) → auth (AuthWorker) → posture → (server) 파이프라인.
+
+    :param posture_fn: PipelineData 를 받아 current_posture_status 를 채워 돌려주는 함수
+                       (posture_stage.PostureStage, None 이면 그대로 통과)
+    :param server: True 면 마지막 결과를 PipelineServer(127.0.0.1:5001) 로 내보냄 (GET /metrics 로 계측값 제공)
+    :param recorder: SessionRecorder 를 주면 판정 결과를 outputs.jsonl 에 기록
+    :param store: AuthWorker 갤러리 저장소 (None 이면 InMemoryUserStore, 자세 기준 캐시는 영속 저장소에서만 사용)
+    :param webcam_kwargs: WebcamModule 인자 (source=FrameSource 로 카메라 대신 영상/녹화 세션 사용)
+    """
+    from webcam_feature_module import WebcamModule
+    from auth_worker import AuthWorker
+
+    runner = PipelineRunner()
+    feature_to_auth = runner.edge("feature_to_auth", LATEST)
+    auth_to_posture = runner.edge("auth_to_posture", LATEST)
+    posture_out = runner.edge("posture_out", LATEST)
+
+    webcam = WebcamModule(camera_id=camera_id, encoder_workers=encoder_workers, **webcam_kwargs)
+    webcam.set_output_queue(feature_to_auth)
+    worker = AuthWorker(feature_to_auth, auth_to_posture, store=store)
+    if hasattr(posture_fn, "bind_gallery"):
+        posture_fn.bind_gallery(worker.store)
+
+    runner.add_stage(Stage("camera+features", webcam.start, webcam.stop))
+    runner.add_stage(ThreadStage("auth", lambda ev: worker.run_forever(stop_event=ev)))
+    runner.add_stage(FunctionStage("posture", posture_fn or (lambda d: d), auth_to_posture, posture_out))
+
+    metrics = runner.metrics
+    metrics.add_source("fps", webcam.get_fps_stats)
+    metrics.add_source("frames", webcam.get_frame_stats)
+    metrics.add_source("motion", webcam.get_motion_stats)
+    if hasattr(posture_fn, "summary"):
+        metrics.add_source("posture", posture_fn.summary)
+    metrics.add_source("gallery", lambda: {"embeddings": len(worker.store.matrix()[1]),
+                                           "users": len(set(worker.store.matrix()[1].tolist()))})
+    if server:
+        from preview_server import PipelineServer
+        srv = PipelineServer(webcam, on_calibrate_reset=worker.request_calibration, metrics=metrics)
+        metrics.add_source("server", lambda: dict(srv.stats))
+
+        def sink(d):
+            metrics.record(d)
+            if recorder is not None:
+                recorder.write_output(d)
+            srv.publish(d)
+        runner.add_stage(Stage("server", srv.start, srv.stop))
+    else:
+        def sink(d):
+            metrics.record(d)
+            if recorder is not None:
+                recorder.write_output(d)
+            print(f"[PIPELINE] user={d.current_user_id} posture={d.current_posture_status} "
+                  f"calib={d.is_calibration_needed}", flush=True)
+    # 판정 결과가 나가는 지점에서 캡처→판정 지연을 기록
+    runner.add_stage(FunctionStage("sink", sink, posture_out))
+    return runner
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--camera", default="0", help="카메라 번호 또는 영상 파일/이미지 폴더/녹화 세션 경로")
+    ap.add_argument("--encoder-workers", type=int, default=0)
+    ap.add_argument("--server", action="store_true", help="127.0.0.1:5001 로 결과/미리보기 제공")
+    ap.add_argument("--posture", action="store_true", help="얼굴 영역 FaceMesh 로 자세 판정 (mediapipe 필요)")
+    ap.add_argument("--baseline-cache", default="calibration_baselines.json",
+                    help="사용자별 자세 기준 캐시 파일 (--posture 와 --gallery 필요, 빈 문자열이면 캐시 안 함)")
+    ap.add_argument("--gallery", default="", help="영속 갤러리 디렉터리 (MmapUserStore, 비우면 메모리 저장소)")
+    ap.add_argument("--report-sec", type=float, default=10.0)
+    ap.add_argument("--trace", choices=sorted(LEVEL_NAMES), default="off", help="재감지/인증 결정 트레이스 레벨")
+    ap.add_argument("--trace-file", default="trace.bin", help="트레이스 출력 파일 (예외 종료 시에도 저장)")
+    args = ap.parse_args()
+    if args.trace != "off":
+        tracer.level = LEVEL_NAMES[args.trace]
+        tracer.start_writer(args.trace_file)
+        tracer.install_crash_dump(args.trace_file + ".crash")
+    try:
+        posture_fn = None
+        if args.posture:
+            from posture_stage import PostureStage
+            from baseline_cache import BaselineCache
+            posture_fn = PostureStage(cache=BaselineCache(args.baseline_cache) if args.baseline_cache else None)
+        store = None
+        if args.gallery:
+            from mmap_user_store import MmapUserStore
+            store = MmapUserStore(args.gallery)
+        build_default_pipeline(args.camera, args.encoder_workers, posture_fn=posture_fn,
+                               server=args.server, store=store).run_forever(args.report_sec)
+    finally:
+        tracer.stop_writer()
@@ -0,0 +1,145 @@
+"""
+자세 판정 엔진.
+posture_tracker.py 루프 안에 있던 규칙을 기준(Baseline) 객체와 함께 재사용할 수 있게 분리했습니다.
+
+규칙 (기준 대비, 위에서부터 먼저 맞는 것)
+- 얼굴 크기 비율 < 0.9                        → "L"      (뒤로 젖힘, 멀어짐)
+- |코 dx| > 기준 박스 너비 × 0.2               → "left" / "right"
+- 0.9 ≤ 얼굴 크기 비율 ≤ 1.45 이고 코 dy > 25  → "turtle" (거북목)
+- 그 외                                        → "normal"
+
+랜드마크는 프레임당 한 번 (N, 2) 배열로 바꾸고(landmarks_to_array), 박스/코 좌표는 배열 연산으로 구합니다.
+classify() 는 한 프레임, classify_batch() 는 dx/dy/scale 배열 전체를 한 번에 판정합니다
+(실시간 스트림과 pose_log.csv 재판정에 같은 규칙을 씀).
+"""
+import csv
+from dataclasses import dataclass
+from typing import Dict, Sequence, Tuple
+import numpy as np
+
+NOSE_INDEX = 1
+LABELS = ("normal", "L", "left", "right", "turtle")
+NORMAL, BACK, LEFT, RIGHT, TURTLE = range(len(LABELS))
+
+
+@dataclass
+class Baseline:
+    """캘리브레이션 때 잡은 정자세 기준 (픽셀 좌표)"""
+    box: Tuple[int, int, int, int]  # x, y, w, h
+    nose: Tuple[int, int]
+
+    @property
+    def area(self) -> float:
+        return float(self.box[2] * self.box[3])
+
+
+@dataclass
+class PostureResult:
+    pose: str
+    dx: int
+    dy: int
+    face_scale: float
+
+
+def landmarks_to_array(landmarks, width: int, height: int) -> np.ndarray:
+    """
+    mediapipe 얼굴 랜드마크 → 픽셀 좌표 (N, 2) 배열
+
+    :param landmarks: face.landmark (x, y 가 0~1 로 정규화된 점 목록)
+    """
+    pts = np.array([(lm.x, lm.y) for lm in landmarks], dtype=np.float64)
+    pts *= (width, height)
+    return pts
+
+
+def face_box(pts: np.ndarray) -> Tuple[int, int, int, int]:
+    """랜드마크를 감싸는 박스 (x, y, w, h)"""
+    x_min, y_min = pts.min(axis=0).astype(int)
+    x_max, y_max = pts.max(axis=0).astype(int)
+    return int(x_min), int(y_min), int(x_max - x_min), int(y_max - y_min)
+
+
+def nose_point(pts: np.ndarray) -> Tuple[int, int]:
+    return int(pts[NOSE_INDEX, 0]), int(pts[NOSE_INDEX, 1])
+
+
+class PostureClassifier:
+    def __init__(self, back_scale: float = 0.9, lateral_ratio: float = 0.2, turtle_dy: float = 25.0,
+                 turtle_max_scale: float = 1.45):
+        """
+        :param back_scale: 얼굴 크기 비율이 이보다 작으면 "L"
+        :param lateral_ratio: |dx| 가 기준 박스 너비 × 이 값보다 크면 좌우 기울기
+        :param turtle_dy: 코가 이 픽셀보다 많이 내려가면 거북목 (크기 비율이 back_scale ~ turtle_max_scale 일 때)
+        """
+        self.back_scale = back_scale
+        self.lateral_ratio = lateral_ratio
+        self.turtle_dy = turtle_dy
+        self.turtle_max_scale = turtle_max_scale
+
+    def classify(self, box: Sequence[int], nose: Sequence[int], baseline: Baseline) -> PostureResult:
+        """한 프레임 판정. box=(x, y, w, h), nose=(x, y)"""
+        dx, dy = int(nose[0] - baseline.nose[0]), int(nose[1] - baseline.nose[1])
+        face_scale = (box[2] * box[3]) / baseline.area
+        bw = baseline.box[2]
+        if face_scale < self.back_scale:
+            pose = "L"
+        elif abs(dx) > bw * self.lateral_ratio:
+            pose = "left" if dx < 0 else "right"
+        elif self.back_scale <= face_scale <= self.turtle_max_scale and dy > self.turtle_dy:
+            pose = "turtle"
+        else:
+            pose = "normal"
+        return PostureResult(pose, dx, dy, face_scale)
+
+    def classify_landmarks(self, pts: np.ndarray, baseline: Baseline) -> PostureResult:
+        return self.classify(face_box(pts), nose_point(pts), baseline)
+
+    def classify_batch(self, dx: np.ndarray, dy: np.ndarray, face_scale: np.ndarray, bw) -> np.ndarray:
+        """
+        여러 프레임을 한 번에 판정합니다.
+
+        :param bw: 기준 박스 너비 (스칼라 또는 프레임별 배열)
+        :return: LABELS 인덱스 배열 (uint8). 문자열은 labels(codes) 로 변환
+        """
+        dx, dy, face_scale = np.asarray(dx), np.asarray(dy), np.asarray(face_scale)
+        lateral = np.abs(dx) > np.asarray(bw) * self.lateral_ratio
+        conds = [face_scale < self.back_scale,
+                 lateral & (dx < 0),
+                 lateral,
+                 (face_scale >= self.back_scale) & (face_scale <= self.turtle_max_scale) & (dy > self.turtle_dy)]
+        return np.select(conds, [BACK, LEFT, RIGHT, TURTLE], NORMAL).astype(np.uint8)
+
+    def classify_frames(self, boxes: np.ndarray, noses: np.ndarray, baseline: Baseline) -> np.ndarray:
+        """boxes (N, 4), noses (N, 2) 를 같은 기준으로 판정 → LABELS 인덱스 배열"""
+        boxes, noses = np.asarray(boxes, dtype=np.float64), np.asarray(noses)
+        d = np.trunc(noses - np.asarray(baseline.nose))
+        scale = boxes[:, 2] * boxes[:, 3] / baseline.area
+        return self.classify_batch(d[:, 0], d[:, 1], scale, baseline.box[2])
+
+    def classify_log(self, path: str, default_bw: float = 150.0) -> Dict[str, np.ndarray]:
+        """
+        pose_log.csv (dx, dy, scale[, bw]) 를 다시 판정합니다.
+        bw 열이 없는 예전 로그는 default_bw 를 기준 박스 너비로 가정합니다.
+
+        :return: {"dx", "dy", "scale", "bw", "codes"} 배열
+        """
+        cols = load_log_columns(path)
+        if "bw" not in cols:
+            cols["bw"] = np.full(len(cols["dx"]), default_bw)
+        cols["codes"] = self.classify_batch(cols["dx"], cols["dy"], cols["scale"], cols["bw"])
+        return cols
+
+
+def labels(codes: np.ndarray) -> np.ndarray:
+    return np.asarray(LABELS, dtype=object)[codes]
+
+
+def load_log_columns(path: str, columns: Tuple[str, ...] = ("dx", "dy", "scale", "bw")) -> Dict[str, np.ndarray]:
+    """pose_log.csv 의 숫자 열을 float 배열로 읽음 (없는 열은 생략)"""
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        idx = {c: header.index(c) for c in columns if c in header}
+        rows = [[r[i] for i in idx.values()] for r in reader if r]
+    arr = np.array(rows, dtype=np.float64).reshape(-1, len(idx))
+    return {c: arr[:, j] for j, c in enumerate(idx)}
@@ -0,0 +1,296 @@
+"""
+파이프라인 자세 판정 스테이지.
+posture_tracker.py 처럼 카메라를 따로 열고 전체 프레임에 FaceMesh 를 돌리는 대신,
+WebcamModule 이 읽은 프레임과 추적/감지 박스(AuthWorker 를 거친 PipelineData)를 받아
+얼굴 주변만 잘라 단일 얼굴 설정의 FaceMesh 를 돌리고 current_posture_status 를 채웁니다.
+
+- FaceMesh 는 직전 랜드마크로 다음 프레임을 추적하므로(static_image_mode=False) 자르는 영역의 원점이 매 프레임
+  바뀌면 추적 좌표가 어긋납니다. 그래서 정사각형 ROI 를 얼굴이 안쪽에 머무는 동안 고정하고, 벗어나거나 크기가 크게
+  바뀔 때만 다시 잡으며, 항상 roi_size 크기로 늘려 넣은 뒤 랜드마크를 전체 프레임 좌표로 되돌립니다.
+
+- 좌표는 posture_tracker.py 와 같게 좌우 반전(mirror) 기준으로 계산합니다 (left/right 방향 일치).
+- AuthWorker 의 캘리브레이션 요청 세대(calibration_gen)가 바뀌면 그 사용자의 캘리브레이션을 시작하고,
+  최근 calib_sec 동안 코/박스가 안정되는 순간 그 사용자의 기준(Baseline)으로 판정합니다.
+  is_calibration_needed 는 몇 개 출력에만 서서 앞의 LATEST 엣지에서 버려질 수 있으므로 세대를 비교합니다.
+- cache(BaselineCache) 를 주면 캘리브레이션 결과를 사용자별로 저장하고, 다시 인식된 사용자는 저장된 기준으로
+  첫 프레임부터 판정합니다. DriftMonitor 가 기준이 맞지 않게 된 것(카메라/자리 이동)을 감지해도 크게 숙이거나 기댄
+  자세와 구분할 수 없으므로 다음 경우에만 재캘리브레이션합니다.
+  · 이전 세션의 기준으로 시작한 뒤 DriftMonitor.start_sec 안의 드리프트: 위치가 그대로면 카메라 거리 변화로 보고
+    rescale_baseline() 으로 기준 크기만 맞추고, 위치가 옮겨졌으면 재캘리브레이션
+  · 세션 중간의 드리프트가 persist_sessions 세션 연속 나타남 (BaselineCache.note_drift)
+  그 밖에는 recalibration_suggested 를 세워 클라이언트가 /calibrate_reset 을 권하게 합니다.
+  bind_gallery(store) 로 갤러리를 연결하면 병합된 id 의 기준을 남은 id 로 옮기고, 영속 갤러리가 아니면 캐시를 끕니다.
+- 명시적 재캘리브레이션 요청(calibration_reset_gen 변경, /calibrate_reset)은 저장된 기준을 버리고 항상 다시 잡습니다.
+- is_calibration_needed 는 이 스테이지에서 실제로 캘리브레이션 중인지로 다시 채웁니다.
+- 상태값: LABELS 의 자세 외에 "calibrating", "no_face", "unknown" (사용자 미인식)
+
+사용: build_default_pipeline(posture_fn=PostureStage()) 또는 python pipeline_runner.py --posture
+"""
+import time
+from typing import Callable, Dict, Optional
+import cv2
+import numpy as np
+
+from is_stable import StabilityDetector
+from posture_classifier import PostureClassifier, Baseline, landmarks_to_array, face_box, nose_point
+from baseline_cache import BaselineCache, DriftMonitor, rescale_baseline
+
+CALIBRATING, NO_FACE, UNKNOWN = "calibrating", "no_face", "unknown"
+
+
+class PostureStage:
+    def __init__(self, classifier: Optional[PostureClassifier] = None, crop_margin: float = 0.5, mirror: bool = True,
+                 calib_sec: float = 1.5, min_crop: int = 32, min_detection_confidence: float = 0.5,
+                 min_tracking_confidence: float = 0.5, cache: Optional[BaselineCache] = None,
+                 drift: Optional[DriftMonitor] = None,
+                 resolve: Optional[Callable[[Optional[int]], Optional[int]]] = None, persist_sessions: int = 2,
+                 roi_size: int = 256, roi_keep: float = 0.1, roi_rescale: float = 0.25):
+        """
+        :param crop_margin: 얼굴 박스 각 변에 더할 여백 (박스 크기 대비). 추적 박스는 10% 축소되어 있으므로 넉넉히 둔다
+        :param mirror: posture_tracker.py 와 같이 좌우 반전 좌표로 판정
+        :param calib_sec: 캘리브레이션 안정 확인 윈도 (캡처 시각 기준)
+        :param min_crop: 이보다 작은 얼굴 영역은 FaceMesh 를 돌리지 않음
+        :param cache: 사용자별 기준 캐시 (None 이면 세션마다 캘리브레이션)
+        :param drift: 캐시 기준 드리프트 감지기 (cache 가 있으면 기본값 사용)
+        :param resolve: 병합된 user_id → 남은 id (갤러리 store.resolve, bind_gallery 가 채움)
+        :param persist_sessions: 세션 중간의 드리프트가 이 횟수의 세션 연속 나타나야 재캘리브레이션
+        :param roi_size: FaceMesh 에 넣는 ROI 크기 (정사각형, 픽셀)
+        :param roi_keep: 얼굴 박스가 ROI 가장자리에서 ROI 크기 × 이 값 안쪽에 있으면 ROI 유지
+        :param roi_rescale: 필요한 ROI 크기가 현재와 이 비율 이상 다르면 ROI 를 다시 잡음
+        """
+        import mediapipe as mp
+        self.mesh = mp.solutions.face_mesh.FaceMesh(static_image_mode=False, max_num_faces=1, refine_landmarks=False,
+                                                    min_detection_confidence=min_detection_confidence,
+                                                    min_tracking_confidence=min_tracking_confidence)
+        self.classifier = classifier or PostureClassifier()
+        self.crop_margin = crop_margin
+        self.mirror = mirror
+        self.calib_sec = calib_sec
+        self.min_crop = min_crop
+        self.roi_size = roi_size
+        self.roi_keep = roi_keep
+        self.roi_rescale = roi_rescale
+        self._roi: Optional[tuple] = None  # (x0, y0, side) 현재 고정된 ROI
+
+        self.baselines: Dict[int, Baseline] = {}
+        self.calib_user: Optional[int] = None
+        self.stability = StabilityDetector(window_sec=calib_sec)
+        self.cache = cache
+        self.drift = drift or (DriftMonitor() if cache is not None else None)
+        self.persist_sessions = persist_sessions
+        self._drift_user: Optional[int] = None  # 드리프트 감시 중인 세션의 사용자 (None 이면 다음 판정에서 새 세션)
+        self._session_start = 0.0
+        self._session_drift = False  # 이번 세션에서 드리프트를 이미 기록했는지
+        self._from_cache = set()  # 이전 세션의 기준으로 판정 중인 사용자
+        self.resolve = resolve
+        self._calib_gen = 0  # 마지막으로 처리한 캘리브레이션 요청 세대
+        self._reset_gen = 0  # 마지막으로 처리한 명시적 재캘리브레이션 세대
+        self._last_uid: Optional[int] = None
+        self.stats = {"frames": 0, "mesh_runs": 0, "no_face": 0, "calibrations": 0, "calib_sec_ema": 0.0,
+                      "cache_hits": 0, "drift_recalibrations": 0, "distance_rescales": 0, "drift_suggested": 0,
+                      "resets": 0, "remapped": 0, "roi_moves": 0, "mesh_ms_ema": 0.0}
+
+    def bind_gallery(self, store):
+        """
+        갤러리 저장소 연결. 메모리 저장소는 재시작하면 user_id 를 다시 매기므로 캐시된 기준이 다른 사람에게 붙을 수 있어
+        영속 저장소(persistent)가 아니면 캐시를 끕니다.
+        """
+        self.resolve = store.resolve
+        if self.cache is not None and not getattr(store, "persistent", False):
+            print("[POSTURE] 갤러리가 영속 저장소가 아니므로 자세 기준 캐시를 사용하지 않습니다")
+            self.cache = None
+
+    def __call__(self, data):
+        self.stats["frames"] += 1
+        uid = data.current_user_id
+        frame_size = (data.frame.shape[1], data.frame.shape[0]) if data.frame is not None else None
+        if uid != self._last_uid:
+            self._last_uid = uid
+            self._remap_ids()
+        reset = uid is not None and data.calibration_reset_gen != self._reset_gen
+        if reset:
+            self._reset_gen = data.calibration_reset_gen
+        requested = uid is not None and data.calibration_gen != self._calib_gen
+        if requested:
+            self._calib_gen = data.calibration_gen
+        if reset:
+            # 명시적 재캘리브레이션: 메모리/캐시의 기준을 모두 버리고 다시 잡음
+            self.baselines.pop(uid, None)
+            if self.cache is not None:
+                self.cache.invalidate(uid)
+            self.stats["resets"] += 1
+            self.start_calibration(uid, data.timestamp)
+        elif requested and self.calib_user != uid:
+            # 로그인/재인식: 캐시에 기준이 있으면 바로 사용 (캐시를 쓰면 이미 불러온 기준은 유지)
+            cached = self.cache is not None and uid in self.baselines
+            if cached:
+                self._from_cache.add(uid)
+            if not cached and not self._load_cached(uid, frame_size):
+                self.start_calibration(uid, data.timestamp)
+            self._drift_user = None
+
+        pts = self._landmarks(data)
+        if pts is None:
+            self.stats["no_face"] += 1
+            data.current_posture_status = NO_FACE
+        else:
+            box, nose = face_box(pts), nose_point(pts)
+            if uid is None:
+                data.current_posture_status = UNKNOWN
+            elif self.calib_user != uid and uid not in self.baselines and not self._load_cached(uid, frame_size):
+                # 인식은 됐지만 기준이 없는 사용자 (스테이지 시작 전에 로그인한 경우 등)
+                self.start_calibration(uid, data.timestamp)
+                data.current_posture_status = CALIBRATING
+            elif self.calib_user == uid:
+                data.current_posture_status = self._calibrate(uid, box, nose, data.timestamp, frame_size)
+            else:
+                data.current_posture_status = self.classifier.classify(box, nose, self.baselines[uid]).pose
+                data.recalibration_suggested = self._check_drift(uid, box, nose, data.timestamp, frame_size)
+        if uid is not None:
+            data.is_calibration_needed = self.calib_user == uid
+        return data
+
+    def _remap_ids(self):
+        """갤러리 압축으로 병합된 id 의 기준을 남은 id 로 옮김 (남은 id 에 이미 기준이 있으면 그것을 유지)"""
+        if self.resolve is None:
+            return
+        for old in [u for u in self.baselines if self.resolve(u) != u]:
+            self.baselines.setdefault(self.resolve(old), self.baselines.pop(old))
+            self.stats["remapped"] += 1
+        self._from_cache = {self.resolve(u) for u in self._from_cache}
+        if self.calib_user is not None:
+            self.calib_user = self.resolve(self.calib_user)
+        if self.cache is not None:
+            self.cache.remap(self.resolve)
+
+    def _load_cached(self, uid: int, frame_size) -> bool:
+        if self.cache is None or frame_size is None:
+            return False
+        baseline = self.cache.get(uid, frame_size)
+        if baseline is None:
+            return False
+        self.baselines[uid] = baseline
+        self._from_cache.add(uid)
+        if self.calib_user == uid:
+            self.calib_user = None
+        self.stats["cache_hits"] += 1
+        return True
+
+    def _check_drift(self, uid: int, box, nose, ts: float, frame_size) -> bool:
+        """:return: 드리프트가 보였지만 확정되지 않아 /calibrate_reset 을 권하는 중이면 True"""
+        if self.drift is None:
+            return False
+        if self._drift_user != uid:
+            self._drift_user = uid
+            self._session_start = ts
+            self._session_drift = False
+            self.drift.reset()
+        verdict = self.drift.update(ts, box, nose, self.baselines[uid])
+        at_start = uid in self._from_cache and ts - self._session_start <= self.drift.start_sec
+        if verdict is None:
+            return self._session_drift
+        if not verdict:
+            if at_start and self.cache is not None:
+                self.cache.clear_drift(uid)  # 기준대로 앉아 시작한 세션이면 연속 기록을 끊음
+            return self._session_drift
+
+        if at_start and self.drift.distance_only() and frame_size is not None:
+            # 이전 세션 기준으로 시작하자마자 크기만 다름: 카메라 거리 변화 → 기준 크기만 맞춤
+            self.baselines[uid] = rescale_baseline(self.baselines[uid], box, frame_size)
+            if self.cache is not None:
+                self.cache.put(uid, self.baselines[uid], frame_size)
+            self.stats["distance_rescales"] += 1
+            self.drift.reset()
+            print(f"[POSTURE] user_{uid} 카메라 거리 변화 (크기 {self.drift.last_scale:.2f}배) → 기준 보정 "
+                  f"{self.baselines[uid].box}")
+            return False
+        if at_start:
+            reason = "세션 시작"
+        elif self._session_drift:
+            return True
+        else:
+            self._session_drift = True
+            sessions = self.cache.note_drift(uid) if self.cache is not None else 1
+            if sessions < self.persist_sessions:
+                self.stats["drift_suggested"] += 1
+                print(f"[POSTURE] user_{uid} 기준 드리프트 의심 (box={box}, 기준={self.baselines[uid].box}, "
+                      f"연속 {sessions}세션) → 재캘리브레이션 권장")
+                return True
+            reason = f"{sessions}세션 연속"
+        print(f"[POSTURE] user_{uid} 기준 드리프트 확정 ({reason}, box={box}, 기준={self.baselines[uid].box}) "
+              f"→ 재캘리브레이션")
+        self.stats["drift_recalibrations"] += 1
+        self.start_calibration(uid, ts)
+        return False
+
+    def start_calibration(self, uid: int, ts: Optional[float] = None):
+        self.calib_user = uid
+        self._calib_start = ts or time.time()
+        self.stability.reset()
+
+    def _calibrate(self, uid: int, box, nose, ts: float, frame_size) -> str:
+        if not self.stability.update(ts, nose, (box[2], box[3])):
+            return CALIBRATING
+        self.baselines[uid] = Baseline(box, nose)
+        self._from_cache.discard(uid)
+        self.calib_user = None
+        self._drift_user = None
+        if self.cache is not None and frame_size is not None:
+            self.cache.put(uid, self.baselines[uid], frame_size)
+        took = ts - self._calib_start
+        self.stats["calibrations"] += 1
+        self.stats["calib_sec_ema"] += 0.2 * (took - self.stats["calib_sec_ema"])
+        print(f"[POSTURE] user_{uid} 캘리브레이션 완료 ({took:.1f}초) box={box} nose={nose}")
+        return self.classifier.classify(box, nose, self.baselines[uid]).pose
+
+    def _stable_roi(self, box, fw: int, fh: int):
+        """얼굴 박스를 담는 정사각형 ROI (x0, y0, side). 얼굴이 현재 ROI 안쪽에 있고 크기가 비슷하면 그대로 유지"""
+        x, y, w, h = box
+        side = min(int(max(w, h) * (1 + 2 * self.crop_margin)), fw, fh)
+        if self._roi is not None:
+            rx, ry, rside = self._roi
+            keep = rside * self.roi_keep
+            inside = (x >= rx + keep and y >= ry + keep and x + w <= rx + rside - keep and y + h <= ry + rside - keep)
+            if inside and abs(side - rside) <= rside * self.roi_rescale:
+                return self._roi
+        cx, cy = x + w / 2, y + h / 2
+        x0 = int(min(max(cx - side / 2, 0), fw - side))
+        y0 = int(min(max(cy - side / 2, 0), fh - side))
+        self._roi = (x0, y0, side)
+        self.stats["roi_moves"] += 1
+        return self._roi
+
+    def _landmarks(self, data) -> Optional[np.ndarray]:
+        """가장 큰 얼굴 박스를 담는 고정 ROI 를 잘라 FaceMesh → 전체 프레임 픽셀 좌표 (N, 2)"""
+        frame = data.frame
+        if frame is None or not data.bbox_coords:
+            return None
+        fh, fw = frame.shape[:2]
+        x0, y0, side = self._stable_roi(max(data.bbox_coords, key=lambda b: b[2] * b[3]), fw, fh)
+        if side < self.min_crop:
+            return None
+
+        t0 = time.perf_counter()
+        crop = cv2.resize(frame[y0:y0 + side, x0:x0 + side], (self.roi_size, self.roi_size),
+                          interpolation=cv2.INTER_LINEAR)
+        results = self.mesh.process(cv2.cvtColor(crop, cv2.COLOR_BGR2RGB))
+        ms = (time.perf_counter() - t0) * 1000.0
+        self.stats["mesh_runs"] += 1
+        self.stats["mesh_ms_ema"] += 0.1 * (ms - self.stats["mesh_ms_ema"])
+        if not results.multi_face_landmarks:
+            self._roi = None  # 놓쳤으면 다음 프레임은 현재 박스 기준으로 다시 잡음
+            return None
+
+        # 정규화 좌표이므로 늘린 크기와 상관없이 ROI 크기로 환산
+        pts = landmarks_to_array(results.multi_face_landmarks[0].landmark, side, side)
+        pts += (x0, y0)
+        if self.mirror:
+            pts[:, 0] = fw - pts[:, 0]
+        return pts
+
+    def summary(self) -> dict:
+        return dict(self.stats, users_calibrated=len(self.baselines), calibrating=self.calib_user,
+                    cached_users=len(self.cache) if self.cache is not None else 0)
+
+    def close(self):
+        self.mesh.close()
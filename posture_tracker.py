@@ -1,16 +1,20 @@
+import sys
 import cv2
 import mediapipe as mp
 import time
 import pandas as pd
 from datetime import datetime
-from is_stable import is_stable;
+from is_stable import StabilityDetector
+from frame_source import open_frame_source
+from posture_classifier import PostureClassifier, Baseline, landmarks_to_array, face_box, nose_point
 
 mp_face_mesh = mp.solutions.face_mesh
-NOSE_INDEX = 1 
+classifier = PostureClassifier()
 # 로그 누적용
 pose_log = []
 
-cap = cv2.VideoCapture(0)
+# 인자로 영상 파일/이미지 폴더/녹화 세션 경로를 주면 카메라 대신 사용 (예: python posture_tracker.py sessions/s1)
+cap = open_frame_source(sys.argv[1] if len(sys.argv) > 1 else 0)
 if not cap.isOpened():
     print("카메라를 열 수 없습니다.")
     exit()
@@ -19,11 +23,10 @@ calibrated = False
 baseline_box = None
 baseline_nose = None
 
-# 안정 검출용 변수
+# 안정 검출용 변수 (최근 1.5초 윈도가 안정되는 순간 캘리브레이션 완료)
 stabilizing = False
 stability_start = 0
-nose_history = []
-box_history = []
+stability = StabilityDetector(window_sec=1.5)
 
 
 
@@ -45,17 +48,11 @@ with mp_face_mesh.FaceMesh(
         if results.multi_face_landmarks:
             face = results.multi_face_landmarks[0]
 
-            # bounding box 계산
-            xs = [lm.x * w for lm in face.landmark]
-            ys = [lm.y * h for lm in face.landmark]
-            x_min, x_max = int(min(xs)), int(max(xs))
-            y_min, y_max = int(min(ys)), int(max(ys))
-            current_box = (x_min, y_min, x_max - x_min, y_max - y_min)
-
-            # 코 좌표
-            nose = face.landmark[NOSE_INDEX]
-            nose_point = (int(nose.x * w), int(nose.y * h))
-            cv2.circle(frame, nose_point, 4, (0, 255, 0), -1)
+            # 랜드마크를 한 번만 배열로 바꿔 bounding box / 코 좌표 계산
+            pts = landmarks_to_array(face.landmark, w, h)
+            current_box = face_box(pts)
+            current_nose = nose_point(pts)
+            cv2.circle(frame, current_nose, 4, (0, 255, 0), -1)
 
             if calibrated:
                 # 기준 표시
@@ -63,33 +60,10 @@ with mp_face_mesh.FaceMesh(
                 cv2.rectangle(frame, (bx, by), (bx + bw, by + bh), (255, 0, 0), 2)
                 cv2.circle(frame, baseline_nose, 5, (255, 0, 0), -1)
 
-                # 실시간 코 위치 비교
-                nx, ny = nose_point
+                # 코 위치 / 얼굴 크기 비율을 기준과 비교 (규칙은 posture_classifier.py)
                 base_x, base_y = baseline_nose
-                dx, dy = nx - base_x, ny - base_y
-
-                # 얼굴 크기 비율 (현재 face area / baseline area)
-                current_area = current_box[2] * current_box[3]
-                baseline_area = bw * bh
-                face_scale = current_area / baseline_area
-
-                pose = "normal"
-
-                # 뒤로 젖힘 (멀어짐)
-                if face_scale < 0.9:
-                    pose = "L"
-
-                # 좌우 기울기 (측만)
-                elif abs(dx) > bw * 0.2:
-                    pose = "left" if dx < 0 else "right"
-
-                # 거북목 (얼굴 크기 거의 일정하지만 고개만 아래로)
-                elif 0.9 <= face_scale <= 1.45 and dy > 25:
-                    pose = "turtle"
-
-                # 나머지 → 정자세
-                else:
-                    pose = "normal"
+                result = classifier.classify(current_box, current_nose, Baseline(baseline_box, baseline_nose))
+                pose, dx, dy, face_scale = result.pose, result.dx, result.dy, result.face_scale
 
                 pose_log.append({
                   "timestamp": datetime.now(),
@@ -97,6 +71,7 @@ with mp_face_mesh.FaceMesh(
                   "dx": dx,
                   "dy": dy,
                   "scale": round(face_scale, 3),
+                  "bw": bw,
                   "true_pose": None
               })
 
@@ -131,25 +106,13 @@ with mp_face_mesh.FaceMesh(
 
 
             elif stabilizing:
-                # 안정 감지 중 표시
-                nose_history.append(nose_point)
-                box_history.append((current_box[2], current_box[3]))
-
-                if time.time() - stability_start > 1.5:
-                    if is_stable(nose_history, box_history):
-                        baseline_box = (
-                            x_min,
-                            y_min,
-                            x_max - x_min,
-                            y_max - y_min
-                        )
-                        baseline_nose = nose_point
-                        calibrated = True
-                        stabilizing = False
-                        print("자동 캘리브레이션 완료 (정자세 고정)")
-                    else:
-                        print("안정 안됨 → 다시 시도 필요")
-                        stabilizing = False
+                # 안정 감지 중 표시 (움직이면 실패 대신 윈도가 밀려나며 계속 확인)
+                if stability.update(time.time(), current_nose, (current_box[2], current_box[3])):
+                    baseline_box = current_box
+                    baseline_nose = current_nose
+                    calibrated = True
+                    stabilizing = False
+                    print(f"자동 캘리브레이션 완료 (정자세 고정, {time.time() - stability_start:.1f}초)")
 
                 cv2.putText(frame, "Calibrating... Stay still", (30, 30),
                             cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 200, 255), 2)
@@ -166,8 +129,7 @@ with mp_face_mesh.FaceMesh(
             # 자동 안정 캘리브레이션 시작
             stabilizing = True
             stability_start = time.time()
-            nose_history.clear()
-            box_history.clear()
+            stability.reset()
             print("정자세 감지 중... (1.5초 동안 유지하세요)")
 
         elif key in [ord('1'), ord('2'), ord('3'), ord('4'), ord('5')]:
@@ -0,0 +1,121 @@
+"""
+미리보기(JPEG) 인코더.
+캡처 스레드가 매 프레임 인코딩하던 방식 대신, 소비자가 요청할 때만 링 버퍼의 최신 프레임을 인코딩합니다.
+
+- 결과는 (프레임 seq, 크기, 품질) 별로 캐시되어, 같은 프레임을 요청한 여러 클라이언트가 인코딩 한 번을 공유합니다.
+  다른 스레드가 같은 키를 인코딩 중이면 끝날 때까지 기다렸다가 그 결과를 받습니다.
+- 클라이언트마다 크기(size)와 품질(quality)을 지정할 수 있으며, 축소는 인코딩 전에 합니다.
+- adaptive=True 이면 크기별 인코딩 시간/용량이 예산을 넘을 때 품질을 낮추고, 여유가 생기면 다시 올립니다.
+"""
+import threading
+import time
+from typing import Dict, Optional, Tuple
+import cv2
+import numpy as np
+
+from frame_ring import FrameRing
+
+
+class PreviewEncoder:
+    QUALITY_STEP = 5
+
+    def __init__(self, ring: FrameRing, quality: int = 80, adaptive: bool = False, budget_ms: float = 8.0,
+                 max_bytes: int = 60_000, min_quality: int = 40):
+        """
+        :param ring: 프레임 링 버퍼
+        :param quality: 기본 JPEG 품질 (클라이언트가 지정하지 않을 때)
+        :param adaptive: 인코딩 시간/용량 예산에 맞춰 품질 자동 조절
+        :param budget_ms: 인코딩 1회 목표 시간 (adaptive)
+        :param max_bytes: 프레임 1장 목표 최대 용량 (adaptive)
+        :param min_quality: adaptive 모드에서 내려갈 수 있는 최저 품질
+        """
+        self.ring = ring
+        self.quality = quality
+        self.adaptive = adaptive
+        self.budget_ms = budget_ms
+        self.max_bytes = max_bytes
+        self.min_quality = min_quality
+
+        self._lock = threading.Lock()
+        self._cache: Dict[tuple, Tuple[int, bytes]] = {}  # (size, quality) → (seq, jpeg), 최신 seq 만 유지
+        self._inflight: Dict[tuple, threading.Event] = {}  # (seq, size, quality) → 인코딩 완료 이벤트
+        self._cap: Dict[Optional[tuple], int] = {}  # 크기별 adaptive 품질 상한
+        self.stats = {"requests": 0, "encodes": 0, "cache_hits": 0, "encode_ms_ema": 0.0, "bytes_ema": 0.0}
+
+    def effective_quality(self, size: Optional[Tuple[int, int]] = None, quality: Optional[int] = None) -> int:
+        q = quality or self.quality
+        if self.adaptive:
+            q = min(q, self._cap.get(size, q))
+        return q
+
+    def get(self, size: Optional[Tuple[int, int]] = None, quality: Optional[int] = None,
+            after_seq: int = -1) -> Optional[Tuple[int, bytes]]:
+        """
+        최신 프레임의 JPEG 을 돌려줍니다.
+
+        :param size: (width, height) 미리보기 크기 (None 이면 원본 크기)
+        :param quality: JPEG 품질 (None 이면 기본값, adaptive 이면 상한으로 사용)
+        :param after_seq: 이 seq 보다 새 프레임이 없으면 None
+        :return: (프레임 seq, JPEG bytes) 또는 None
+        """
+        size = tuple(size) if size else None
+        with self._lock:
+            self.stats["requests"] += 1
+            q = self.effective_quality(size, quality)
+        frame = self.ring.latest(after_seq=after_seq)
+        if frame is None:
+            return None
+        seq, key = frame.seq, (size, q)
+
+        while True:
+            with self._lock:
+                cached = self._cache.get(key)
+                if cached is not None and cached[0] >= seq:
+                    self.stats["cache_hits"] += 1
+                    return cached
+                event = self._inflight.get((seq,) + key)
+                if event is None:
+                    event = self._inflight[(seq,) + key] = threading.Event()
+                    break
+            event.wait()  # 같은 프레임을 다른 스레드가 인코딩 중 → 결과 공유
+
+        try:
+            jpeg = self._encode(frame, size, q)
+        finally:
+            frame = None  # 슬롯 반납
+            with self._lock:
+                self._inflight.pop((seq,) + key).set()
+        with self._lock:
+            if key not in self._cache or self._cache[key][0] < seq:
+                self._cache[key] = (seq, jpeg)
+        return seq, jpeg
+
+    def _encode(self, frame: np.ndarray, size: Optional[Tuple[int, int]], quality: int) -> bytes:
+        t0 = time.perf_counter()
+        if size and (frame.shape[1], frame.shape[0]) != size:
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        _, buf = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        jpeg = buf.tobytes()
+        ms = (time.perf_counter() - t0) * 1000.0
+        with self._lock:
+            s = self.stats
+            s["encodes"] += 1
+            s["encode_ms_ema"] += 0.1 * (ms - s["encode_ms_ema"])
+            s["bytes_ema"] += 0.1 * (len(jpeg) - s["bytes_ema"])
+            if self.adaptive:
+                self._adapt(size, quality, ms, len(jpeg))
+        return jpeg
+
+    def _adapt(self, size, quality: int, ms: float, nbytes: int):
+        """예산 초과면 품질 상한을 낮추고, 둘 다 절반 이하로 여유가 있으면 올린다"""
+        cap = self._cap.get(size, 100)
+        if ms > self.budget_ms or nbytes > self.max_bytes:
+            self._cap[size] = max(self.min_quality, min(cap, quality) - self.QUALITY_STEP)
+        elif ms < self.budget_ms / 2 and nbytes < self.max_bytes / 2 and cap < 100:
+            self._cap[size] = min(100, cap + self.QUALITY_STEP)
+
+    def summary(self) -> dict:
+        with self._lock:
+            s = dict(self.stats)
+            s["quality_caps"] = {str(k): v for k, v in self._cap.items()}
+            return s
@@ -0,0 +1,422 @@
+"""
+Flutter 클라이언트(neck_check)용 로컬 스트리밍 서버 (asyncio, 표준 라이브러리만 사용).
+
+- GET  /face_data        : 최신 PipelineData JSON 스냅샷 (기존 폴링 경로 호환)
+- POST /calibrate_reset  : 캘리브레이션 재요청 (on_calibrate_reset 콜백)
+- POST /session_start, /session_stop : 세션 제어 (콜백이 없으면 200 만 응답)
+- GET  /snapshot         : 최신 프레임 JPEG 한 장
+- GET  /stream.mjpg      : MJPEG 스트림 (multipart/x-mixed-replace)
+- GET  /metrics          : 파이프라인 계측값 JSON (metrics 가 있을 때)
+- GET  /ws               : WebSocket. 새 PipelineData 가 올 때마다 JSON 을 push, frames=1 이면 JPEG 도 binary 로 push
+
+스트림 경로는 쿼리로 w, h (미리보기 크기), q (JPEG 품질), fps (최대 전송률) 를 받습니다.
+모든 스트림은 최신 값만 보냅니다. 느린 클라이언트는 전송이 끝난 뒤 그 시점의 최신 프레임/스냅샷을 받으므로
+중간 프레임은 버려지고 서버에 쌓이지 않습니다.
+
+서버는 자체 스레드의 이벤트 루프에서 돌며, 파이프라인 스레드는 publish(data) 또는 attach_queue(q) 로 데이터를 넘깁니다.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import queue
+import struct
+import threading
+import time
+from typing import Callable, Optional
+from urllib.parse import urlsplit, parse_qs
+
+from pipeline_data import PipelineData
+from pipeline_runner import offer
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+MJPEG_BOUNDARY = "frame"
+
+# current_posture_status → 클라이언트 표시 문구 ("정상" 포함 여부로 정상 자세를 판단함)
+POSTURE_TEXT = {
+    "normal": "정상 자세",
+    "turtle": "거북목",
+    "L": "뒤로 젖힘",
+    "left": "왼쪽 기울어짐",
+    "right": "오른쪽 기울어짐",
+}
+# 자세가 아닌 상태 (posture_stage.PostureStage)
+STATE_TEXT = {"calibrating": "캘리브레이션 중", "no_face": "얼굴 없음"}
+STATUS_TEXT = {200: "OK", 101: "Switching Protocols", 400: "Bad Request", 404: "Not Found",
+               405: "Method Not Allowed", 503: "Service Unavailable"}
+
+
+def snapshot(data: Optional[PipelineData]) -> dict:
+    """PipelineData → JSON 직렬화 가능한 dict (face_vectors 제외)"""
+    if data is None:
+        return {"detected": False, "bbox": None, "bbox_coords": [], "current_user_id": None,
+                "is_calibration_needed": False, "is_calibrated": False, "recalibration_suggested": False,
+                "current_posture_status": "unknown",
+                "interpretation": "-", "alert_message": None, "target_bbox": None, "frame_seq": -1,
+                "timestamp": None}
+    bboxes = [list(map(int, b)) for b in data.bbox_coords]
+    status = data.current_posture_status
+    interpretation = POSTURE_TEXT.get(status) or STATE_TEXT.get(status, "-")
+    return {
+        "detected": bool(bboxes),
+        "bbox": bboxes[0] if bboxes else None,
+        "bbox_coords": bboxes,
+        "current_user_id": data.current_user_id,
+        "is_calibration_needed": data.is_calibration_needed,
+        "is_calibrated": (data.current_user_id is not None and not data.is_calibration_needed
+                          and status != "calibrating"),
+        "recalibration_suggested": bool(getattr(data, "recalibration_suggested", False)),
+        "current_posture_status": status,
+        "interpretation": interpretation,
+        "alert_message": f"{interpretation} 자세가 감지되었습니다." if status in POSTURE_TEXT and status != "normal" else None,
+        "target_bbox": None,
+        "frame_seq": getattr(data, "frame_seq", -1),
+        "timestamp": getattr(data, "timestamp", None),
+    }
+
+
+class PipelineServer:
+    def __init__(self, webcam=None, host: str = "127.0.0.1", port: int = 5001,
+                 on_calibrate_reset: Optional[Callable[[], None]] = None,
+                 on_session_start: Optional[Callable[[], None]] = None,
+                 on_session_stop: Optional[Callable[[], None]] = None,
+                 send_timeout: float = 5.0, metrics=None):
+        """
+        :param webcam: WebcamModule (미리보기 JPEG 소스, None 이면 /snapshot, /stream.mjpg 는 503)
+        :param host, port: 바인드 주소 (Flutter ApiGateway 기본값 127.0.0.1:5001)
+        :param on_calibrate_reset: /calibrate_reset 요청 시 호출 (예: AuthWorker.request_calibration)
+        :param on_session_start, on_session_stop: /session_start, /session_stop 요청 시 호출
+        :param send_timeout: 한 번의 전송이 이 시간(초) 안에 끝나지 않으면 클라이언트 연결을 끊음
+        :param metrics: PipelineMetrics (GET /metrics 로 snapshot() 제공, None 이면 404)
+        """
+        self.webcam = webcam
+        self.host, self.port = host, port
+        self.callbacks = {"/calibrate_reset": on_calibrate_reset, "/session_start": on_session_start,
+                          "/session_stop": on_session_stop}
+        self.send_timeout = send_timeout
+        self.metrics = metrics
+
+        self._lock = threading.Lock()
+        self._latest: Optional[dict] = None
+        self._version = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._changed: Optional[asyncio.Event] = None
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self.running = False
+        self.stats = {"clients": 0, "requests": 0, "ws_sent": 0, "ws_dropped": 0, "mjpeg_sent": 0, "mjpeg_dropped": 0,
+                      "slow_disconnects": 0}
+
+    # ---------- 파이프라인 스레드 쪽 ----------
+
+    def publish(self, data: PipelineData):
+        """최신 PipelineData 갱신 (어느 스레드에서든 호출 가능)"""
+        snap = snapshot(data)
+        with self._lock:
+            self._latest = snap
+            self._version += 1
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(self._notify)
+            except RuntimeError:
+                pass  # 종료 중에 닫힌 루프
+
+    def attach_queue(self, in_q: queue.Queue, forward_q: Optional[queue.Queue] = None) -> threading.Thread:
+        """
+        큐에서 PipelineData 를 꺼내 publish 하는 스레드를 띄웁니다.
+
+        :param in_q: 구독할 큐
+        :param forward_q: 꺼낸 데이터를 그대로 넘길 다음 단계 큐 (최신 값만 유지, 선택)
+        """
+        def pump():
+            while self.running:
+                try:
+                    data = in_q.get(timeout=0.2)
+                except queue.Empty:
+                    continue
+                self.publish(data)
+                if forward_q is not None:
+                    offer(forward_q, data)
+
+        t = threading.Thread(target=pump, name="PipelineServerPump", daemon=True)
+        t.start()
+        return t
+
+    def start(self):
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name="PipelineServer", daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout=5.0)
+
+    def stop(self):
+        self.running = False
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread:
+            self._thread.join(timeout=2.0)
+
+    # ---------- 이벤트 루프 ----------
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._changed = asyncio.Event()
+        try:
+            self._server = self._loop.run_until_complete(
+                asyncio.start_server(self._handle, self.host, self.port))
+            print(f"PipelineServer: http://{self.host}:{self.port} 시작")
+        except OSError as e:
+            print(f"PipelineServer: 포트 {self.port} 바인드 실패: {e}")
+            self._ready.set()
+            return
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._server.close()
+            tasks = asyncio.all_tasks(self._loop)
+            for task in tasks:
+                task.cancel()
+            self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self._loop.run_until_complete(self._loop.shutdown_default_executor())
+            self._loop.close()
+            print("PipelineServer: 종료")
+
+    def _notify(self):
+        # 기다리던 코루틴을 모두 깨우고 다음 변경용 이벤트로 교체
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def _current(self):
+        with self._lock:
+            return self._version, self._latest
+
+    async def _wait_version(self, after: int, timeout: float):
+        """after 보다 새 스냅샷이 올 때까지 대기 → (version, snapshot)"""
+        changed = self._changed
+        version, snap = self._current()
+        if version > after:
+            return version, snap
+        try:
+            await asyncio.wait_for(changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self._current()
+
+    async def _send(self, writer: asyncio.StreamWriter, payload: bytes):
+        writer.write(payload)
+        try:
+            await asyncio.wait_for(writer.drain(), self.send_timeout)
+        except asyncio.TimeoutError:
+            self.stats["slow_disconnects"] += 1
+            raise ConnectionError("send timeout")
+
+    async def _preview(self, after_seq: int, size, quality):
+        if self.webcam is None:
+            return None
+        return await self._loop.run_in_executor(None, self.webcam.get_preview, after_seq, size, quality)
+
+    # ---------- HTTP ----------
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.stats["clients"] += 1
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, _ = lines[0].split(" ", 2)
+                except ValueError:
+                    await self._respond(writer, 400, b"", close=True)
+                    return
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        k, v = line.split(":", 1)
+                        headers[k.strip().lower()] = v.strip()
+                length = int(headers.get("content-length", 0) or 0)
+                if length:
+                    await reader.readexactly(length)  # 본문은 사용하지 않음
+                url = urlsplit(target)
+                params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                self.stats["requests"] += 1
+
+                keep_alive = headers.get("connection", "").lower() != "close"
+                if url.path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                    await self._websocket(reader, writer, headers, params)
+                    return
+                if url.path == "/stream.mjpg":
+                    await self._mjpeg(writer, params)
+                    return
+                await self._route(writer, method, url.path, keep_alive)
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.stats["clients"] -= 1
+            writer.close()
+
+    async def _respond(self, writer, status: int, body: bytes, content_type: str = "application/json",
+                       close: bool = False):
+        head = (f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+                f"Access-Control-Allow-Origin: *\r\nCache-Control: no-cache\r\n"
+                f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n")
+        await self._send(writer, head.encode("latin-1") + body)
+
+    async def _route(self, writer, method: str, path: str, keep_alive: bool):
+        close = not keep_alive
+        if path == "/face_data" and method == "GET":
+            _, snap = self._current()
+            body = json.dumps(snap or snapshot(None), ensure_ascii=False).encode("utf-8")
+            await self._respond(writer, 200, body, "application/json; charset=utf-8", close)
+        elif path == "/metrics" and method == "GET" and self.metrics is not None:
+            body = json.dumps(self.metrics.snapshot(), ensure_ascii=False, default=str).encode("utf-8")
+            await self._respond(writer, 200, body, "application/json; charset=utf-8", close)
+        elif path in self.callbacks:
+            if method != "POST":
+                await self._respond(writer, 405, b'{"ok": false}', close=close)
+                return
+            cb = self.callbacks[path]
+            if cb is not None:
+                await self._loop.run_in_executor(None, cb)
+            await self._respond(writer, 200, b'{"ok": true}', close=close)
+        elif path == "/snapshot" and method == "GET":
+            result = await self._preview(-1, None, None)
+            if result is None:
+                await self._respond(writer, 503, b'{"ok": false}', close=close)
+            else:
+                await self._respond(writer, 200, result[1], "image/jpeg", close)
+        else:
+            await self._respond(writer, 404, b'{"ok": false}', close=close)
+
+    @staticmethod
+    def _stream_params(params: dict):
+        size = (int(params["w"]), int(params["h"])) if "w" in params and "h" in params else None
+        quality = int(params["q"]) if "q" in params else None
+        fps = max(1.0, float(params.get("fps", 30)))
+        return size, quality, 1.0 / fps
+
+    async def _mjpeg(self, writer, params: dict):
+        if self.webcam is None:
+            await self._respond(writer, 503, b'{"ok": false}', close=True)
+            return
+        size, quality, interval = self._stream_params(params)
+        head = ("HTTP/1.1 200 OK\r\nAccess-Control-Allow-Origin: *\r\nCache-Control: no-cache\r\n"
+                f"Content-Type: multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}\r\n\r\n")
+        await self._send(writer, head.encode("latin-1"))
+        last_seq = -1
+        while self.running:
+            t0 = time.monotonic()
+            result = await self._preview(last_seq, size, quality)
+            if result is not None:
+                seq, jpeg = result
+                if last_seq >= 0 and seq > last_seq + 1:
+                    self.stats["mjpeg_dropped"] += seq - last_seq - 1
+                last_seq = seq
+                part = (f"--{MJPEG_BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                        f"Content-Length: {len(jpeg)}\r\n\r\n").encode("latin-1")
+                # drain 이 끝날 때까지 다음 프레임을 가져오지 않는다 → 느린 클라이언트는 건너뜀
+                await self._send(writer, part + jpeg + b"\r\n")
+                self.stats["mjpeg_sent"] += 1
+            await asyncio.sleep(max(0.0, interval - (time.monotonic() - t0)))
+
+    # ---------- WebSocket ----------
+
+    @staticmethod
+    def _ws_frame(opcode: int, payload: bytes) -> bytes:
+        n = len(payload)
+        if n < 126:
+            head = struct.pack("!BB", 0x80 | opcode, n)
+        elif n < 65536:
+            head = struct.pack("!BBH", 0x80 | opcode, 126, n)
+        else:
+            head = struct.pack("!BBQ", 0x80 | opcode, 127, n)
+        return head + payload
+
+    async def _ws_reader(self, reader: asyncio.StreamReader, writer, closed: asyncio.Event):
+        """클라이언트 프레임 처리: close → 종료, ping → pong. 나머지 메시지는 무시"""
+        try:
+            while not closed.is_set():
+                b1, b2 = await reader.readexactly(2)
+                opcode, n = b1 & 0x0F, b2 & 0x7F
+                if n == 126:
+                    n = struct.unpack("!H", await reader.readexactly(2))[0]
+                elif n == 127:
+                    n = struct.unpack("!Q", await reader.readexactly(8))[0]
+                mask = await reader.readexactly(4) if b2 & 0x80 else b"\0\0\0\0"
+                data = bytes(c ^ mask[i % 4] for i, c in enumerate(await reader.readexactly(n)))
+                if opcode == 0x8:
+                    writer.write(self._ws_frame(0x8, data[:2]))
+                    break
+                if opcode == 0x9:
+                    writer.write(self._ws_frame(0xA, data))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            closed.set()
+
+    async def _websocket(self, reader, writer, headers: dict, params: dict):
+        key = headers.get("sec-websocket-key")
+        if not key:
+            await self._respond(writer, 400, b"", close=True)
+            return
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        await self._send(writer, ("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                                  f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode("latin-1"))
+        size, quality, interval = self._stream_params(params)
+        with_frames = params.get("frames") == "1" and self.webcam is not None
+
+        closed = asyncio.Event()
+        reader_task = self._loop.create_task(self._ws_reader(reader, writer, closed))
+        version, last_seq = 0, -1
+        try:
+            while self.running and not closed.is_set():
+                t0 = time.monotonic()
+                new_version, snap = await self._wait_version(version, timeout=interval if with_frames else 1.0)
+                if new_version > version and snap is not None:
+                    if version and new_version > version + 1:
+                        self.stats["ws_dropped"] += new_version - version - 1
+                    version = new_version
+                    await self._send(writer, self._ws_frame(0x1, json.dumps(snap, ensure_ascii=False).encode("utf-8")))
+                    self.stats["ws_sent"] += 1
+                if with_frames:
+                    result = await self._preview(last_seq, size, quality)
+                    if result is not None:
+                        last_seq = result[0]
+                        await self._send(writer, self._ws_frame(0x2, result[1]))
+                    await asyncio.sleep(max(0.0, interval - (time.monotonic() - t0)))
+        finally:
+            closed.set()
+            reader_task.cancel()
+
+
+if __name__ == "__main__":
+    # 웹캠 → AuthWorker → 서버 (python preview_server.py 로 Flutter 앱과 연결 테스트)
+    from webcam_feature_module import WebcamModule
+    from auth_worker import AuthWorker
+
+    feature_q, auth_q = queue.Queue(maxsize=1), queue.Queue(maxsize=1)
+    webcam = WebcamModule()
+    webcam.set_output_queue(feature_q)
+    worker = AuthWorker(feature_q, auth_q)
+    server = PipelineServer(webcam, on_calibrate_reset=worker.request_calibration)
+
+    webcam.start()
+    threading.Thread(target=worker.run_forever, name="AuthWorker", daemon=True).start()
+    server.start()
+    server.attach_queue(auth_q)
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        webcam.stop()
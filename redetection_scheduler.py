@@ -0,0 +1,138 @@
+"""
+TRACKING 상태의 재감지 스케줄러.
+고정 간격(redetection_interval) 대신 이미 가진 신호로 재감지 시점을 정합니다.
+
+- 추적 박스 중심 이동 속도 (박스 너비 대비, 기준 프레임 간격당)
+- 추적 박스 크기 변화율 (기준 프레임 간격당)
+  처리 주기는 움직임 게이트에 따라 바뀌므로 관찰 시각 차이로 나눠 frame_interval 기준으로 맞춥니다.
+- 마지막 확인(재감지 성공) 이후 경과 시간
+- 마지막 확인 때의 얼굴 임베딩 거리 (임계값에 가까울수록 자주 확인)
+
+decide() 는 TRACKING 처리 프레임마다 (움직임 게이트가 닫혀 있어도) 호출해 간격/경과 시간을 진행시키고,
+True 를 반환하면 이번 프레임에서 재감지를 수행합니다. allowed=False (장면 정지) 이면 재감지를 미뤘다가 게이트가 열리면 수행합니다.
+stats 에 이유별 결정 횟수와 고정 간격 대비 절약한 감지 호출 수가 쌓입니다 (게이트가 닫힌 프레임은 비교에서 제외).
+"""
+import time
+from typing import Optional, Tuple
+
+
+class RedetectionScheduler:
+    REASONS = ("drift", "scale", "uncertain", "age", "max_interval")
+
+    def __init__(self, base_interval: int = 10, min_interval: int = 3, max_interval: int = 30,
+                 velocity_thr: float = 0.08, scale_thr: float = 0.06, max_age_sec: float = 5.0,
+                 distance_thr: float = 0.6, uncertain_margin: float = 0.1, adaptive: bool = True,
+                 frame_interval: float = 1.0 / 6):
+        """
+        :param base_interval: 고정 간격 (adaptive=False 일 때 사용, 절약량 계산 기준)
+        :param min_interval: 재감지 사이 최소 프레임 수
+        :param max_interval: 신호가 없어도 이 프레임 수가 지나면 재감지
+        :param velocity_thr: 기준 프레임 간격당 중심 이동량 / 박스 너비 가 이 값을 넘으면 재감지 (drift)
+        :param scale_thr: 기준 프레임 간격당 박스 크기 변화율이 이 값을 넘으면 재감지 (scale)
+        :param max_age_sec: 마지막 확인 후 이 시간이 지나면 재감지 (age)
+        :param distance_thr: 얼굴 매칭 거리 임계값 (WebcamModule.face_match_threshold)
+        :param uncertain_margin: 마지막 확인 거리 > distance_thr - margin 이면 base_interval 의 절반마다 재감지
+        :param adaptive: False 이면 base_interval 고정 간격 (기존 동작)
+        :param frame_interval: 속도/크기 변화율의 기준 프레임 간격 (초, WebcamModule 의 1 / processing_fps)
+        """
+        self.frame_interval = frame_interval
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.velocity_thr = velocity_thr
+        self.scale_thr = scale_thr
+        self.max_age_sec = max_age_sec
+        self.distance_thr = distance_thr
+        self.uncertain_margin = uncertain_margin
+        self.adaptive = adaptive
+
+        self.frames_since = 0
+        self.last_confirm_ts = time.time()
+        self.last_distance: Optional[float] = None
+        self._prev_bbox: Optional[Tuple[int, int, int, int]] = None
+        self._prev_ts: Optional[float] = None
+        self._velocity = 0.0
+        self._scale_rate = 0.0
+
+        self.stats = {"tracking_frames": 0, "gated_frames": 0, "deferred": 0, "redetections": 0,
+                      "started_ts": time.time()}
+        self.stats.update({f"reason_{r}": 0 for r in self.REASONS})
+
+    def confirm(self, bbox: Tuple[int, int, int, int], face_distance: Optional[float] = None, now: Optional[float] = None):
+        """추적 시작 또는 재감지로 대상이 확인됨"""
+        self.frames_since = 0
+        self.last_confirm_ts = now or time.time()
+        self.last_distance = face_distance
+        self._prev_bbox = bbox
+        self._prev_ts = None
+        self._velocity = self._scale_rate = 0.0
+
+    def observe(self, bbox: Tuple[int, int, int, int], ts: Optional[float] = None):
+        """
+        tracker.update 결과로 이동 속도/크기 변화율 갱신
+        :param ts: 관찰한 프레임의 캡처 시각. 직전 관찰과의 차이를 frame_interval 기준으로 환산 (None 이면 1 간격으로 봄)
+        """
+        if self._prev_bbox is not None:
+            px, py, pw, ph = self._prev_bbox
+            x, y, w, h = bbox
+            dx = (x + w / 2) - (px + pw / 2)
+            dy = (y + h / 2) - (py + ph / 2)
+            steps = 1.0
+            if ts is not None and self._prev_ts is not None and ts > self._prev_ts:
+                steps = (ts - self._prev_ts) / self.frame_interval
+            self._velocity = (dx * dx + dy * dy) ** 0.5 / max(pw, 1) / steps
+            self._scale_rate = abs(w * h - pw * ph) / max(pw * ph, 1) / steps
+        self._prev_bbox = bbox
+        self._prev_ts = ts
+
+    def _reason(self, now: float) -> Optional[str]:
+        n = self.frames_since
+        if not self.adaptive:
+            return "max_interval" if n >= self.base_interval else None
+        if n < self.min_interval:
+            return None
+        if self._velocity > self.velocity_thr:
+            return "drift"
+        if self._scale_rate > self.scale_thr:
+            return "scale"
+        if (self.last_distance is not None and self.last_distance > self.distance_thr - self.uncertain_margin
+                and n >= max(self.min_interval, self.base_interval // 2)):
+            return "uncertain"
+        if now - self.last_confirm_ts > self.max_age_sec:
+            return "age"
+        if n >= self.max_interval:
+            return "max_interval"
+        return None
+
+    def decide(self, now: Optional[float] = None, allowed: bool = True) -> bool:
+        """
+        TRACKING 프레임마다 호출. True 면 이번 프레임에서 재감지
+        :param allowed: False 면 (움직임 게이트 정지) 간격/경과 시간만 진행하고, 재감지할 때가 됐어도 미룸
+        """
+        now = now or time.time()
+        self.frames_since += 1
+        self.stats["tracking_frames"] += 1
+        if not allowed:
+            self.stats["gated_frames"] += 1
+        reason = self._reason(now)
+        if reason is None:
+            return False
+        if not allowed:
+            # 간격을 다시 세지 않으므로 게이트가 열리는 첫 프레임에서 재감지
+            self.stats["deferred"] += 1
+            return False
+        self.stats["redetections"] += 1
+        self.stats[f"reason_{reason}"] += 1
+        # 재감지 결과와 상관없이 간격은 다시 센다 (성공 시 confirm() 이 다시 호출됨)
+        self.frames_since = 0
+        return True
+
+    def summary(self) -> dict:
+        """결정 카운터 + 고정 간격 대비 절약한 감지 호출 수 (전체, 시간당)"""
+        s = dict(self.stats)
+        # 고정 간격도 같은 게이트 뒤에 있다고 보고, 게이트가 연 프레임만으로 비교 (게이트가 아낀 몫은 세지 않음)
+        baseline = (s["tracking_frames"] - s["gated_frames"]) // max(1, self.base_interval)
+        s["saved_vs_fixed"] = baseline - s["redetections"]
+        hours = max(time.time() - s.pop("started_ts"), 1e-6) / 3600.0
+        s["saved_per_hour"] = s["saved_vs_fixed"] / hours
+        return s
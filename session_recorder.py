@@ -0,0 +1,247 @@
+"""
+세션 녹화 / 재생 / 비교.
+실사용 세션의 프레임과 파이프라인 출력(PipelineData)을 폴더에 저장해 두고, 나중에 같은 프레임으로 파이프라인을
+다시 돌려 출력과 지연을 버전 간에 비교합니다.
+
+세션 폴더
+- meta.json     : fps, 프레임 크기, 녹화 시작 시각 등
+- frames.avi    : MJPG 프레임 (frames.csv 의 행과 1:1)
+- frames.csv    : index (소스 프레임 번호), timestamp (원본 캡처 시각)
+- outputs.jsonl : 판정 결과 1건당 1줄 (source_index, frame_seq, 사용자, 자세, 캘리브레이션, bbox, 스테이지별 ms, 종단 지연)
+
+비교는 source_index 로 프레임을 맞춥니다. 링 버퍼 발행 번호(frame_seq)는 overrun 으로 버린 프레임을 세지 않고,
+녹화가 밀려 버린 프레임은 frames.csv 에 행이 없으므로 둘 다 원본 프레임 번호와 어긋날 수 있습니다.
+녹화 때 소스 번호를 frames.csv 에 적고 재생(SessionSource)이 그 번호를 그대로 내보내므로
+녹화/재생 양쪽에서 같은 프레임은 같은 source_index 를 가집니다.
+
+실행
+  python session_recorder.py record --out sessions/s1 --seconds 60
+  python session_recorder.py replay sessions/s1 --out sessions/s1_replay [--fast]
+  python session_recorder.py compare sessions/s1 sessions/s1_replay
+"""
+import csv
+import json
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+import cv2
+import numpy as np
+
+from frame_source import FrameSource, SESSION_META
+
+
+def output_record(data, now: Optional[float] = None) -> dict:
+    """PipelineData → JSON 으로 저장할 판정 결과 (프레임/임베딩 제외)"""
+    now = now or time.time()
+    ts = getattr(data, "timestamp", None)
+    times = getattr(data, "stage_times", None) or {}
+    return {
+        "source_index": getattr(data, "source_index", -1),
+        "frame_seq": getattr(data, "frame_seq", -1),
+        "timestamp": ts,
+        "user_id": getattr(data, "current_user_id", None),
+        "posture": getattr(data, "current_posture_status", None),
+        "calibration": bool(getattr(data, "is_calibration_needed", False)),
+        "bbox": [list(map(int, b)) for b in (getattr(data, "bbox_coords", None) or [])],
+        "stage_ms": {k: round((t[1] - t[0]) * 1000.0, 3) for k, t in times.items() if t[1] is not None},
+        "latency_ms": round((now - ts) * 1000.0, 3) if ts else None,
+    }
+
+
+class SessionRecorder:
+    def __init__(self, path: str, fps: float = 30.0, max_pending: int = 120):
+        """
+        :param path: 세션 폴더 (없으면 생성)
+        :param fps: frames.avi 에 기록할 FPS (재생 타이밍은 frames.csv 의 타임스탬프를 따름)
+        :param max_pending: 디스크 쓰기를 기다리는 프레임 최대 수 (넘치면 버리고 dropped 로 셈)
+        """
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.fps = fps
+        self.frames = 0
+        self.dropped = 0
+        self.outputs = 0
+        self._writer = None
+        self._shape = None
+        self._pending: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._csv_file = open(os.path.join(path, "frames.csv"), "w", newline="")
+        self._csv = csv.writer(self._csv_file)
+        self._csv.writerow(["index", "timestamp"])
+        self._out_file = open(os.path.join(path, "outputs.jsonl"), "w", encoding="utf-8")
+        self._out_lock = threading.Lock()
+        self._started = time.time()
+        # 프레임 인코딩/쓰기는 별도 스레드에서 (캡처 스레드는 복사만)
+        self._thread = threading.Thread(target=self._write_loop, name="SessionRecorder", daemon=True)
+        self._thread.start()
+
+    def write_frame(self, frame: np.ndarray, timestamp: Optional[float] = None, index: Optional[int] = None):
+        """
+        :param index: 소스 프레임 번호 (None 이면 기록 순서). 버린 프레임이 있어도 이후 행의 번호는 유지됨
+        """
+        try:
+            self._pending.put_nowait((frame.copy(), timestamp or time.time(), index))
+        except queue.Full:
+            self.dropped += 1
+
+    def write_output(self, data):
+        line = json.dumps(output_record(data), ensure_ascii=False)
+        with self._out_lock:
+            self._out_file.write(line + "\n")
+            self.outputs += 1
+
+    def _write_loop(self):
+        while True:
+            item = self._pending.get()
+            if item is None:
+                return
+            frame, ts, index = item
+            if self._writer is None:
+                self._shape = frame.shape
+                self._writer = cv2.VideoWriter(os.path.join(self.path, "frames.avi"),
+                                               cv2.VideoWriter_fourcc(*"MJPG"), self.fps,
+                                               (frame.shape[1], frame.shape[0]))
+            elif frame.shape != self._shape:
+                frame = cv2.resize(frame, (self._shape[1], self._shape[0]))
+            self._writer.write(frame)
+            self._csv.writerow([self.frames if index is None else index, f"{ts:.6f}"])
+            self.frames += 1
+
+    def close(self):
+        self._pending.put(None)
+        self._thread.join()
+        if self._writer is not None:
+            self._writer.release()
+        self._csv_file.close()
+        with self._out_lock:
+            self._out_file.close()
+        h, w = (self._shape or (0, 0))[:2]
+        with open(os.path.join(self.path, SESSION_META), "w", encoding="utf-8") as f:
+            json.dump({"fps": self.fps, "width": w, "height": h, "frames": self.frames, "dropped": self.dropped,
+                       "outputs": self.outputs, "started": self._started,
+                       "duration_sec": round(time.time() - self._started, 2)}, f, indent=2)
+        print(f"SessionRecorder: 프레임 {self.frames} (버림 {self.dropped}), 출력 {self.outputs} → {self.path}")
+
+
+class RecordingSource(FrameSource):
+    """다른 소스를 감싸 읽은 프레임을 모두 SessionRecorder 에 넘기는 소스"""
+
+    def __init__(self, source: FrameSource, recorder: SessionRecorder):
+        super().__init__()
+        self.source = source
+        self.recorder = recorder
+
+    def read(self, image: Optional[np.ndarray] = None):
+        ret, frame = self.source.read(image)
+        if ret:
+            self.index, self.timestamp = self.source.index, self.source.timestamp
+            self.recorder.write_frame(frame, self.timestamp, self.index)
+        else:
+            self.finished = self.source.finished
+        return ret, frame
+
+    def isOpened(self) -> bool:
+        return self.source.isOpened()
+
+    def set(self, prop, value) -> bool:
+        return self.source.set(prop, value)
+
+    def release(self):
+        self.source.release()
+
+
+def load_outputs(path: str) -> List[dict]:
+    with open(os.path.join(path, "outputs.jsonl"), encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    return round(float(np.percentile(values, q * 100)), 3)
+
+
+def _frame_key(r: dict) -> int:
+    idx = r.get("source_index", -1)
+    return idx if idx is not None and idx >= 0 else r["frame_seq"]
+
+
+def compare_sessions(base: str, other: str) -> Dict[str, object]:
+    """
+    두 세션의 출력을 source_index 로 맞춰 판정 차이와 지연 분포를 비교합니다.
+    (source_index 가 없는 예전 세션은 frame_seq 로 맞춤)
+
+    :return: 공통 프레임 수, 항목별 불일치 수, 지연 p50/p95 (base, other)
+    """
+    a = {_frame_key(r): r for r in load_outputs(base)}
+    b = {_frame_key(r): r for r in load_outputs(other)}
+    common = sorted(set(a) & set(b))
+    diff = {k: 0 for k in ("user_id", "posture", "calibration", "bbox")}
+    examples = []
+    for seq in common:
+        for k in diff:
+            if a[seq][k] != b[seq][k]:
+                diff[k] += 1
+                if len(examples) < 10:
+                    examples.append({"source_index": seq, "field": k, "base": a[seq][k], "other": b[seq][k]})
+
+    def latency(rows):
+        lat = [r["latency_ms"] for r in rows.values() if r.get("latency_ms") is not None]
+        stages: Dict[str, List[float]] = {}
+        for r in rows.values():
+            for k, v in r.get("stage_ms", {}).items():
+                stages.setdefault(k, []).append(v)
+        return {"p50_ms": _percentile(lat, 0.5), "p95_ms": _percentile(lat, 0.95),
+                "stages_p95_ms": {k: _percentile(v, 0.95) for k, v in stages.items()}}
+
+    return {"base_outputs": len(a), "other_outputs": len(b), "common_frames": len(common),
+            "mismatches": diff, "examples": examples, "latency": {"base": latency(a), "other": latency(b)}}
+
+
+def _run(source: FrameSource, out: str, seconds: float, fps: float, record_frames: bool, **pipeline_kwargs):
+    from pipeline_runner import build_default_pipeline
+    recorder = SessionRecorder(out, fps=fps)
+    if record_frames:
+        source = RecordingSource(source, recorder)
+    runner = build_default_pipeline(source=source, recorder=recorder, **pipeline_kwargs)
+    runner.start()
+    t0 = time.time()
+    try:
+        while time.time() - t0 < seconds and not source.finished:
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        runner.stop()
+        recorder.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    from frame_source import CameraSource, SessionSource
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    rec = sub.add_parser("record", help="카메라 세션 녹화 (프레임 + 판정 결과)")
+    rec.add_argument("--camera", type=int, default=0)
+    rec.add_argument("--out", required=True)
+    rec.add_argument("--seconds", type=float, default=60.0)
+    rec.add_argument("--fps", type=float, default=30.0)
+    rep = sub.add_parser("replay", help="녹화 세션으로 파이프라인 재실행 (판정 결과만 저장)")
+    rep.add_argument("session")
+    rep.add_argument("--out", required=True)
+    rep.add_argument("--fast", action="store_true", help="타임스탬프 간격을 무시하고 최대한 빨리 재생")
+    rep.add_argument("--speed", type=float, default=1.0)
+    cmp_ = sub.add_parser("compare", help="두 세션의 판정 결과/지연 비교")
+    cmp_.add_argument("base")
+    cmp_.add_argument("other")
+    args = ap.parse_args()
+
+    if args.cmd == "record":
+        _run(CameraSource(args.camera), args.out, args.seconds, args.fps, record_frames=True,
+             capture_fps=args.fps)
+    elif args.cmd == "replay":
+        src = SessionSource(args.session, realtime=not args.fast, speed=args.speed)
+        _run(src, args.out, float("inf"), src.fps, record_frames=False, capture_fps=1000 if args.fast else src.fps)
+    else:
+        print(json.dumps(compare_sessions(args.base, args.other), indent=2, ensure_ascii=False))
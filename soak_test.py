@@ -0,0 +1,235 @@
+"""
+장시간 소크 테스트.
+반복 재생하는 녹화 세션(또는 합성 클립)으로 전체 파이프라인을 몇 시간씩 (배속으로) 돌리면서
+메모리 증가, 스레드 생존, 큐 깊이, 지연 변화를 주기적으로 기록하고 한도를 넘으면 실패로 끝냅니다.
+
+점검 항목 (check_sec 마다)
+- RSS, tracemalloc 사용량, 워밍업 직후 스냅샷 대비 증가량이 큰 할당 위치 상위 N 개
+- 시작 시 있던 파이프라인 스레드가 살아 있는지, 스레드 수가 늘어나는지
+- 엣지별 깊이/버린 수/이번 구간 소비 수, 프레임 링 임대/증설 수, 갤러리 크기, 자세 스테이지 상태(--posture)
+- 이번 구간의 캡처→판정 지연 p95 (워밍업 직후 구간 대비 변화)
+
+실패 조건: RSS 증가 > --max-rss-growth-mb, 지연 p95 증가율 > --max-latency-drift, 파이프라인 스레드 종료,
+          엣지가 가득 찬 채로 한 구간 동안 하나도 소비되지 않음 (소비 스테이지 정지)
+
+얼굴 인식/등록(갤러리 증가), 캘리브레이션, 자세 판정 경로는 프레임에 실제 얼굴이 있어야 돌아갑니다.
+합성 클립에는 얼굴이 없으므로 이 경로들까지 점검하려면 얼굴이 나오는 녹화 세션(session_recorder.py record)을
+--source 로 주고 --posture 를 켭니다 (--posture 는 --source 필수).
+
+실행: python soak_test.py --source sessions/s1 --posture --hours 4 --speed 8 [--report soak.json]
+"""
+import argparse
+import json
+import threading
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+from bench_suite import make_source
+from pipeline_runner import build_default_pipeline
+
+
+def rss_mb() -> float:
+    """현재 RSS (MB). /proc 이 없으면 최대 RSS 로 대신함"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def take_snapshot() -> tracemalloc.Snapshot:
+    """tracemalloc 자신의 할당은 제외한 스냅샷"""
+    return tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+
+
+def top_growth(base: tracemalloc.Snapshot, cur: tracemalloc.Snapshot, n: int = 10) -> List[dict]:
+    stats = cur.compare_to(base, "lineno")
+    return [{"where": str(s.traceback[0]), "size_diff_kb": round(s.size_diff / 1024.0, 1), "count_diff": s.count_diff}
+            for s in stats[:n] if s.size_diff > 0]
+
+
+class SoakMonitor:
+    def __init__(self, runner, max_rss_growth_mb: float, max_latency_drift: float, min_drift_ms: float = 20.0,
+                 top_n: int = 10):
+        """
+        :param runner: build_default_pipeline 로 만든 PipelineRunner (start 이후 attach 호출)
+        :param max_rss_growth_mb: 워밍업 후 기준 대비 허용 RSS 증가량
+        :param max_latency_drift: 워밍업 구간 대비 허용 p95 증가율 (0.5 = 50%)
+        :param min_drift_ms: p95 가 이만큼 이상 늘었을 때만 지연 변화로 봄
+        """
+        self.runner = runner
+        self.metrics = runner.metrics
+        self.max_rss_growth_mb = max_rss_growth_mb
+        self.max_latency_drift = max_latency_drift
+        self.min_drift_ms = min_drift_ms
+        self.top_n = top_n
+        self.threads: Dict[str, threading.Thread] = {}
+        self.base_rss = None
+        self.base_snapshot = None
+        self.base_p95 = None
+        self._prev_e2e = self.metrics.e2e.copy()
+        self._prev_edges: Dict[str, dict] = {}
+        self.samples: List[dict] = []
+        self.failures: List[str] = []
+
+    def attach(self):
+        """시작 직후 살아 있는 스레드를 감시 대상으로 기록"""
+        self.threads = {t.name: t for t in threading.enumerate() if t is not threading.main_thread()}
+
+    def set_baseline(self):
+        """워밍업이 끝난 시점의 메모리/지연을 기준으로 삼음"""
+        self.base_rss = rss_mb()
+        self.base_snapshot = take_snapshot() if tracemalloc.is_tracing() else None
+        window = self.metrics.e2e.since(self._prev_e2e)
+        self._prev_e2e = self.metrics.e2e.copy()
+        self.base_p95 = window.percentile(0.95) if window.n else None
+        self._edge_sample(self.metrics.snapshot().get("edges", {}))
+
+    def check(self, elapsed: float) -> dict:
+        window = self.metrics.e2e.since(self._prev_e2e)
+        self._prev_e2e = self.metrics.e2e.copy()
+        snap = self.metrics.snapshot()
+        sample = {
+            "elapsed_sec": round(elapsed, 1),
+            "rss_mb": round(rss_mb(), 1),
+            "traced_mb": round(tracemalloc.get_traced_memory()[0] / 2 ** 20, 1) if tracemalloc.is_tracing() else None,
+            "threads": threading.active_count(),
+            "dead_threads": [name for name, t in self.threads.items() if not t.is_alive()],
+            "e2e_window": {"count": window.n, "p50_ms": round(window.percentile(0.5), 2),
+                           "p95_ms": round(window.percentile(0.95), 2)},
+            "edges": self._edge_sample(snap.get("edges", {})),
+            "frames": {k: snap.get("frames", {}).get(k) for k in ("leased", "grown", "overruns", "reallocs")},
+            "gallery": snap.get("gallery"),
+            "posture": snap.get("posture"),
+            "fps": snap.get("fps"),
+        }
+        if self.base_rss is not None:
+            sample["rss_growth_mb"] = round(sample["rss_mb"] - self.base_rss, 1)
+            if sample["rss_growth_mb"] > self.max_rss_growth_mb:
+                self._fail(f"RSS 증가 {sample['rss_growth_mb']}MB > {self.max_rss_growth_mb}MB")
+        if self.base_snapshot is not None:
+            sample["top_growth"] = top_growth(self.base_snapshot, take_snapshot(), self.top_n)
+        if self.base_p95 and window.n:
+            p95 = sample["e2e_window"]["p95_ms"]
+            drift = (p95 - self.base_p95) / self.base_p95
+            sample["latency_drift"] = round(drift, 3)
+            if drift > self.max_latency_drift and p95 - self.base_p95 >= self.min_drift_ms:
+                self._fail(f"지연 p95 {self.base_p95:g}ms → {p95:g}ms ({drift:+.0%})")
+        stalled = [k for k, v in sample["edges"].items() if v.get("stalled")]
+        if stalled:
+            self._fail(f"엣지 소비 정지: {stalled}")
+        if sample["dead_threads"]:
+            self._fail(f"스레드 종료: {sample['dead_threads']}")
+        if self.metrics.e2e.n and not window.n and self.base_rss is not None:
+            self._fail("이번 구간에 판정 결과 없음 (파이프라인 정지)")
+        self.samples.append(sample)
+        return sample
+
+    def _edge_sample(self, edges: Dict[str, dict]) -> Dict[str, dict]:
+        """엣지별 깊이/버린 수와 이번 구간에 소비된 수 (puts - dropped - depth 의 증가량)"""
+        out = {}
+        for k, v in edges.items():
+            e = {"depth": v["depth"], "maxsize": v["maxsize"], "dropped": v["dropped"]}
+            prev = self._prev_edges.get(k)
+            if prev is not None:
+                consumed = (v["puts"] - v["dropped"] - v["depth"]) - (prev["puts"] - prev["dropped"] - prev["depth"])
+                e["consumed"] = consumed
+                # 생산은 계속되는데 가득 찬 채로 하나도 빠지지 않았으면 소비 스테이지가 멈춘 것
+                e["stalled"] = v["puts"] > prev["puts"] and consumed == 0 and v["depth"] >= v["maxsize"]
+            out[k] = e
+        self._prev_edges = edges
+        return out
+
+    def _fail(self, reason: str):
+        if reason not in self.failures:
+            self.failures.append(reason)
+
+
+def run_soak(source: Optional[str], hours: float, speed: float, check_sec: float, warmup_sec: float,
+             max_rss_growth_mb: float, max_latency_drift: float, trace_frames: int = 10, top_n: int = 10,
+             posture: bool = False) -> dict:
+    """
+    :param speed: 재생 배속. 소스와 캡처/처리/추적 목표 FPS 를 모두 배속하므로 같은 시간에 더 많은 프레임을 흘림
+    :param trace_frames: tracemalloc 이 기록할 호출 스택 깊이 (0 이면 tracemalloc 끔)
+    :param posture: PostureStage 를 연결해 캘리브레이션/자세 판정 경로도 점검 (얼굴이 있는 source 필요)
+    """
+    if not source:
+        print("[SOAK] 합성 클립에는 얼굴이 없어 인식/등록, 캘리브레이션, 자세 판정 경로는 점검되지 않습니다 "
+              "(얼굴이 나오는 녹화 세션을 --source 로 지정)")
+    posture_fn = None
+    if posture:
+        from posture_stage import PostureStage
+        posture_fn = PostureStage()
+    if trace_frames:
+        tracemalloc.start(trace_frames)
+    runner = build_default_pipeline(source=make_source(source, realtime=True, speed=speed), posture_fn=posture_fn,
+                                    capture_fps=int(30 * speed), processing_fps=max(1, int(6 * speed)),
+                                    tracking_fps=int(60 * speed))
+    monitor = SoakMonitor(runner, max_rss_growth_mb, max_latency_drift, top_n=top_n)
+    runner.start()
+    monitor.attach()
+    t0 = time.time()
+    next_check = warmup_sec
+    baseline_set = False
+    try:
+        while time.time() - t0 < hours * 3600:
+            time.sleep(max(0.0, t0 + next_check - time.time()))
+            next_check += check_sec
+            elapsed = time.time() - t0
+            if not baseline_set:
+                monitor.set_baseline()
+                baseline_set = True
+                print(f"[SOAK] 기준: RSS {monitor.base_rss:.1f}MB, e2e p95 {monitor.base_p95}ms")
+                continue
+            s = monitor.check(elapsed)
+            print(f"[SOAK] {elapsed / 60:7.1f}분 RSS {s['rss_mb']}MB ({s.get('rss_growth_mb', 0):+}) "
+                  f"스레드 {s['threads']} e2e p95 {s['e2e_window']['p95_ms']}ms n={s['e2e_window']['count']} "
+                  f"갤러리 {s['gallery']}", flush=True)
+            for g in s.get("top_growth", [])[:3]:
+                print(f"        +{g['size_diff_kb']}KB {g['where']}")
+            if monitor.failures:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        runner.stop()
+        if trace_frames:
+            tracemalloc.stop()
+    return {"source": source or "synthetic", "posture": posture, "speed": speed, "hours": hours,
+            "elapsed_sec": round(time.time() - t0, 1), "passed": not monitor.failures,
+            "failures": monitor.failures, "baseline": {"rss_mb": monitor.base_rss, "e2e_p95_ms": monitor.base_p95},
+            "samples": monitor.samples}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--source", default=None, help="반복 재생할 녹화 세션/영상 (없으면 합성 클립)")
+    ap.add_argument("--hours", type=float, default=1.0)
+    ap.add_argument("--speed", type=float, default=4.0, help="재생 배속")
+    ap.add_argument("--check-sec", type=float, default=60.0)
+    ap.add_argument("--warmup-sec", type=float, default=60.0)
+    ap.add_argument("--max-rss-growth-mb", type=float, default=100.0)
+    ap.add_argument("--max-latency-drift", type=float, default=0.5, help="워밍업 구간 대비 p95 허용 증가율")
+    ap.add_argument("--trace-frames", type=int, default=10, help="tracemalloc 스택 깊이 (0 이면 끔)")
+    ap.add_argument("--posture", action="store_true", help="PostureStage 연결 (mediapipe, 얼굴이 있는 --source 필요)")
+    ap.add_argument("--report", default="soak_report.json")
+    args = ap.parse_args()
+    if args.posture and not args.source:
+        ap.error("--posture 는 얼굴이 나오는 녹화 세션/영상 --source 가 필요합니다")
+
+    report = run_soak(args.source, args.hours, args.speed, args.check_sec, args.warmup_sec,
+                      args.max_rss_growth_mb, args.max_latency_drift, args.trace_frames, posture=args.posture)
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"[SOAK] {'통과' if report['passed'] else '실패'} {report['failures']} → {args.report}")
+    if not report["passed"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+import queue
+import threading
+
+import numpy as np
+
+from auth_worker import AuthWorker, PipelineData
+
+
+def _run(worker, items):
+    for d in items:
+        worker.in_q.put(d)
+    stop = threading.Event()
+    t = threading.Thread(target=worker.run_forever, kwargs={"poll": 0.01, "stop_event": stop})
+    t.start()
+    while not worker.in_q.empty():
+        stop.wait(0.01)
+    stop.wait(0.05)
+    stop.set()
+    t.join()
+
+
+def test_reused_frames_do_not_count_towards_enrollment():
+    worker = AuthWorker(queue.Queue(), queue.Queue(maxsize=1000), unknown_streak_for_enroll=3)
+    vec = list(np.random.default_rng(0).standard_normal(128))
+    fresh = PipelineData(face_vectors=[vec], bbox_coords=[(0, 0, 10, 10)])
+    reused = [PipelineData(face_vectors=[vec], bbox_coords=[(0, 0, 10, 10)], reused=True) for _ in range(10)]
+    _run(worker, [fresh] + reused)
+    assert worker.unknown_streak == 1 and not worker.enrolling and len(worker.store.matrix()[1]) == 0
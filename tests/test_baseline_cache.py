@@ -0,0 +1,40 @@
+from baseline_cache import BaselineCache, DriftMonitor, rescale_baseline
+from posture_classifier import Baseline
+
+BASE = Baseline((270, 190, 100, 100), (320, 240))
+
+
+def _hold(monitor, box, nose, sec=6.0):
+    verdict = None
+    for i in range(int(sec * 10)):
+        verdict = monitor.update(i * 0.1, box, nose, BASE)
+    return verdict
+
+
+def test_drift_verdicts():
+    assert _hold(DriftMonitor(), (272, 190, 100, 100), (322, 240)) is False
+    far = DriftMonitor()
+    assert _hold(far, (245, 165, 150, 150), (320, 240)) is True and far.distance_only()  # 크기만 다름
+    moved = DriftMonitor()
+    assert _hold(moved, (400, 190, 100, 100), (450, 240)) is True and not moved.distance_only()
+    assert _hold(DriftMonitor(), (270, 190, 100, 100), (345, 240)) is None  # 고개 방향 변화는 판정 안 함
+    assert DriftMonitor().update(0.0, (270, 190, 100, 100), (320, 240), BASE) is None  # 아직 안정 확인 전
+
+
+def test_rescale_baseline_keeps_frame_center():
+    b = rescale_baseline(Baseline((220, 140, 200, 200), (320, 240)), (0, 0, 100, 100), (640, 480))
+    assert b.box == (270, 190, 100, 100) and b.nose == (320, 240)
+
+
+def test_drift_sessions(tmp_path):
+    path = str(tmp_path / "cb.json")
+    cache = BaselineCache(path)
+    assert cache.note_drift(1) == 0  # 항목 없음
+    cache.put(1, BASE, (640, 480))
+    assert cache.note_drift(1) == 1
+    assert BaselineCache(path).note_drift(1) == 2  # 재시작 후에도 이어짐
+    cache = BaselineCache(path)
+    cache.clear_drift(1)
+    assert cache.note_drift(1) == 1
+    cache.put(1, BASE, (640, 480))  # 새 기준이면 처음부터
+    assert cache.note_drift(1) == 1
@@ -0,0 +1,19 @@
+from bench_suite import compare
+
+BASE = {"results": {"auth": {"match_ms": 1.0, "rows": 10}, "webcam": {"processing_fps": 6.0},
+                    "posture": {"frames_per_sec": 1000.0}}}
+
+
+def test_missing_suite_is_reported():
+    cur = {"results": {"auth": {"match_ms": 1.0, "rows": 10}, "webcam": {}}}
+    out = compare(BASE, cur, suites=["auth", "webcam"])
+    assert [r["metric"] for r in out] == ["webcam.processing_fps"] and out[0]["missing"]
+    assert len(compare(BASE, cur)) == 2  # suites 를 모르면 posture 도 누락
+
+
+def test_regression_and_clean_run():
+    cur = {"results": {"auth": {"match_ms": 2.0}, "webcam": {"processing_fps": 6.0},
+                       "posture": {"frames_per_sec": 1000.0}}}
+    out = compare(BASE, cur)
+    assert [r["metric"] for r in out] == ["auth.match_ms"] and not out[0].get("missing")
+    assert compare(BASE, BASE) == []
@@ -0,0 +1,40 @@
+import numpy as np
+
+from frame_ring import FrameRing
+
+
+def _publish(ring, value):
+    slot, buf = ring.acquire_write()
+    buf[:] = value
+    return ring.publish(slot, buf)
+
+
+def test_lease_released_on_gc_and_explicit():
+    ring = FrameRing(slots=3, shape=(2, 2))
+    _publish(ring, 1)
+    a = ring.latest()
+    b = ring.latest()
+    assert ring.leased() == 1 and a.seq == 0
+    del a
+    assert ring.leased() == 1  # b 가 아직 붙잡고 있음
+    b.release()
+    assert ring.leased() == 0
+
+
+def test_finalizer_inside_lock_does_not_deadlock():
+    ring = FrameRing(slots=3, shape=(2, 2))
+    _publish(ring, 1)
+    view = ring.latest()
+    with ring._lock:
+        del view  # 락을 잡은 같은 스레드에서 GC 가 반납해도 막히지 않아야 함
+    assert ring.leased() == 0
+
+
+def test_leased_slot_not_overwritten():
+    ring = FrameRing(slots=2, shape=(2, 2), max_slots=2)
+    _publish(ring, 1)
+    held = ring.latest()
+    _publish(ring, 2)
+    slot, _ = ring.acquire_write()
+    assert slot == -1  # 하나는 임대, 하나는 최신 → overrun
+    assert np.all(held == 1)
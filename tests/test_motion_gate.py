@@ -0,0 +1,67 @@
+import numpy as np
+
+from motion_gate import MotionGate
+
+
+def _frame(level):
+    return np.full((48, 64, 3), level, np.uint8)
+
+
+def test_executed_counted_only_when_caller_runs():
+    gate = MotionGate(hold_sec=0.5, max_skip_sec=100.0)
+    assert gate.update(_frame(0), 1.0)
+    assert gate.stats["executed"] == 0  # 통과만 했고 아직 추론 안 함
+    assert gate.update(_frame(0), 1.1)  # 기준이 없으므로 계속 통과
+    assert gate.stats["deferred"] == 1
+    gate.executed()
+    assert gate.stats["executed"] == 1 and isinstance(gate.last_ratio, float)
+    for i in range(10):
+        if gate.update(_frame(0), 1.2 + i * 0.1):
+            gate.executed()
+    assert not gate.active and gate.stats["skipped"] > 0
+
+
+def test_mid_band_resets_quiet_timer():
+    gate = MotionGate(pixel_thr=15, enter_ratio=0.5, exit_ratio=0.1, hold_sec=1.0, max_skip_sec=100.0)
+    base = _frame(0)
+    gate.update(base, 0.0)
+    gate.executed()
+    mid = base.copy()
+    mid[:, :20] = 100  # 약 0.31: exit_ratio 와 enter_ratio 사이
+    gate.update(base, 0.1)  # 조용한 구간 시작
+    gate.update(mid, 0.6)
+    gate.update(base, 1.2)  # 중간 구간에서 끊겼으므로 여기서 다시 시작
+    assert gate.active
+    gate.update(base, 2.3)
+    assert not gate.active
+
+
+def _scene(rng):
+    import cv2
+    bg = cv2.GaussianBlur(rng.integers(0, 255, (480, 640, 3), dtype=np.uint8), (0, 0), 3)
+    patch = rng.integers(0, 255, (80, 80, 3), dtype=np.uint8)
+    return bg, patch
+
+
+def test_moving_patch_keeps_gate_active():
+    rng = np.random.default_rng(0)
+    bg, patch = _scene(rng)
+    gate = MotionGate()
+    for i in range(30):  # 6fps 로 1프레임에 4px 이동 (천천히 움직이는 얼굴)
+        f = bg.copy()
+        x = 200 + 4 * i
+        f[200:280, x:x + 80] = patch
+        if gate.update(f, i / 6):
+            gate.executed()
+    assert gate.active and gate.stats["skipped"] == 0
+
+
+def test_sensor_noise_goes_static():
+    rng = np.random.default_rng(1)
+    bg, _ = _scene(rng)
+    gate = MotionGate()
+    for i in range(30):
+        f = np.clip(bg + rng.normal(0, 8, bg.shape), 0, 255).astype(np.uint8)
+        if gate.update(f, i / 6):
+            gate.executed()
+    assert not gate.active and gate.stats["skipped"] > 0
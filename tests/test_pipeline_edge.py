@@ -0,0 +1,72 @@
+import queue
+import threading
+import time
+
+import pytest
+
+from pipeline_runner import Edge, offer, LATEST, FIFO, BLOCKING
+
+
+def drain(q):
+    out = []
+    while True:
+        try:
+            out.append(q.get_nowait())
+        except queue.Empty:
+            return out
+
+
+def test_latest_drops_oldest():
+    e = Edge("e", LATEST, maxsize=2)
+    assert all(e.put(i) for i in range(5))
+    assert drain(e) == [3, 4]
+    assert e.summary() == {"policy": LATEST, "maxsize": 2, "depth": 0, "puts": 5, "dropped": 3}
+
+
+def test_fifo_drops_newest():
+    e = Edge("e", FIFO, maxsize=2)
+    assert [e.put(i) for i in range(4)] == [True, True, False, False]
+    assert drain(e) == [0, 1]
+    assert e.dropped == 2
+
+
+def test_blocking_waits_for_consumer():
+    e = Edge("e", BLOCKING, maxsize=1)
+    e.put(0)
+    t = threading.Timer(0.2, e.get)
+    t.start()
+    t0 = time.time()
+    assert e.put(1)
+    assert time.time() - t0 >= 0.15
+    assert drain(e) == [1]
+    t.join()
+
+
+def test_blocking_close_releases_producer():
+    e = Edge("e", BLOCKING, maxsize=1)
+    e.put(0)
+    threading.Timer(0.1, e.close).start()
+    assert e.put(1) is False
+    assert e.dropped == 1 and drain(e) == [0]
+
+
+def test_task_done_accounting_after_drop():
+    e = Edge("e", LATEST, maxsize=1)
+    e.put(0)
+    e.put(1)
+    e.get()
+    e.task_done()
+    e.join()  # 버린 항목이 unfinished_tasks 에 남으면 여기서 멈춤
+
+
+def test_offer_plain_queue_drop_oldest():
+    q = queue.Queue(maxsize=1)
+    assert offer(q, 0) and offer(q, 1)
+    assert drain(q) == [1]
+
+
+def test_invalid_edge():
+    with pytest.raises(ValueError):
+        Edge("e", "drop_all")
+    with pytest.raises(ValueError):
+        Edge("e", LATEST, maxsize=0)
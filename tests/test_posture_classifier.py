@@ -0,0 +1,59 @@
+import numpy as np
+
+from posture_classifier import (PostureClassifier, Baseline, LABELS, labels, face_box, nose_point,
+                                landmarks_to_array)
+
+BASE = Baseline((100, 100, 150, 180), (175, 190))
+
+
+def test_rules():
+    clf = PostureClassifier()
+    x, y, w, h = BASE.box
+    nx, ny = BASE.nose
+    assert clf.classify(BASE.box, BASE.nose, BASE).pose == "normal"
+    assert clf.classify((x, y, int(w * 0.8), int(h * 0.8)), BASE.nose, BASE).pose == "L"
+    assert clf.classify(BASE.box, (nx - 40, ny), BASE).pose == "left"
+    assert clf.classify(BASE.box, (nx + 40, ny), BASE).pose == "right"
+    assert clf.classify(BASE.box, (nx, ny + 30), BASE).pose == "turtle"
+    # 얼굴이 많이 커지면 (turtle_max_scale 초과) 코가 내려가도 거북목이 아님
+    assert clf.classify((x, y, int(w * 1.3), int(h * 1.3)), (nx, ny + 30), BASE).pose == "normal"
+
+
+def test_batch_matches_per_frame():
+    clf = PostureClassifier()
+    rng = np.random.default_rng(0)
+    n = 5000
+    boxes = np.column_stack([np.full(n, 100), np.full(n, 100), rng.integers(100, 220, n), rng.integers(120, 260, n)])
+    noses = np.column_stack([rng.integers(120, 230, n), rng.integers(150, 240, n)])
+    codes = clf.classify_frames(boxes, noses, BASE)
+    loop = [clf.classify(tuple(b), tuple(p), BASE).pose for b, p in zip(boxes.tolist(), noses.tolist())]
+    assert labels(codes).tolist() == loop
+    assert set(loop) == set(LABELS)  # 모든 규칙 분기를 지나도록 충분히 흩어진 입력
+
+
+def test_batch_boundaries():
+    clf = PostureClassifier()
+    bw = BASE.box[2]
+    dx = np.array([bw * 0.2, -bw * 0.2, bw * 0.2 + 1, 0, 0, 0])
+    dy = np.array([0, 0, 0, 25, 26, 26])
+    scale = np.array([1.0, 1.0, 1.0, 1.0, 0.9, 1.45])
+    assert labels(clf.classify_batch(dx, dy, scale, bw)).tolist() == [
+        "normal", "normal", "right", "normal", "turtle", "turtle"]
+
+
+def test_classify_log_default_bw(tmp_path):
+    path = tmp_path / "pose_log.csv"
+    path.write_text("timestamp,pose,dx,dy,scale,true_pose\n"
+                    "t,normal,0,0,1.0,\nt,left,-40,0,1.0,\nt,L,0,0,0.8,\n")
+    cols = PostureClassifier().classify_log(str(path), default_bw=150)
+    assert cols["bw"].tolist() == [150, 150, 150]
+    assert labels(cols["codes"]).tolist() == ["normal", "left", "L"]
+
+
+def test_landmark_helpers():
+    class P:
+        def __init__(self, x, y):
+            self.x, self.y = x, y
+    pts = landmarks_to_array([P(0.1, 0.2), P(0.25, 0.5), P(0.4, 0.6)], 640, 480)
+    assert face_box(pts) == (64, 96, 192, 192)
+    assert nose_point(pts) == (160, 240)
@@ -0,0 +1,22 @@
+from redetection_scheduler import RedetectionScheduler
+
+
+def test_gated_frames_advance_clock_and_defer():
+    s = RedetectionScheduler(max_interval=5, max_age_sec=100.0)
+    s.confirm((0, 0, 100, 100), now=0.0)
+    assert not any(s.decide(now=0.1 * i, allowed=False) for i in range(1, 8))
+    assert s.frames_since == 7 and s.stats["deferred"] == 3
+    assert s.decide(now=0.8)  # 게이트가 열리면 바로 재감지
+    summary = s.summary()
+    assert summary["gated_frames"] == 7 and summary["saved_vs_fixed"] == -1  # 게이트가 연 1 프레임만 비교
+
+
+def test_velocity_normalised_by_timestamp():
+    fast = RedetectionScheduler(frame_interval=1 / 6)
+    fast.observe((0, 0, 100, 100), 0.0)
+    fast.observe((10, 0, 100, 100), 1 / 6)
+    slow = RedetectionScheduler(frame_interval=1 / 6)
+    slow.observe((0, 0, 100, 100), 0.0)
+    slow.observe((10, 0, 100, 100), 0.5)  # 같은 이동을 idle 주기(2fps)로 관찰
+    assert abs(fast._velocity - 0.1) < 1e-9
+    assert abs(slow._velocity - fast._velocity / 3) < 1e-9
@@ -0,0 +1,47 @@
+import numpy as np
+
+from is_stable import is_stable, StabilityDetector
+
+
+def brute_force(samples, t, window_sec, started):
+    win = [s for s in samples if s[0] >= t - window_sec]
+    if t - started < window_sec:
+        return False
+    return is_stable([s[1] for s in win], [s[2] for s in win])
+
+
+def test_matches_is_stable_on_windows():
+    rng = np.random.default_rng(1)
+    det = StabilityDetector(window_sec=1.5)
+    samples = []
+    t, nose, size = 0.0, np.array([320, 240]), np.array([150, 180])
+    changes = 0
+    for _ in range(3000):
+        t += rng.uniform(0.02, 0.06)
+        if rng.random() < 0.02:  # 가끔 크게 움직임
+            nose = nose + rng.integers(-20, 21, 2)
+            size = size + rng.integers(-15, 16, 2)
+        n = tuple(int(v) for v in nose + rng.integers(-2, 3, 2))
+        s = tuple(int(v) for v in size + rng.integers(-3, 4, 2))
+        samples.append((t, n, s))
+        got = det.update(t, n, s)
+        assert got == brute_force(samples, t, 1.5, samples[0][0])
+        changes += got
+    assert 0 < changes < 3000  # 안정/불안정 둘 다 나옴
+
+
+def test_stable_since_and_reset():
+    det = StabilityDetector(window_sec=1.0)
+    for i in range(11):
+        det.update(i * 0.1, (100, 100), (50, 50))
+    assert det.stable and det.stable_since == 0.0
+    assert abs(det.stable_for(1.5) - 1.5) < 1e-9
+    det.update(1.1, (120, 100), (50, 50))  # 움직임 → 윈도가 밀려날 때까지 불안정
+    assert not det.stable and det.stable_for(1.2) == 0.0
+    det.reset()
+    assert not det.update(5.0, (100, 100), (50, 50))  # 재시작 후 window_sec 관찰 전에는 안정 아님
+
+
+def test_min_samples():
+    det = StabilityDetector(window_sec=0.5, min_samples=5)
+    assert not any(det.update(t, (0, 0), (10, 10)) for t in (0.0, 0.5, 1.0, 1.5))
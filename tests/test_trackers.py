@@ -0,0 +1,52 @@
+import numpy as np
+
+import trackers
+from trackers import AutoTracker, TrackerStats
+
+FRAME = np.zeros((48, 64, 3), np.uint8)
+BOX = (10.0, 10.0, 20.0, 20.0)
+
+
+class FakeBackend:
+    fail = set()  # update 가 실패하는 백엔드 이름
+
+    def __init__(self, name):
+        self.name = name
+
+    def init(self, frame, bbox):
+        return True
+
+    def update(self, frame):
+        return (False, None) if self.name in self.fail else (True, BOX)
+
+
+def _setup(monkeypatch, fail=()):
+    monkeypatch.setattr(trackers, "_make_backend", FakeBackend)
+    monkeypatch.setattr(FakeBackend, "fail", set(fail))
+    stats = TrackerStats()
+    stats.record("csrt", 50.0, True)  # 예산 초과로 내려간 상태
+    return stats
+
+
+def test_probe_survives_redetection(monkeypatch):
+    stats = _setup(monkeypatch)
+    backends = ("csrt", "kcf")
+    for _ in range(5):  # 재감지마다 새 트래커, 각각 2번만 갱신
+        t = AutoTracker(stats, probe_every=6, probe_window=3, backends=backends)
+        assert t.init(FRAME, BOX)
+        for _ in range(2):
+            t.update(FRAME)
+    assert stats.auto["probes"] == 1
+    assert stats.auto["backend"] == "csrt"  # 다시 재 보니 빨라서 올라감
+
+
+def test_failed_probe_falls_back(monkeypatch):
+    stats = _setup(monkeypatch, fail={"csrt"})
+    t = AutoTracker(stats, probe_every=2, probe_window=3, backends=("csrt", "kcf"))
+    assert t.init(FRAME, BOX) and t.backend == "kcf"
+    t.update(FRAME)
+    t.update(FRAME)
+    assert t.backend == "csrt" and stats.auto["probing"] == 3
+    ok, bbox = t.update(FRAME)
+    assert ok and bbox == BOX and t.backend == "kcf"
+    assert stats.auto["probing"] == 0 and stats.auto["since_switch"] == 0
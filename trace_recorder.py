@@ -0,0 +1,214 @@
+"""
+구조화 트레이스 기록기.
+핫 루프(재감지 판정, 인증 매칭)의 print() 대신 결정 기록을 고정 크기 바이너리 레코드로 메모리 링 버퍼에 쌓습니다.
+
+- record() 는 레벨 미달이면 비교 한 번으로 바로 반환하므로, 꺼져 있을 때(level=OFF) 비용이 거의 없습니다.
+- 이벤트별 샘플링(sample={EV_...: N}) 으로 N 번에 한 번만 기록할 수 있습니다.
+- start_writer(path) 를 호출하면 백그라운드 스레드가 주기적으로 새 레코드를 파일에 이어 씁니다.
+  (쓰기 전에 링이 한 바퀴 돌아 덮어쓴 레코드는 lost 로 셉니다)
+- dump(path) 는 링에 남아 있는 레코드 전체를 즉시 파일로 씁니다. install_crash_dump(path) 는 처리되지 않은 예외가
+  메인/작업 스레드에서 발생할 때 자동으로 dump 합니다.
+
+레코드 읽기: python trace_recorder.py trace.bin [--event redetect_match]
+"""
+import struct
+import sys
+import threading
+import time
+from typing import Dict, Iterator, Optional, Tuple
+
+DEBUG, INFO, WARN, OFF = 10, 20, 30, 100
+LEVEL_NAMES = {"debug": DEBUG, "info": INFO, "warn": WARN, "off": OFF}
+
+# ts, frame_seq, event, level, state, iou, distance, similarity, x, y, w, h, aux (40 bytes)
+RECORD = struct.Struct("<diHBBfffhhhhf")
+MAGIC = b"TRC1"
+
+# 이벤트 코드
+EV_STATE = 1             # 상태 전이 (state = 새 상태)
+EV_REDETECT = 2          # 재감지 수행 (aux = 감지된 얼굴 수)
+EV_REDETECT_CAND = 3     # 재감지 후보 얼굴 (iou, distance=얼굴 거리, similarity=종합 점수)
+EV_REDETECT_MATCH = 4    # 동일 인물 확인 → 트래커 재초기화 (bbox = 축소 bbox)
+EV_REDETECT_REJECT = 5   # 다른 인물 (aux = 사유 코드)
+EV_REDETECT_MISS = 6     # 얼굴 미감지
+EV_TRACK_REINIT_FAIL = 7
+EV_TRACK_REQUEST = 8     # 테스트 모드 자동 추적 요청 (bbox = 가장 큰 얼굴)
+EV_TRACK_START = 9       # 추적 시작 (bbox = 축소 bbox, aux = 저장한 임베딩 크기, 0 이면 추출 실패)
+EV_AUTH_UNKNOWN = 20     # aux = unknown streak
+EV_AUTH_MATCH = 21       # aux = user id
+EV_AUTH_ENROLL = 22      # aux = 등록 user id (시작: -id, 완료: +id)
+EV_AUTH_ABSENT = 23      # aux = 부재 처리된 user id
+EV_AUTH_LOGIN = 24       # 로그인/재인식 → 캘리브레이션 (similarity, aux = user id)
+EVENT_NAMES = {
+    EV_STATE: "state", EV_REDETECT: "redetect", EV_REDETECT_CAND: "redetect_cand",
+    EV_REDETECT_MATCH: "redetect_match", EV_REDETECT_REJECT: "redetect_reject", EV_REDETECT_MISS: "redetect_miss",
+    EV_TRACK_REINIT_FAIL: "track_reinit_fail", EV_TRACK_REQUEST: "track_request", EV_TRACK_START: "track_start",
+    EV_AUTH_UNKNOWN: "auth_unknown", EV_AUTH_MATCH: "auth_match", EV_AUTH_ENROLL: "auth_enroll",
+    EV_AUTH_ABSENT: "auth_absent", EV_AUTH_LOGIN: "auth_login",
+}
+
+# 상태 코드
+STATES = ("", "RECOGNIZING", "TRACKING", "ABSENT")
+STATE_CODES = {name: i for i, name in enumerate(STATES)}
+
+# 재감지 거절 사유 (EV_REDETECT_REJECT 의 aux)
+REJECT_IOU, REJECT_FACE = 1, 2
+
+NAN = float("nan")
+
+
+class TraceRecorder:
+    def __init__(self, capacity: int = 4096, level: int = OFF, sample: Optional[Dict[int, int]] = None):
+        """
+        :param capacity: 링 버퍼 레코드 수 (가득 차면 가장 오래된 것부터 덮어씀)
+        :param level: 이 레벨 이상만 기록 (OFF 면 전부 무시)
+        :param sample: {이벤트 코드: N} → 해당 이벤트는 N 번에 한 번만 기록
+        """
+        self.capacity = capacity
+        self.level = level
+        self.sample = dict(sample or {})
+        self._buf = bytearray(capacity * RECORD.size)
+        self._lock = threading.Lock()
+        self._n = 0  # 지금까지 기록한 레코드 수 (다음 쓰기 위치 = _n % capacity)
+        self._sample_count: Dict[int, int] = {}
+        self._written = 0  # writer 가 파일로 내보낸 레코드 수
+        self._writer: Optional[threading.Thread] = None
+        self._writer_stop = threading.Event()
+        self.lost = 0
+
+    def enabled(self, level: int = INFO) -> bool:
+        return level >= self.level
+
+    def record(self, event: int, level: int = INFO, frame_seq: int = -1, state: str = "", iou: float = NAN,
+               distance: float = NAN, similarity: float = NAN, bbox: Optional[Tuple[int, int, int, int]] = None,
+               aux: float = 0.0):
+        if level < self.level:
+            return
+        every = self.sample.get(event)
+        if every:
+            c = self._sample_count.get(event, 0)
+            self._sample_count[event] = c + 1
+            if c % every:
+                return
+        x, y, w, h = bbox if bbox else (0, 0, 0, 0)
+        with self._lock:
+            RECORD.pack_into(self._buf, (self._n % self.capacity) * RECORD.size, time.time(), frame_seq, event,
+                             level, STATE_CODES.get(state, 0), iou,
+                             NAN if distance is None else distance, NAN if similarity is None else similarity,
+                             int(x), int(y), int(w), int(h), aux)
+            self._n += 1
+
+    def _snapshot(self, start: int) -> Tuple[bytes, int, int]:
+        """start 번째 이후 레코드를 순서대로 복사 → (bytes, 시작 번호, 끝 번호)"""
+        with self._lock:
+            end = self._n
+            start = max(start, end - self.capacity)
+            if start >= end:
+                return b"", start, end
+            i, j = start % self.capacity, end % self.capacity
+            size = RECORD.size
+            if i < j:
+                data = bytes(self._buf[i * size:j * size])
+            else:
+                data = bytes(self._buf[i * size:]) + bytes(self._buf[:j * size])
+            return data, start, end
+
+    def dump(self, path: str) -> int:
+        """링에 남은 레코드를 파일로 저장. :return: 저장한 레코드 수"""
+        data, _, _ = self._snapshot(0)
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+            f.write(data)
+        return len(data) // RECORD.size
+
+    def start_writer(self, path: str, interval: float = 1.0):
+        """백그라운드에서 interval 초마다 새 레코드를 path 에 이어 씀"""
+        if self._writer is not None:
+            return
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+        self._written = self._n
+        self._writer_stop.clear()
+        self._writer = threading.Thread(target=self._writer_loop, args=(path, interval), name="trace-writer",
+                                        daemon=True)
+        self._writer.start()
+
+    def _writer_loop(self, path: str, interval: float):
+        with open(path, "ab") as f:
+            while True:
+                stopping = self._writer_stop.wait(interval)
+                data, start, end = self._snapshot(self._written)
+                self.lost += start - self._written
+                self._written = end
+                if data:
+                    f.write(data)
+                    f.flush()
+                if stopping:
+                    return
+
+    def stop_writer(self):
+        if self._writer is not None:
+            self._writer_stop.set()
+            self._writer.join(timeout=2.0)
+            self._writer = None
+
+    def install_crash_dump(self, path: str):
+        """처리되지 않은 예외 발생 시 링을 path 로 저장 (기존 excepthook 도 그대로 호출)"""
+        prev_hook, prev_thread_hook = sys.excepthook, threading.excepthook
+
+        def hook(exc_type, exc, tb):
+            self._crash_dump(path)
+            prev_hook(exc_type, exc, tb)
+
+        def thread_hook(args):
+            self._crash_dump(path)
+            prev_thread_hook(args)
+        sys.excepthook = hook
+        threading.excepthook = thread_hook
+
+    def _crash_dump(self, path: str):
+        try:
+            n = self.dump(path)
+            print(f"TraceRecorder: 예외 발생, 트레이스 {n}건 저장 → {path}", file=sys.stderr)
+        except Exception as e:
+            print(f"TraceRecorder: 크래시 덤프 실패: {e}", file=sys.stderr)
+
+    def summary(self) -> dict:
+        return {"level": self.level, "recorded": self._n, "capacity": self.capacity, "lost": self.lost}
+
+
+def read_trace(path: str) -> Iterator[dict]:
+    """dump/start_writer 로 만든 파일을 레코드 dict 로 읽음"""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"트레이스 파일이 아닙니다: {path}")
+        data = f.read()
+    for ts, seq, ev, lv, st, iou, dist, sim, x, y, w, h, aux in RECORD.iter_unpack(
+            data[:len(data) - len(data) % RECORD.size]):
+        yield {"ts": ts, "frame_seq": seq, "event": EVENT_NAMES.get(ev, str(ev)), "level": lv,
+               "state": STATES[st] if st < len(STATES) else str(st), "iou": iou, "distance": dist,
+               "similarity": sim, "bbox": (x, y, w, h), "aux": aux}
+
+
+# 모듈 공용 기록기. 기본은 꺼져 있으며 tracer.level = INFO 등으로 켭니다.
+tracer = TraceRecorder()
+
+
+def _fmt(v: float) -> str:
+    return "-" if v != v else f"{v:.3f}"
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser()
+    ap.add_argument("path")
+    ap.add_argument("--event", default=None, help="이 이벤트만 출력 (예: redetect_match)")
+    args = ap.parse_args()
+    t0 = None
+    for r in read_trace(args.path):
+        if args.event and r["event"] != args.event:
+            continue
+        t0 = t0 or r["ts"]
+        print(f"{r['ts'] - t0:9.3f}s seq={r['frame_seq']:<6} {r['event']:<18} {r['state']:<11} "
+              f"iou={_fmt(r['iou'])} dist={_fmt(r['distance'])} sim={_fmt(r['similarity'])} "
+              f"bbox={r['bbox']} aux={r['aux']:g}")
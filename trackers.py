@@ -0,0 +1,302 @@
+"""
+TRACKING 상태용 트래커 백엔드.
+모든 백엔드는 init(frame, bbox) -> bool, update(frame) -> (ok, bbox) 인터페이스를 가집니다.
+
+- csrt    : 가장 정확하지만 가장 비쌈 (기존 기본값)
+- kcf     : CSRT 보다 빠르고 덜 정확
+- mosse   : 가장 빠름, 크기 변화에 약함
+- optflow : 얼굴 박스 안의 특징점을 피라미드 LK 옵티컬 플로우로 추적 (이동 + 크기)
+- auto    : 실행 중 백엔드별 갱신 비용/실패율을 측정해, 프레임 예산을 만족하는
+            가장 정확한 백엔드를 고르고 예산을 넘으면 더 싼 백엔드로 내립니다.
+
+make_tracker(name, stats) 의 stats(TrackerStats) 는 트래커 재생성 사이에도 유지되는 측정값입니다.
+"""
+import threading
+import time
+from typing import Dict, Optional
+import cv2
+import numpy as np
+
+# 정확도 순서 (앞일수록 정확하고 비쌈)
+BACKENDS = ("csrt", "kcf", "optflow", "mosse")
+TRACKER_CHOICES = BACKENDS + ("auto",)
+
+
+class TrackerStats:
+    """백엔드별 갱신 비용(EMA, ms)과 실패율(EMA) 누적. 추적/처리 스레드가 공유"""
+
+    def __init__(self, alpha: float = 0.1):
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self.data: Dict[str, dict] = {}
+        # auto 모드 상태: AutoTracker 가 재감지마다 새로 만들어져도 이어지도록 여기에 둔다
+        self.auto = {"backend": None, "since_switch": 0, "probing": 0, "fallback": None, "switches": 0, "probes": 0}
+
+    def record(self, name: str, ms: float, ok: bool):
+        with self._lock:
+            d = self.data.setdefault(name, {"updates": 0, "failures": 0, "ema_ms": ms, "fail_rate": 0.0})
+            if d.pop("stale", False):
+                d["ema_ms"], d["fail_rate"] = ms, 0.0
+            d["updates"] += 1
+            d["failures"] += 0 if ok else 1
+            d["ema_ms"] += self.alpha * (ms - d["ema_ms"])
+            d["fail_rate"] += self.alpha * ((0.0 if ok else 1.0) - d["fail_rate"])
+
+    def forget(self, name: str):
+        """다음 측정값으로 EMA 를 새로 시작 (오래 쓰지 않은 백엔드를 다시 잴 때)"""
+        with self._lock:
+            d = self.data.get(name)
+            if d is not None:
+                d["stale"] = True
+
+    def get(self, name: str) -> Optional[dict]:
+        with self._lock:
+            d = self.data.get(name)
+            return dict(d) if d else None
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            return {k: dict(v) for k, v in self.data.items()}
+
+
+def _cv2_factory(kind: str):
+    legacy = getattr(cv2, "legacy", None)
+    fn = getattr(legacy, f"Tracker{kind}_create", None) if legacy is not None else None
+    return fn or getattr(cv2, f"Tracker{kind}_create", None)
+
+
+class OpenCVTracker:
+    """cv2(legacy) 트래커 래퍼"""
+    KINDS = {"csrt": "CSRT", "kcf": "KCF", "mosse": "MOSSE"}
+
+    def __init__(self, name: str):
+        factory = _cv2_factory(self.KINDS[name])
+        if factory is None:
+            raise ValueError(f"이 OpenCV 빌드에는 {name} 트래커가 없습니다 (opencv-contrib-python 필요)")
+        self.name = name
+        self._impl = factory()
+
+    def init(self, frame: np.ndarray, bbox) -> bool:
+        ok = self._impl.init(frame, tuple(int(v) for v in bbox))
+        return True if ok is None else bool(ok)  # 새 API 는 None 반환
+
+    def update(self, frame: np.ndarray):
+        return self._impl.update(frame)
+
+
+class OpticalFlowTracker:
+    """박스 안의 코너 특징점을 LK 옵티컬 플로우로 추적. 중앙값 이동량/거리비로 박스 이동·크기 추정"""
+
+    def __init__(self, max_points: int = 60, min_points: int = 8, fb_thr: float = 1.5):
+        self.name = "optflow"
+        self.max_points = max_points
+        self.min_points = min_points
+        self.fb_thr = fb_thr  # forward-backward 오차 허용치 (px)
+        self.lk_params = dict(winSize=(15, 15), maxLevel=2,
+                              criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+        self.prev_gray = None
+        self.pts = None
+        self.bbox = None
+
+    @staticmethod
+    def _gray(frame):
+        return frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+    def _seed(self, gray, bbox):
+        fh, fw = gray.shape[:2]
+        x, y, w, h = bbox
+        x0, y0 = max(0, int(x)), max(0, int(y))
+        x1, y1 = min(fw, int(x + w)), min(fh, int(y + h))
+        self.pts = None
+        if x1 - x0 < 8 or y1 - y0 < 8:
+            return
+        mask = np.zeros_like(gray)
+        mask[y0:y1, x0:x1] = 255
+        self.pts = cv2.goodFeaturesToTrack(gray, maxCorners=self.max_points, qualityLevel=0.01,
+                                           minDistance=max(3, int(w) // 20), mask=mask)
+
+    def init(self, frame: np.ndarray, bbox) -> bool:
+        gray = self._gray(frame)
+        self.bbox = tuple(float(v) for v in bbox)
+        self.prev_gray = gray
+        self._seed(gray, self.bbox)
+        return self.pts is not None and len(self.pts) >= self.min_points
+
+    def update(self, frame: np.ndarray):
+        if self.pts is None or len(self.pts) < self.min_points:
+            return False, None
+        gray = self._gray(frame)
+        nxt, st, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, self.pts, None, **self.lk_params)
+        back, st2, _ = cv2.calcOpticalFlowPyrLK(gray, self.prev_gray, nxt, None, **self.lk_params)
+        fb = np.linalg.norm((self.pts - back).reshape(-1, 2), axis=1)
+        good = (st.ravel() == 1) & (st2.ravel() == 1) & (fb < self.fb_thr)
+        if good.sum() < self.min_points:
+            return False, None
+
+        p0, p1 = self.pts[good].reshape(-1, 2), nxt[good].reshape(-1, 2)
+        dx, dy = np.median(p1 - p0, axis=0)
+        i, j = np.triu_indices(len(p0), 1)
+        d0 = np.linalg.norm(p0[i] - p0[j], axis=1)
+        d1 = np.linalg.norm(p1[i] - p1[j], axis=1)
+        valid = d0 > 1.0
+        s = float(np.median(d1[valid] / d0[valid])) if valid.any() else 1.0
+
+        x, y, w, h = self.bbox
+        cx, cy = x + w / 2 + dx, y + h / 2 + dy
+        w, h = w * s, h * s
+        fh, fw = gray.shape[:2]
+        if w < 8 or h < 8 or cx < 0 or cy < 0 or cx > fw or cy > fh:
+            return False, None
+        self.bbox = (cx - w / 2, cy - h / 2, w, h)
+        self.prev_gray = gray
+        self.pts = p1.reshape(-1, 1, 2)
+        # 특징점이 많이 빠졌으면 현재 박스에서 다시 뽑는다
+        if len(self.pts) < 2 * self.min_points:
+            self._seed(gray, self.bbox)
+        return True, self.bbox
+
+
+def _make_backend(name: str):
+    return OpticalFlowTracker() if name == "optflow" else OpenCVTracker(name)
+
+
+class TimedTracker:
+    """갱신 비용/성공 여부를 TrackerStats 에 기록하는 래퍼"""
+
+    def __init__(self, impl, stats: TrackerStats):
+        self.impl = impl
+        self.name = impl.name
+        self.stats = stats
+
+    def init(self, frame, bbox) -> bool:
+        return self.impl.init(frame, bbox)
+
+    def update(self, frame):
+        t0 = time.perf_counter()
+        ok, bbox = self.impl.update(frame)
+        self.stats.record(self.name, (time.perf_counter() - t0) * 1000.0, bool(ok))
+        return ok, bbox
+
+
+class AutoTracker:
+    """
+    프레임 예산(budget_ms) 안에서 가장 정확한 백엔드를 골라 쓰는 트래커.
+    재감지마다 새로 만들어지므로 현재 백엔드, 전환 후 갱신 수, 측정 중 상태는 공유 TrackerStats 에 둡니다.
+    새 인스턴스의 init() 은 백엔드를 다시 고르지 않고 쓰던 백엔드를 새 박스로 다시 시작합니다.
+    """
+
+    def __init__(self, stats: TrackerStats, budget_ms: float = 8.0, max_fail_rate: float = 0.2,
+                 probe_every: int = 300, probe_window: int = 30, backends=BACKENDS):
+        """
+        :param stats: 공유 측정값
+        :param budget_ms: 갱신 1회 목표 비용 (ms)
+        :param max_fail_rate: 실패율(EMA)이 이 값을 넘는 백엔드는 선택하지 않음
+        :param probe_every: 이 횟수만큼 갱신한 뒤 한 단계 더 정확한 백엔드를 다시 시도 (트래커 재생성 사이에도 누적)
+        :param probe_window: 다시 시도한 백엔드는 이전 측정값을 버리고 이 횟수만큼 돌려 새로 잰 뒤 판단
+        """
+        self.name = "auto"
+        self.stats = stats
+        self.budget_ms = budget_ms
+        self.max_fail_rate = max_fail_rate
+        self.probe_every = probe_every
+        self.probe_window = probe_window
+        self.backends = tuple(b for b in backends if b == "optflow" or _cv2_factory(OpenCVTracker.KINDS[b]))
+        self.active: Optional[TimedTracker] = None
+        self._last_bbox = None
+
+    @property
+    def switches(self) -> int:
+        return self.stats.auto["switches"]
+
+    @property
+    def probes(self) -> int:
+        return self.stats.auto["probes"]
+
+    def _fits(self, name: str) -> bool:
+        d = self.stats.get(name)
+        if d is None:
+            return True  # 아직 측정 전이면 시도해 본다
+        return d["fail_rate"] <= self.max_fail_rate and d["ema_ms"] <= self.budget_ms
+
+    def _choose(self) -> str:
+        return self._choose_from(0)
+
+    def _choose_from(self, start: int) -> str:
+        for name in self.backends[start:]:
+            if self._fits(name):
+                return name
+        return self.backends[-1]
+
+    def _switch(self, name: str, frame, bbox) -> bool:
+        impl = TimedTracker(_make_backend(name), self.stats)
+        if not impl.init(frame, bbox):
+            return False
+        self.active = impl
+        self._last_bbox = bbox
+        state = self.stats.auto
+        if state["backend"] != name:
+            state.update(backend=name, switches=state["switches"] + 1, since_switch=0, probing=0, fallback=None)
+        return True
+
+    @property
+    def backend(self) -> Optional[str]:
+        return self.active.name if self.active else None
+
+    def init(self, frame, bbox) -> bool:
+        # 재감지로 다시 만든 경우: 측정 중이거나 아직 예산 안이면 쓰던 백엔드를 이어서 씀
+        state = self.stats.auto
+        current = state["backend"]
+        if current in self.backends and (state["probing"] or self._fits(current)):
+            first = current
+        else:
+            first = self._choose()
+        if self._switch(first, frame, bbox):
+            return True
+        return any(self._switch(n, frame, bbox) for n in self.backends if n != first)
+
+    def update(self, frame):
+        state = self.stats.auto
+        ok, bbox = self.active.update(frame)
+        if not ok:
+            fallback = state["fallback"]
+            if state["probing"] and fallback and self._last_bbox is not None and \
+                    self._switch(fallback, frame, self._last_bbox):
+                # 다시 시도한 백엔드가 놓침 → 이번 프레임은 이전 백엔드로 마지막 박스에서 이어감
+                return True, self._last_bbox
+            return ok, bbox
+        self._last_bbox = bbox
+        state["since_switch"] += 1
+        name = self.active.name
+        idx = self.backends.index(name)
+        if state["probing"]:
+            # 다시 시도 중인 백엔드는 측정 구간이 끝날 때까지 유지
+            state["probing"] -= 1
+            if not state["probing"]:
+                state["fallback"] = None
+        elif not self._fits(name) and idx + 1 < len(self.backends):
+            # 예산 초과/실패율 초과 → 더 싼 백엔드로 내림
+            self._switch(self._choose_from(idx + 1), frame, bbox)
+        elif state["since_switch"] >= self.probe_every and idx > 0:
+            # 주기적으로 한 단계 더 정확한 백엔드를 실제로 돌려 본다.
+            # 내려간 뒤로는 쓰지 않아 측정값이 갱신되지 않았으므로 이전 비용/실패율은 버린다
+            better = self.backends[idx - 1]
+            self.stats.forget(better)
+            if self._switch(better, frame, bbox):
+                state.update(probing=self.probe_window, fallback=name, probes=state["probes"] + 1)
+            else:
+                state["since_switch"] = 0
+        return ok, bbox
+
+
+def make_tracker(name: str = "csrt", stats: Optional[TrackerStats] = None, budget_ms: float = 8.0):
+    """
+    :param name: "csrt" | "kcf" | "mosse" | "optflow" | "auto"
+    :param stats: 공유 측정값 (None 이면 새로 생성)
+    :param budget_ms: auto 모드의 갱신 1회 목표 비용
+    """
+    if name not in TRACKER_CHOICES:
+        raise ValueError(f"지원하지 않는 트래커: {name} (가능: {TRACKER_CHOICES})")
+    stats = stats or TrackerStats()
+    if name == "auto":
+        return AutoTracker(stats, budget_ms=budget_ms)
+    return TimedTracker(_make_backend(name), stats)
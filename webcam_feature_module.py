@@ -1,6 +1,20 @@
-import threading, queue, time, cv2
+import threading, time, cv2
 import face_recognition
+from collections import deque
 from pipeline_data import PipelineData
+from face_encoder import make_face_encoder, detect_faces, ENCODE_ALL
+from redetection_scheduler import RedetectionScheduler
+from trackers import make_tracker, TrackerStats, TRACKER_CHOICES
+from frame_ring import FrameRing, LeasedFrame
+from preview_encoder import PreviewEncoder
+from frame_source import open_frame_source
+from motion_gate import MotionGate
+from pipeline_runner import offer
+from pipeline_metrics import RateMeter, stage_enter, stage_exit
+from trace_recorder import (tracer, DEBUG, INFO, WARN, EV_STATE, EV_REDETECT, EV_REDETECT_CAND,
+                            EV_REDETECT_MATCH, EV_REDETECT_REJECT, EV_REDETECT_MISS, EV_TRACK_REINIT_FAIL,
+                            EV_TRACK_REQUEST, EV_TRACK_START,
+                            REJECT_IOU, REJECT_FACE)
 from dataclasses import dataclass, field
 from typing import Optional, List, Tuple
 import numpy as np
@@ -12,24 +26,43 @@ class WebcamModule:
     이중 스레드 웹캠 & 특징 추출 모듈이다.
     메인 스레드: 고속 프레임 캡쳐
     워커 스레드: ML 처리를 위한 프레임 전송
+    추적 스레드: TRACKING 상태에서 tracking_fps 로 트래커 갱신 (재감지는 워커 스레드가 비동기로 수행)
     """
 
     def __init__(self, camera_id=0, capture_fps=60, processing_fps=6, tracking_fps=60,
-                 bbox_reduce_ratio=0.1, auto_brightness=False):
+                 bbox_reduce_ratio=0.1, auto_brightness=False, encoder_workers=0, encode_policy=ENCODE_ALL,
+                 detect_scale=1.0, detect_upsample_fallback=False, redetect_roi_margin=1.0,
+                 adaptive_redetection=True, tracker_backend="csrt", tracker_budget_ms=None,
+                 frame_slots=None, preview_quality=80, adaptive_preview=False, source=None,
+                 motion_gate=True, motion_threshold=0.01, motion_idle_fps=2.0):
         """
         웹캠 모듈 초기화.
 
-        :param camera_id: 카메라 장치 ID (기본값: 0)
+        :param camera_id: 카메라 장치 ID (기본값: 0). 영상 파일/이미지 폴더/녹화 세션 경로 문자열도 가능
         :param capture_fps: 디스플레이 스레드 목표 FPS (기본값: 60)
         :param processing_fps: ML 처리 프레임 전송 FPS (기본값: 6)
         :param tracking_fps: 바운딩 박스 추적 FPS (기본값: 60)
         :param bbox_reduce_ratio: 바운딩 박스 축소 비율 (기본값: 0.1, 10% 축소)
         :param auto_brightness: 자동 밝기 조정 활성화 (기본값: False)
+        :param encoder_workers: 얼굴 감지/인코딩 프로세스 수 (0: 처리 스레드에서 직접 실행, 음수: CPU 수 기준 자동)
+        :param encode_policy: "all" (모든 얼굴 인코딩) 또는 "largest" (가장 큰 얼굴만 인코딩)
+        :param detect_scale: 얼굴 감지용 프레임 축소 비율 (기본값: 1.0, 0.5 이면 320x240 에서 감지)
+        :param detect_upsample_fallback: 축소 프레임에서 얼굴이 없으면 업샘플 1회 추가 감지 (기본값: False)
+        :param redetect_roi_margin: 재감지 ROI 여백 (추적 박스 크기 대비 비율, 기본값: 1.0, None 이면 항상 전체 프레임)
+        :param adaptive_redetection: 추적 박스 이동/크기 변화, 경과 시간, 마지막 얼굴 거리로 재감지 시점 결정
+                                     (기본값: True, False 이면 redetection_interval 고정 간격)
+        :param tracker_backend: "csrt" (기본값), "kcf", "mosse", "optflow", "auto" (측정 비용/실패율로 자동 선택)
+        :param tracker_budget_ms: auto 모드의 트래커 갱신 1회 목표 비용 (기본값: 추적 프레임 간격의 절반)
+        :param frame_slots: 프레임 링 버퍼 슬롯 수 (기본값: 8 + 인코딩 동시 처리 수)
+        :param preview_quality: 미리보기 JPEG 기본 품질 (기본값: 80). 미리보기는 요청할 때만 인코딩한다
+        :param adaptive_preview: 인코딩 시간/용량이 예산을 넘으면 미리보기 품질 자동 하향 (기본값: False)
+        :param source: 프레임 소스 (frame_source.FrameSource 또는 cv2.VideoCapture 호환 객체, 지정하면 camera_id 무시)
+        :param motion_gate: 장면 변화가 없으면 감지/인코딩/재감지를 건너뛰고 직전 인식 결과를 재전송 (기본값: True)
+        :param motion_threshold: 움직임으로 볼 변한 픽셀 비율 (기본값: 0.01, 해제는 이 값의 40% 미만이 1초 유지될 때)
+        :param motion_idle_fps: 움직임이 없을 때의 처리 FPS (기본값: 2.0)
         """
-        # 카메라 설정
-        self.cap = cv2.VideoCapture(camera_id)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+        # 카메라 설정 (카메라 소스는 640x480 으로 연다)
+        self.cap = source if source is not None else open_frame_source(camera_id)
 
         if not self.cap.isOpened():
             print(f"오류: 카메라 ID {camera_id}를 열 수 없습니다.")
@@ -40,18 +73,27 @@ class WebcamModule:
         self.capture_fps = capture_fps
         self.processing_fps = processing_fps
         self.tracking_fps = tracking_fps
+        self.fps_meters = {"capture": RateMeter(capture_fps), "processing": RateMeter(processing_fps),
+                           "tracking": RateMeter(tracking_fps)}
+
+        # 움직임 게이트: 정지 장면에서는 ML 추론을 건너뛰고 처리 주기를 motion_idle_fps 로 낮춤
+        self.motion_gate = MotionGate(enter_ratio=motion_threshold, exit_ratio=motion_threshold * 0.4,
+                                      active_fps=processing_fps, idle_fps=motion_idle_fps, enabled=motion_gate)
+        self.last_recognition = None  # (bbox_coords, face_vectors) 마지막 RECOGNIZING 결과
 
         # [△]실험실 기능 설정
         self.bbox_reduce_ratio = bbox_reduce_ratio  # 바운딩 박스 축소 비율
         self.auto_brightness = auto_brightness  # 자동 밝기 조정 활성화
         self.brightness_threshold = 80  # 밝기 임계값 (0~255, 80 미만이면 어두운 것으로 판단)
 
-        # 스레드 간 공유 프레임 (최신 프레임만 유지)
-        self.latest_frame = None
-        self.frame_lock = threading.Lock()
+        # 스레드 간 공유 프레임: 미리 할당한 링 버퍼 (얼굴 인코딩 실행기 생성 후 크기 결정)
+        self.frame_ring = None
+        self.frame_stats = {"processing_seen": 0, "processing_skipped": 0, "tracking_seen": 0, "tracking_skipped": 0}
 
-        # 플러터 앱으로 전송할 큐 (JPEG 인코딩 프레임)
-        self.frame_queue = queue.Queue(maxsize=2)
+        # 플러터 앱으로 전송할 미리보기 (JPEG, 요청 시 인코딩. 링 버퍼 생성 후 초기화)
+        self.preview = None
+        self.preview_quality = preview_quality
+        self.adaptive_preview = adaptive_preview
 
         # ML 파이프라인으로 전송할 큐
         self.output_queue = None
@@ -60,14 +102,23 @@ class WebcamModule:
         self.running = False
         self.capture_thread = None
         self.processing_thread = None
+        self.tracking_thread = None
         self.tracker = None
 
         # 동작 상태 관리
         self.processing_state = "RECOGNIZING"
         self.tracker = None
         self.state_lock = threading.Lock()
+        self.tracker_lock = threading.Lock()  # tracker 교체/갱신 및 last_known_bbox 보호
         self.pending_bbox_to_track = None
 
+        # 트래커 백엔드 (백엔드별 갱신 비용/실패율은 트래커를 새로 만들어도 유지)
+        if tracker_backend not in TRACKER_CHOICES:
+            raise ValueError(f"지원하지 않는 트래커: {tracker_backend} (가능: {TRACKER_CHOICES})")
+        self.tracker_backend = tracker_backend
+        self.tracker_budget_ms = tracker_budget_ms or 500.0 / tracking_fps
+        self.tracker_stats = TrackerStats()
+
         # 테스트 모드 플래그
         self.test_mode = False
 
@@ -77,12 +128,37 @@ class WebcamModule:
         self.last_known_bbox = None
         self.tracked_face_encoding = None
         self.face_match_threshold = 0.6
+        self.redetect_roi_margin = redetect_roi_margin
+        self.redetect_stats = {"roi": 0, "full_frame": 0}
+        self.redetect_scheduler = RedetectionScheduler(base_interval=self.redetection_interval,
+                                                       distance_thr=self.face_match_threshold,
+                                                       adaptive=adaptive_redetection,
+                                                       frame_interval=1.0 / processing_fps)
+
+        # 얼굴 감지/인코딩 실행기 (RECOGNIZING 단계). 제출 순서대로 결과를 전송한다.
+        self.detect_kwargs = dict(scale=detect_scale, upsample_fallback=detect_upsample_fallback)
+        self.face_encoder = make_face_encoder(encoder_workers, encode_policy, **self.detect_kwargs)
+        self.pending_recognitions = deque()  # (PipelineData, Future)
+        # 처리/추적 스레드, 출력 큐, 인코딩 대기열이 프레임을 임대한 채로 들고 있을 수 있으므로 그만큼 여유를 둔다
+        self.frame_ring = FrameRing(slots=frame_slots or 8 + self.face_encoder.max_inflight)
+        self.preview = PreviewEncoder(self.frame_ring, quality=preview_quality, adaptive=adaptive_preview)
+
+    def get_latest_frame_jpeg(self, size=None, quality=None):
+        """
+        최신 프레임의 JPEG. 요청한 스레드에서 인코딩하며 같은 프레임/크기/품질은 캐시를 공유한다.
+
+        :param size: (width, height) 미리보기 크기 (None 이면 원본 640x480)
+        :param quality: JPEG 품질 (None 이면 preview_quality)
+        :return: JPEG bytes, 프레임이 아직 없으면 None
+        """
+        result = self.preview.get(size, quality)
+        return result[1] if result else None
 
-    def get_latest_frame_jpeg(self):
-        try:
-            return self.frame_queue.get_nowait()
-        except queue.Empty:
-            return None
+    def get_preview(self, after_seq=-1, size=None, quality=None):
+        """
+        after_seq 보다 새 프레임이 있을 때만 (seq, JPEG bytes) 를 반환 (스트리밍 클라이언트용, 없으면 None)
+        """
+        return self.preview.get(size, quality, after_seq=after_seq)
 
     def set_output_queue(self, output_queue):
         self.output_queue = output_queue
@@ -104,6 +180,13 @@ class WebcamModule:
         )
         self.processing_thread.start()
 
+        self.tracking_thread = threading.Thread(
+            target=self._tracking_loop,
+            name="WebcamTracking",
+            daemon=True
+        )
+        self.tracking_thread.start()
+
     def stop(self):
         self.running = False
 
@@ -111,7 +194,10 @@ class WebcamModule:
             self.capture_thread.join(timeout=1.0)
         if self.processing_thread:
             self.processing_thread.join(timeout=1.0)
+        if self.tracking_thread:
+            self.tracking_thread.join(timeout=1.0)
 
+        self.face_encoder.shutdown()
         self.cap.release()
 
     def start_tracking_request(self, bbox: Tuple[int, int, int, int]):
@@ -124,12 +210,48 @@ class WebcamModule:
         with self.state_lock:
             print("WebcamModule: 추적 중지 요청 수신")
             self.processing_state = "RECOGNIZING"
-            self.tracker = None
+            with self.tracker_lock:
+                self.tracker = None
+                self.last_known_bbox = None
             self.pending_bbox_to_track = None
             self.tracking_frame_count = 0
-            self.last_known_bbox = None
             self.tracked_face_encoding = None
 
+    def get_redetection_stats(self) -> dict:
+        """재감지 스케줄러 결정 카운터와 ROI/전체 프레임 탐색 횟수"""
+        stats = self.redetect_scheduler.summary()
+        stats.update({f"search_{k}": v for k, v in self.redetect_stats.items()})
+        return stats
+
+    def get_tracker_stats(self) -> dict:
+        """트래커 백엔드별 갱신 횟수/실패 횟수/평균 비용(ms)/실패율"""
+        return self.tracker_stats.snapshot()
+
+    def _create_tracker(self):
+        return make_tracker(self.tracker_backend, self.tracker_stats, self.tracker_budget_ms)
+
+    def get_frame_stats(self) -> dict:
+        """링 버퍼 발행/overrun 횟수, 임대 중 슬롯 수, 소비자별 처리/건너뛴 프레임 수 (seq 기준), 미리보기 인코딩 통계"""
+        stats = dict(self.frame_ring.stats)
+        stats.update(self.frame_stats, leased=self.frame_ring.leased(), seq=self.frame_ring.seq,
+                     preview=self.preview.summary())
+        return stats
+
+    def get_motion_stats(self) -> dict:
+        """움직임 게이트의 추론 실행/건너뜀 횟수, active/static 전환 수, 마지막 변화 비율"""
+        return self.motion_gate.summary()
+
+    def get_fps_stats(self) -> dict:
+        """캡처/처리/추적 루프의 목표 FPS 와 실제 FPS"""
+        return {name: m.summary() for name, m in self.fps_meters.items()}
+
+    def _note_seq(self, consumer: str, seq: int, last_seq: int) -> int:
+        """소비자가 받은 프레임 seq 로 건너뛴 프레임 수를 센다"""
+        self.frame_stats[f"{consumer}_seen"] += 1
+        if last_seq >= 0:
+            self.frame_stats[f"{consumer}_skipped"] += seq - last_seq - 1
+        return seq
+
     def enable_test_mode(self, enabled=True):
         print(f"WebcamModule: 테스트 모드 {'활성화' if enabled else '비활성화'}")
         self.test_mode = enabled
@@ -206,29 +328,24 @@ class WebcamModule:
         while self.running:
             start_time = time.time()
 
-            ret, frame = self.cap.read()
+            # 빈 슬롯에 바로 읽어 넣는다 (복사/할당 없음)
+            slot, buf = self.frame_ring.acquire_write()
+            ret, frame = self.cap.read(image=buf)
             if not ret:
                 time.sleep(0.1)
                 continue
 
             # 자동 밝기 조정 적용 (활성화된 경우)
             if self.auto_brightness:
-                frame, was_adjusted = self._adjust_brightness(frame)
-
-            with self.frame_lock:
-                self.latest_frame = frame.copy()
-
-            _, jpeg_buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
-            jpeg_bytes = jpeg_buffer.tobytes()
+                adjusted, was_adjusted = self._adjust_brightness(frame)
+                if was_adjusted:
+                    np.copyto(frame, adjusted)
 
-            try:
-                self.frame_queue.put(jpeg_bytes, block=False)
-            except queue.Full:
-                try:
-                    self.frame_queue.get_nowait()
-                    self.frame_queue.put(jpeg_bytes, block=False)
-                except (queue.Empty, queue.Full):
-                    pass
+            # 미리보기 JPEG 은 소비자가 get_latest_frame_jpeg()/get_preview() 로 요청할 때 인코딩한다
+            # 소스 기준 프레임 번호/시각도 함께 (링 seq 는 overrun 된 프레임을 세지 않음)
+            self.frame_ring.publish(slot, frame, source_index=getattr(self.cap, "index", -1),
+                                    source_timestamp=getattr(self.cap, "timestamp", 0.0))
+            self.fps_meters["capture"].tick()
 
             elapsed = time.time() - start_time
             sleep_time = frame_interval - elapsed
@@ -240,27 +357,36 @@ class WebcamModule:
     def _processing_loop(self):
         print("WebcamModule._processing_loop(): Processing Thread 시작 (Background)")
 
-        frame_interval = 1.0 / self.processing_fps
+        last_seq = -1
+        gate_state = None
 
         while self.running:
             start_time = time.time()
+            frame_interval = self.motion_gate.interval()
 
-            frame_to_process = None
-
-            with self.frame_lock:
-                if self.latest_frame is None:
-                    time.sleep(0.01)
-                    continue
-                frame_to_process = self.latest_frame.copy()
-
+            # 최신 프레임의 읽기 전용 뷰 (다음 반복에서 교체될 때까지 슬롯 임대)
+            frame_to_process = self.frame_ring.latest(after_seq=last_seq, timeout=0.1)
             if frame_to_process is None:
-                time.sleep(0.01)
                 continue
+            last_seq = self._note_seq("processing", frame_to_process.seq, last_seq)
+            self.fps_meters["processing"].tick()
 
             with self.state_lock:
                 current_state = self.processing_state
 
-            pipeline_data = PipelineData(frame=frame_to_process)
+            pipeline_data = PipelineData(frame=frame_to_process, frame_seq=frame_to_process.seq,
+                                         timestamp=frame_to_process.lease.timestamp,
+                                         source_index=frame_to_process.source_index,
+                                         source_timestamp=frame_to_process.source_timestamp)
+            stage_enter(pipeline_data, "features", start_time)
+
+            # 상태가 바뀌면 게이트를 초기화해 첫 프레임은 반드시 추론
+            if current_state != gate_state:
+                self.motion_gate.reset()
+                self.last_recognition = None
+                gate_state = current_state
+            run_inference = current_state == "START_TRACKING" or \
+                self.motion_gate.update(frame_to_process, pipeline_data.timestamp)
 
             if current_state == "START_TRACKING":
                 with self.state_lock:
@@ -277,8 +403,6 @@ class WebcamModule:
                         reduced_bbox = self._reduce_bbox(original_bbox, self.bbox_reduce_ratio)
                         x, y, w, h = reduced_bbox
 
-                        print(f"  → BBox 축소: {original_bbox} → {reduced_bbox} ({self.bbox_reduce_ratio * 100:.0f}% 축소)")
-
                         # 얼굴 임베딩 저장 (원본 bbox 사용)
                         rgb_frame = cv2.cvtColor(frame_to_process, cv2.COLOR_BGR2RGB)
                         orig_x, orig_y, orig_w, orig_h = original_bbox
@@ -289,27 +413,33 @@ class WebcamModule:
 
                         if face_encodings:
                             self.tracked_face_encoding = face_encodings[0]
-                            print(f"  → 추적 대상 얼굴 임베딩 저장 완료 (벡터 크기: {len(self.tracked_face_encoding)})")
                         else:
-                            print("  ⚠️ 경고: 얼굴 임베딩 추출 실패 (추적은 계속됨)")
+                            # 임베딩 추출 실패 → 추적은 계속 (EV_TRACK_START 의 aux = 0, WARN)
                             self.tracked_face_encoding = None
 
                         # 축소된 bbox로 트래커 초기화
-                        self.tracker = cv2.legacy.TrackerCSRT_create()
-                        success = self.tracker.init(frame_to_process, (x, y, w, h))
+                        tracker = self._create_tracker()
+                        success = tracker.init(frame_to_process, (x, y, w, h))
 
                         if success:
+                            with self.tracker_lock:
+                                self.tracker = tracker
+                                self.last_known_bbox = reduced_bbox
+                            self.redetect_scheduler.confirm(reduced_bbox)
                             with self.state_lock:
                                 self.processing_state = "TRACKING"
-                            print(f"WebcamModule: 추적 시작 성공 (TRACKING 모드 진입) - 축소된 BBox: ({x},{y},{w},{h})")
-                            self.last_known_bbox = reduced_bbox
+                            tracer.record(EV_STATE, INFO, frame_to_process.seq, "TRACKING", bbox=reduced_bbox)
+                            enc = self.tracked_face_encoding
+                            tracer.record(EV_TRACK_START, INFO if enc is not None else WARN, frame_to_process.seq,
+                                          "TRACKING", bbox=reduced_bbox, aux=0 if enc is None else len(enc))
                             self.tracking_frame_count = 0
                             pipeline_data.bbox_coords = [reduced_bbox]
                         else:
                             print("WebcamModule: 트래커 초기화 실패 (init 반환값 False)")
                             with self.state_lock:
                                 self.processing_state = "RECOGNIZING"
-                                self.tracker = None
+                                with self.tracker_lock:
+                                    self.tracker = None
 
                     except Exception as e:
                         print(f"WebcamModule: 트래커 초기화 실패: {e}")
@@ -317,27 +447,30 @@ class WebcamModule:
                         print(f"  - Frame shape: {frame_to_process.shape}")
                         with self.state_lock:
                             self.processing_state = "RECOGNIZING"
-                            self.tracker = None
+                            with self.tracker_lock:
+                                self.tracker = None
                 else:
                     with self.state_lock:
                         self.processing_state = "RECOGNIZING"
 
             elif current_state == "TRACKING":
+                # tracker.update 와 bbox 출력은 _tracking_loop 가 tracking_fps 로 수행한다.
+                # 이 스레드는 재감지만 맡고, 결과가 나오면 새 트래커를 만들어 넘겨준다.
                 self.tracking_frame_count += 1
-
-                if self.tracking_frame_count % self.redetection_interval == 0:
-                    print(f"\n{'=' * 60}")
-                    print(f"WebcamModule: 주기적 재감지 수행 (프레임 {self.tracking_frame_count})")
-                    print(f"{'=' * 60}")
-
-                    rgb_frame = cv2.cvtColor(frame_to_process, cv2.COLOR_BGR2RGB)
-                    face_locations = face_recognition.face_locations(rgb_frame)
+                pipeline_data = None
+                with self.tracker_lock:
+                    last_bbox = self.last_known_bbox
+                if last_bbox is not None:
+                    self.redetect_scheduler.observe(last_bbox, frame_to_process.lease.timestamp)
+
+                # 스케줄러는 매 프레임 진행하고, 장면이 그대로면 재감지만 미룸 (bbox 출력은 추적 스레드가 계속함)
+                if self.redetect_scheduler.decide(allowed=run_inference):
+                    self.motion_gate.executed()
+                    seq = frame_to_process.seq
+                    face_locations, face_encodings, _ = self._redetect_faces(frame_to_process, last_bbox)
+                    tracer.record(EV_REDETECT, DEBUG, seq, "TRACKING", bbox=last_bbox, aux=len(face_locations))
 
                     if face_locations:
-                        print(f"  → {len(face_locations)}개의 얼굴 감지됨")
-
-                        face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
-
                         best_match = None
                         best_encoding = None
                         min_distance = float('inf')
@@ -352,9 +485,9 @@ class WebcamModule:
 
                             # IoU 계산
                             iou = 0.0
-                            if self.last_known_bbox:
+                            if last_bbox:
                                 # 축소된 bbox와 비교하므로 원본 크기로 복원하여 비교
-                                expanded_last_bbox = self._expand_bbox(self.last_known_bbox, self.bbox_reduce_ratio)
+                                expanded_last_bbox = self._expand_bbox(last_bbox, self.bbox_reduce_ratio)
                                 iou = self._calculate_iou(expanded_last_bbox, detected_bbox)
 
                             # 얼굴 임베딩 거리 계산
@@ -371,13 +504,8 @@ class WebcamModule:
                             else:
                                 distance = 1 - iou
 
-                            print(f"  얼굴 #{idx + 1}: BBox={detected_bbox}")
-                            print(f"    - IoU: {iou:.3f}")
-                            if face_distance is not None:
-                                print(f"    - 얼굴 거리: {face_distance:.3f} (임계값: {self.face_match_threshold})")
-                                print(
-                                    f"    - 매칭 여부: {'✓ 같은 사람' if face_distance < self.face_match_threshold else '✗ 다른 사람'}")
-                            print(f"    - 종합 점수: {(1 - distance):.3f}")
+                            tracer.record(EV_REDETECT_CAND, DEBUG, seq, "TRACKING", iou=iou, distance=face_distance,
+                                          similarity=1 - distance, bbox=detected_bbox, aux=idx)
 
                             if distance < min_distance:
                                 min_distance = distance
@@ -388,138 +516,245 @@ class WebcamModule:
 
                         # 최종 판단
                         is_same_person = True
-                        rejection_reason = None
+                        rejection_reason = 0
 
                         if best_iou < 0.1:
                             is_same_person = False
-                            rejection_reason = f"위치 불일치 (IoU: {best_iou:.3f} < 0.1)"
+                            rejection_reason = REJECT_IOU
                         elif best_face_distance is not None and best_face_distance > self.face_match_threshold:
                             is_same_person = False
-                            rejection_reason = f"얼굴 불일치 (거리: {best_face_distance:.3f} > {self.face_match_threshold})"
+                            rejection_reason = REJECT_FACE
 
-                        print(f"\n  [최종 판정]")
                         if is_same_person and best_match:
-                            print(f"  ✅ 동일 인물 확인")
-                            print(f"    - 감지된 BBox (원본): {best_match}")
-
                             # 감지된 bbox를 축소하여 트래커에 전달
                             reduced_best_match = self._reduce_bbox(best_match, self.bbox_reduce_ratio)
-                            print(f"    - 축소된 BBox: {reduced_best_match}")
-                            print(f"    - IoU: {best_iou:.3f}")
-
-                            if best_face_distance is not None:
-                                print(f"    - 얼굴 거리: {best_face_distance:.3f}")
-                            print(f"  → 트래커 재초기화 진행...")
-
                             try:
                                 x, y, w, h = reduced_best_match
-                                self.tracker = cv2.legacy.TrackerCSRT_create()
-                                success = self.tracker.init(frame_to_process, (x, y, w, h))
+                                # 재감지한 프레임으로 새 트래커를 만든 뒤 교체 (추적 스레드는 멈추지 않음)
+                                new_tracker = self._create_tracker()
+                                success = new_tracker.init(frame_to_process, (x, y, w, h))
 
-                                if success:
-                                    old_bbox = self.last_known_bbox
-                                    self.last_known_bbox = reduced_best_match
+                                with self.state_lock:
+                                    still_tracking = self.processing_state == "TRACKING"
+                                if success and still_tracking:
+                                    with self.tracker_lock:
+                                        self.tracker = new_tracker
+                                        self.last_known_bbox = reduced_best_match
+                                    self.redetect_scheduler.confirm(reduced_best_match, best_face_distance)
                                     self.tracked_face_encoding = best_encoding
-                                    pipeline_data.bbox_coords = [reduced_best_match]
-                                    print(f"  ✓ 트래커 재초기화 성공")
-
-                                    # 크기 변화 표시
-                                    if old_bbox:
-                                        old_w, old_h = old_bbox[2], old_bbox[3]
-                                        size_change = ((w - old_w) / old_w * 100, (h - old_h) / old_h * 100)
-                                        print(f"  📏 크기 변화: 너비 {size_change[0]:+.1f}%, 높이 {size_change[1]:+.1f}%")
+                                    tracer.record(EV_REDETECT_MATCH, INFO, seq, "TRACKING", iou=best_iou,
+                                                  distance=best_face_distance, similarity=1 - min_distance,
+                                                  bbox=reduced_best_match)
                                 else:
-                                    print("  ✗ 트래커 재초기화 실패, 기존 추적 유지")
-                                    success, bbox = self.tracker.update(frame_to_process)
-                                    if success and bbox is not None:
-                                        x, y, w, h = bbox
-                                        bbox_int = (int(x), int(y), int(w), int(h))
-                                        self.last_known_bbox = bbox_int
-                                        pipeline_data.bbox_coords = [bbox_int]
+                                    # 재감지 중 추적이 끝났으면 결과 폐기 (aux=1), 아니면 기존 추적 유지
+                                    tracer.record(EV_TRACK_REINIT_FAIL, WARN, seq, "TRACKING",
+                                                  bbox=reduced_best_match, aux=0 if still_tracking else 1)
                             except Exception as e:
-                                print(f"  ✗ 재초기화 중 오류: {e}")
+                                print(f"WebcamModule: 재초기화 중 오류: {e}")
                                 with self.state_lock:
                                     self.processing_state = "RECOGNIZING"
-                                    self.tracker = None
+                                    with self.tracker_lock:
+                                        self.tracker = None
                                     self.tracking_frame_count = 0
+                                tracer.record(EV_STATE, WARN, seq, "RECOGNIZING")
                         else:
-                            print(f"  ❌ 다른 인물로 판단: {rejection_reason}")
-                            print(f"  → 인식 모드로 복귀")
+                            tracer.record(EV_REDETECT_REJECT, INFO, seq, "RECOGNIZING", iou=best_iou,
+                                          distance=best_face_distance, similarity=1 - min_distance,
+                                          bbox=best_match, aux=rejection_reason)
                             with self.state_lock:
                                 self.processing_state = "RECOGNIZING"
-                                self.tracker = None
+                                with self.tracker_lock:
+                                    self.tracker = None
                                 self.tracking_frame_count = 0
                                 self.tracked_face_encoding = None
                     else:
-                        print("  ✗ 얼굴 미감지")
-                        print("  → 인식 모드로 복귀")
+                        tracer.record(EV_REDETECT_MISS, INFO, seq, "RECOGNIZING", bbox=last_bbox)
                         with self.state_lock:
                             self.processing_state = "RECOGNIZING"
-                            self.tracker = None
+                            with self.tracker_lock:
+                                self.tracker = None
                             self.tracking_frame_count = 0
                             self.tracked_face_encoding = None
 
-                    print(f"{'=' * 60}\n")
-                else:
-                    # 일반 추적 수행
-                    success, bbox = self.tracker.update(frame_to_process)
-                    if success and bbox is not None:
-                        x, y, w, h = bbox
-                        bbox_int = (int(x), int(y), int(w), int(h))
-                        self.last_known_bbox = bbox_int
-                        pipeline_data.bbox_coords = [bbox_int]
-                    else:
-                        print("WebcamModule: 추적 실패. (RECOGNIZING 모드 복귀)")
-                        with self.state_lock:
-                            self.processing_state = "RECOGNIZING"
-                            self.tracker = None
-                            self.tracking_frame_count = 0
-
             elif current_state == "RECOGNIZING":
-                rgb_frame = cv2.cvtColor(frame_to_process, cv2.COLOR_BGR2RGB)
+                # 실행 중인 작업이 가득 차 있으면 이번 프레임은 제출하지 않음 (최신 프레임 우선)
+                if run_inference and len(self.pending_recognitions) < self.face_encoder.max_inflight:
+                    rgb_frame = cv2.cvtColor(frame_to_process, cv2.COLOR_BGR2RGB)
+                    self.pending_recognitions.append((pipeline_data, self.face_encoder.submit(rgb_frame)))
+                    self.motion_gate.executed()
+                elif not run_inference and not self.pending_recognitions and self.last_recognition is not None:
+                    # 장면이 그대로면 직전 결과를 이번 프레임으로 재전송 (인증 부재 판정/자세 판정이 계속 갱신되도록)
+                    bboxes, vectors = self.last_recognition
+                    pipeline_data.bbox_coords, pipeline_data.face_vectors = list(bboxes), list(vectors)
+                    pipeline_data.reused = True
+                    self._emit(pipeline_data)
+                pipeline_data = None
+
+                # 완료된 결과를 제출 순서대로 전송
+                while self.pending_recognitions and self.pending_recognitions[0][1].done():
+                    done_data, future = self.pending_recognitions.popleft()
+                    try:
+                        face_locations_dlib, face_encodings = future.result()
+                    except Exception as e:
+                        print(f"WebcamModule: 얼굴 인코딩 실패: {e}")
+                        continue
+                    self._fill_recognition(done_data, face_locations_dlib, face_encodings)
+                    self.last_recognition = (done_data.bbox_coords, done_data.face_vectors)
+                    self._emit(done_data)
 
-                face_locations_dlib = face_recognition.face_locations(rgb_frame)
-                face_encodings = face_recognition.face_encodings(rgb_frame, face_locations_dlib)
+            # RECOGNIZING 을 벗어나면 남은 인식 결과는 버림
+            if current_state != "RECOGNIZING" and self.pending_recognitions:
+                self.pending_recognitions.clear()
 
-                bboxes_cv2 = []
-                largest_bbox_area = -1
-                largest_bbox = None
+            if pipeline_data is not None:
+                self._emit(pipeline_data)
+
+            elapsed = time.time() - start_time
+            sleep_time = frame_interval - elapsed
+            if sleep_time > 0:
+                time.sleep(sleep_time)
 
-                for (top, right, bottom, left), encoding in zip(face_locations_dlib, face_encodings):
-                    x, y = int(left), int(top)
-                    w, h = int(right - left), int(bottom - top)
-                    cv2_bbox = (x, y, w, h)
+        print("WebcamModule._processing_loop(): Processing Thread 종료")
 
-                    bboxes_cv2.append(cv2_bbox)
-                    pipeline_data.face_vectors.append(encoding.tolist())
+    def _tracking_loop(self):
+        print("WebcamModule._tracking_loop(): Tracking Thread 시작")
 
-                    area = w * h
-                    if area > largest_bbox_area:
-                        largest_bbox_area = area
-                        largest_bbox = cv2_bbox
+        frame_interval = 1.0 / self.tracking_fps
+        last_seq = -1
 
-                pipeline_data.bbox_coords = bboxes_cv2
+        while self.running:
+            start_time = time.time()
 
-                if self.test_mode and largest_bbox:
-                    print(f"WebcamModule (Test Mode): 가장 큰 얼굴 감지, 추적 시작")
-                    self.start_tracking_request(largest_bbox)
+            with self.state_lock:
+                current_state = self.processing_state
 
-            if self.output_queue is not None:
-                try:
-                    self.output_queue.put(pipeline_data, block=False)
-                except queue.Full:
-                    try:
-                        self.output_queue.get_nowait()
-                        self.output_queue.put(pipeline_data, block=False)
-                    except (queue.Empty, queue.Full):
-                        pass
+            if current_state == "TRACKING":
+                # 아직 처리하지 않은 최신 프레임만 (읽기 전용 뷰)
+                frame = self.frame_ring.latest(after_seq=last_seq)
+                if frame is not None:
+                    last_seq = self._note_seq("tracking", frame.seq, last_seq)
+                    self._track_step(frame)
+                frame = None  # 대기하는 동안 슬롯을 붙잡지 않는다
 
             elapsed = time.time() - start_time
             sleep_time = frame_interval - elapsed
             if sleep_time > 0:
                 time.sleep(sleep_time)
 
-        print("WebcamModule._processing_loop(): Processing Thread 종료")
+        print("WebcamModule._tracking_loop(): Tracking Thread 종료")
+
+    def _track_step(self, frame: LeasedFrame):
+        """
+        최신 프레임으로 트래커를 한 번 갱신하고 결과 bbox 를 전송합니다.
+
+        :param frame: BGR 프레임 (읽기 전용)
+        """
+        t_enter = time.time()
+        self.fps_meters["tracking"].tick(t_enter)
+        with self.tracker_lock:
+            # 한 번만 읽는다 (다른 스레드는 tracker_lock 을 잡고 교체/해제)
+            tracker = self.tracker
+            if tracker is None:
+                return
+            success, bbox = tracker.update(frame)
+            if success and bbox is not None:
+                x, y, w, h = bbox
+                bbox_int = (int(x), int(y), int(w), int(h))
+                self.last_known_bbox = bbox_int
+
+        if success and bbox is not None:
+            data = PipelineData(frame=frame, frame_seq=frame.seq, timestamp=frame.lease.timestamp,
+                                source_index=frame.source_index, source_timestamp=frame.source_timestamp,
+                                bbox_coords=[bbox_int])
+            stage_enter(data, "tracking", t_enter)
+            self._emit(data)
+        else:
+            print("WebcamModule: 추적 실패. (RECOGNIZING 모드 복귀)")
+            with self.state_lock:
+                self.processing_state = "RECOGNIZING"
+                self.tracking_frame_count = 0
+            with self.tracker_lock:
+                self.tracker = None
+
+    def _roi_bounds(self, bbox: Tuple[int, int, int, int], margin: float, frame_shape) -> Tuple[int, int, int, int]:
+        """
+        바운딩 박스를 상하좌우로 margin 배만큼 넓힌 ROI 를 프레임 안으로 잘라 반환합니다.
+
+        :param bbox: (x, y, w, h)
+        :param margin: 박스 너비/높이 대비 여백 비율
+        :param frame_shape: 프레임 shape (h, w, ...)
+        :return: (x0, y0, x1, y1)
+        """
+        x, y, w, h = bbox
+        fh, fw = frame_shape[:2]
+        mx, my = int(w * margin), int(h * margin)
+        return max(0, x - mx), max(0, y - my), min(fw, x + w + mx), min(fh, y + h + my)
+
+    def _redetect_faces(self, frame: np.ndarray, last_bbox=None):
+        """
+        재감지: 마지막 추적 위치 주변 ROI 에서 먼저 감지/인코딩하고, 아무것도 없을 때만 전체 프레임을 탐색합니다.
+
+        :param frame: BGR 프레임
+        :param last_bbox: 호출자가 tracker_lock 안에서 읽어 둔 추적 박스 (추적 스레드가 바꾸는 last_known_bbox 를 다시 읽지 않음)
+        :return: (전체 프레임 좌표 (top, right, bottom, left) 리스트, 인코딩 리스트, 탐색 영역 이름)
+        """
+        if last_bbox is not None and self.redetect_roi_margin is not None:
+            # 축소된 추적 박스를 원본 크기로 되돌린 뒤 여백 추가
+            expanded = self._expand_bbox(last_bbox, self.bbox_reduce_ratio)
+            x0, y0, x1, y1 = self._roi_bounds(expanded, self.redetect_roi_margin, frame.shape)
+            if x1 > x0 and y1 > y0:
+                roi_rgb = cv2.cvtColor(frame[y0:y1, x0:x1], cv2.COLOR_BGR2RGB)
+                # ROI 는 이미 작으므로 축소 없이 감지
+                locations = detect_faces(roi_rgb, upsample_fallback=self.detect_kwargs["upsample_fallback"])
+                if locations:
+                    encodings = face_recognition.face_encodings(roi_rgb, locations)
+                    self.redetect_stats["roi"] += 1
+                    return [(t + y0, r + x0, b + y0, l + x0) for (t, r, b, l) in locations], encodings, "ROI"
+
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        locations = detect_faces(rgb_frame, **self.detect_kwargs)
+        encodings = face_recognition.face_encodings(rgb_frame, locations) if locations else []
+        self.redetect_stats["full_frame"] += 1
+        return locations, encodings, "전체 프레임"
+
+    def _fill_recognition(self, pipeline_data: PipelineData, face_locations_dlib, face_encodings):
+        """
+        감지/인코딩 결과를 PipelineData 에 채우고, 테스트 모드면 가장 큰 얼굴 추적을 요청합니다.
+
+        :param pipeline_data: 결과를 채울 PipelineData
+        :param face_locations_dlib: (top, right, bottom, left) 리스트
+        :param face_encodings: face_locations_dlib 와 같은 순서의 인코딩 리스트
+        """
+        bboxes_cv2 = []
+        largest_bbox_area = -1
+        largest_bbox = None
+
+        for (top, right, bottom, left), encoding in zip(face_locations_dlib, face_encodings):
+            x, y = int(left), int(top)
+            w, h = int(right - left), int(bottom - top)
+            cv2_bbox = (x, y, w, h)
+
+            bboxes_cv2.append(cv2_bbox)
+            pipeline_data.face_vectors.append(encoding.tolist())
+
+            area = w * h
+            if area > largest_bbox_area:
+                largest_bbox_area = area
+                largest_bbox = cv2_bbox
+
+        pipeline_data.bbox_coords = bboxes_cv2
+
+        if self.test_mode and largest_bbox:
+            tracer.record(EV_TRACK_REQUEST, INFO, pipeline_data.frame_seq, "RECOGNIZING", bbox=largest_bbox)
+            self.start_tracking_request(largest_bbox)
+
+    def _emit(self, pipeline_data: PipelineData):
+        """출력 큐로 전송 (Edge 면 엣지 정책, 일반 Queue 면 최신 데이터만 유지)"""
+        if self.output_queue is None:
+            return
+        stage_exit(pipeline_data, "features")
+        stage_exit(pipeline_data, "tracking")
+        offer(self.output_queue, pipeline_data)
 
     def _expand_bbox(self, bbox: Tuple[int, int, int, int], ratio: float) -> Tuple[int, int, int, int]:
         """